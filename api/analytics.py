@@ -0,0 +1,279 @@
+"""
+Time-bucketed revenue / enrollment analytics.
+
+Each metric groups rows by TruncMonth / TruncWeek in the database. Results
+are cached per bucket (ANALYTICS_CACHE_ALIAS):
+  - closed buckets (fully in the past) are frozen – cached without timeout
+    and only dropped when a row inside that bucket is saved or deleted;
+  - the current bucket is cached for ANALYTICS_CURRENT_BUCKET_TTL seconds.
+So a dashboard refresh normally runs at most one small query per metric,
+restricted to the current bucket.
+
+Revenue is attributed to the course of the payer's group at the time the
+bucket is computed; moving a student to another group does not rewrite
+frozen months.
+"""
+import datetime
+from abc import ABC, abstractmethod
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Application, Payment, User
+
+MAX_BUCKETS = 520
+
+
+class TooManyBuckets(ValueError):
+    pass
+
+
+def get_cache():
+    return caches[getattr(settings, "ANALYTICS_CACHE_ALIAS", "default")]
+
+
+def month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(start):
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+
+def week_start(value):
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value - datetime.timedelta(days=value.weekday())
+
+
+def next_week(start):
+    return start + datetime.timedelta(days=7)
+
+
+class Metric(ABC):
+    """
+    A metric groups `model` rows by `trunc` of `date_field`;
+    `compute_rows` returns {bucket_start: [row, ...]} for a date range.
+    """
+
+    name = None
+    model = None
+    date_field = "date"
+    trunc = None
+    bucket_start = None
+    next_bucket = None
+    default_buckets = 12
+
+    @abstractmethod
+    def compute_rows(self, start, end):
+        pass
+
+    def key(self, start, generation):
+        return f"analytics:{self.name}:{generation}:{start.isoformat()}"
+
+    def generation(self):
+        return get_cache().get(f"analytics:{self.name}:generation", 0)
+
+    def buckets(self, date_from=None, date_to=None):
+        tz = timezone.get_current_timezone()
+        now = timezone.localtime(timezone.now(), tz)
+        last = self.bucket_start(now if date_to is None else _as_datetime(date_to, tz))
+        if date_from is None:
+            first = last
+            for _ in range(self.default_buckets - 1):
+                first = self.bucket_start(first - datetime.timedelta(days=1))
+        else:
+            first = self.bucket_start(_as_datetime(date_from, tz))
+
+        starts = []
+        start = first
+        while start <= last:
+            if len(starts) == MAX_BUCKETS:
+                raise TooManyBuckets(f"A report covers at most {MAX_BUCKETS} buckets.")
+            starts.append(start)
+            start = self.next_bucket(start)
+        return starts, now
+
+    def report(self, date_from=None, date_to=None):
+        starts, now = self.buckets(date_from, date_to)
+        cache = get_cache()
+        generation = self.generation()
+        keys = {start: self.key(start, generation) for start in starts}
+        found = cache.get_many(keys.values())
+
+        missing = [start for start in starts if keys[start] not in found]
+        if missing:
+            end = self.next_bucket(missing[-1])
+            computed = self.compute_rows(missing[0], end)
+            frozen, current = {}, {}
+            for start in missing:
+                rows = computed.get(start, [])
+                found[keys[start]] = rows
+                if self.next_bucket(start) <= now:
+                    frozen[keys[start]] = rows
+                else:
+                    current[keys[start]] = rows
+            if frozen:
+                cache.set_many(frozen, None)
+            if current:
+                cache.set_many(current, getattr(settings, "ANALYTICS_CURRENT_BUCKET_TTL", 60))
+
+        return {
+            "metric": self.name,
+            "buckets": [
+                {
+                    "start": start.date().isoformat(),
+                    "closed": self.next_bucket(start) <= now,
+                    "rows": found[keys[start]],
+                }
+                for start in starts
+            ],
+        }
+
+    def grouped(self, start, end):
+        return (
+            self.model.objects.filter(**{
+                f"{self.date_field}__gte": start,
+                f"{self.date_field}__lt": end,
+            })
+            .annotate(bucket=self.trunc(self.date_field))
+            .order_by()
+        )
+
+    def invalidate(self, instance):
+        value = getattr(instance, self.date_field, None)
+        if value is None:
+            return
+        tz = timezone.get_current_timezone()
+        start = self.bucket_start(timezone.localtime(value, tz))
+        get_cache().delete(self.key(start, self.generation()))
+
+    def invalidate_all(self):
+        cache = get_cache()
+        key = f"analytics:{self.name}:generation"
+        if not cache.add(key, 1, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, None)
+
+
+def _as_datetime(value, tz):
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value, tz)
+    return datetime.datetime(value.year, value.month, value.day, tzinfo=tz)
+
+
+def _bucket_rows(rows):
+    result = {}
+    for row in rows:
+        bucket = row.pop("bucket")
+        result.setdefault(bucket, []).append(row)
+    return result
+
+
+class RevenueMetric(Metric):
+    """
+    Sum of Payment.payed per course per month.
+    """
+
+    name = "revenue"
+    model = Payment
+    trunc = TruncMonth
+    bucket_start = staticmethod(month_start)
+    next_bucket = staticmethod(next_month)
+
+    def compute_rows(self, start, end):
+        rows = (
+            self.grouped(start, end)
+            .values("bucket", course=F("user__group__course_id"), title=F("user__group__course__title"))
+            .annotate(revenue=Sum("payed"), payments=Count("pk"))
+            .order_by("bucket", "course")
+        )
+        return _bucket_rows(
+            {**row, "revenue": str(Decimal(row["revenue"]).quantize(Decimal("0.01")))} for row in rows
+        )
+
+
+class ApplicationsMetric(Metric):
+    """
+    New applications per week, per requested course.
+    """
+
+    name = "applications"
+    model = Application
+    trunc = TruncWeek
+    bucket_start = staticmethod(week_start)
+    next_bucket = staticmethod(next_week)
+
+    def compute_rows(self, start, end):
+        rows = (
+            self.grouped(start, end)
+            .values("bucket", "course")
+            .annotate(applications=Count("pk"))
+            .order_by("bucket", "course")
+        )
+        return _bucket_rows(rows)
+
+
+class FunnelMetric(Metric):
+    """
+    Applications per week and how many of them became an active User
+    (matched by email).
+    """
+
+    name = "funnel"
+    model = Application
+    trunc = TruncWeek
+    bucket_start = staticmethod(week_start)
+    next_bucket = staticmethod(next_week)
+
+    def compute_rows(self, start, end):
+        active = User.objects.filter(email=OuterRef("email"), status=User.Status.ACTIVE)
+        rows = (
+            self.grouped(start, end)
+            .annotate(is_converted=Exists(active))
+            .values("bucket")
+            .annotate(
+                applications=Count("pk"),
+                converted=Count("pk", filter=Q(is_converted=True)),
+            )
+            .order_by("bucket")
+        )
+        return _bucket_rows(
+            {
+                **row,
+                "rate": round(row["converted"] / row["applications"], 4) if row["applications"] else None,
+            }
+            for row in rows
+        )
+
+
+revenue = RevenueMetric()
+applications = ApplicationsMetric()
+funnel = FunnelMetric()
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_revenue(sender, instance, **kwargs):
+    revenue.invalidate(instance)
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def invalidate_applications(sender, instance, **kwargs):
+    applications.invalidate(instance)
+    funnel.invalidate(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_funnel(sender, instance, **kwargs):
+    # a status/email change can convert applications of any past week
+    funnel.invalidate_all()
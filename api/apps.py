@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # register signal receivers and job tasks
+        from . import (  # noqa: F401
+            analytics,
+            authentication,
+            autocomplete,
+            dashboard,
+            grading,
+            images,
+            ledger,
+            notifications,
+            principals,
+            response_cache,
+            search,
+        )
@@ -0,0 +1,146 @@
+"""
+Async list/retrieve for the busiest read endpoints, used under ASGI.
+
+DRF dispatches synchronously, so under an ASGI server every request to a
+viewset is handed to Django's sync thread as a whole. For viewsets with
+AsyncReadMixin, GET list/retrieve are answered by a coroutine instead:
+
+  - DRF's `initial` (authentication, permissions, throttles) runs in one
+    sync_to_async call, as it may read the session and user tables
+    (CachedResponseMixin looks up its cache entry in the same call);
+  - the page comes from the async ORM: `aiterator` through
+    KeysetCursorPagination.apaginate_queryset, `aget` for a single object;
+  - JSON responses are rendered on the event loop.
+
+Every other action, and the browsable API, takes the regular sync path.
+
+The router keeps registering the sync view. The async variant is attached
+as `view.async_view`, and only website.asgi's handler uses it, so the WSGI
+path (website.wsgi) runs exactly as before.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def plain_response(response):
+    """
+    Render a DRF Response into an HttpResponse. Django would otherwise call
+    render() – a no-op by then – through sync_to_async.
+    """
+    response.render()
+    plain = HttpResponse(response.content, status=response.status_code)
+    for name, value in response.items():
+        plain[name] = value
+    return plain
+
+
+class AsyncReadMixin:
+    """
+    Mix into a ModelViewSet (before it, after CachedResponseMixin) to serve
+    GET list/retrieve asynchronously under ASGI. Serializers must not touch
+    the database lazily: the async ORM raises SynchronousOnlyOperation.
+    """
+
+    async_actions = ("list", "retrieve")
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if view.actions.get("get") in cls.async_actions:
+            view.async_view = cls.make_async_view(view, initkwargs)
+        return view
+
+    @classmethod
+    def make_async_view(cls, sync_view, initkwargs):
+        actions = sync_view.actions
+        run_sync_view = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if request.method != "GET":
+                return await run_sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        view.login_required = False
+        view.__name__ = sync_view.__name__
+        view.__doc__ = sync_view.__doc__
+        view.sync_view = sync_view
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        APIView.dispatch for GET list/retrieve.
+        """
+        # mirrors rest_framework.views.APIView.dispatch (DRF 3.18): keep it in
+        # step with it when upgrading DRF
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial_sync)(request, *args, **kwargs)
+            if getattr(request.accepted_renderer, "format", None) == "api":
+                # the browsable API renders forms from querysets
+                response = await sync_to_async(getattr(self, self.action))(request, *args, **kwargs)
+            else:
+                response = await getattr(self, f"a{self.action}")(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        if isinstance(self.response, Response) and getattr(request.accepted_renderer, "format", None) != "api":
+            self.response = plain_response(self.response)
+        return self.response
+
+    def initial_sync(self, request, *args, **kwargs):
+        """
+        The part of an async GET that has to run in the sync thread, in one
+        sync_to_async call: DRF's initial(). Extend it to prefetch more.
+        """
+        self.initial(request, *args, **kwargs)
+
+    async def afilter_queryset(self, queryset):
+        # ?search= may build or query the search index (api.search)
+        if self.request.query_params.get(api_settings.SEARCH_PARAM):
+            return await sync_to_async(self.filter_queryset)(queryset)
+        return self.filter_queryset(queryset)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        paginator = self.paginator
+        if paginator is not None:
+            if hasattr(paginator, "apaginate_queryset"):
+                page = await paginator.apaginate_queryset(queryset, request, view=self)
+            else:
+                page = await sync_to_async(paginator.paginate_queryset)(queryset, request, view=self)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        rows = [obj async for obj in queryset.aiterator()]
+        return Response(self.get_serializer(rows, many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(await self.aget_object()).data)
+
@@ -0,0 +1,50 @@
+"""
+Columnar attendance matrix of a group.
+
+Built from one ordered values_list() query over Journal, without creating
+model instances. The payload is
+
+    {
+      "group":  1,
+      "users":  [3, 7, 9],
+      "dates":  ["2025-01-06", "2025-01-08"],
+      "matrix": ["11", "0.", "10"]
+    }
+
+where matrix[i][j] is the status of users[i] on dates[j]:
+"1" present, "0" absent, "." no journal entry.
+"""
+from .models import Journal
+
+PRESENT = "1"
+ABSENT = "0"
+MISSING = "."
+
+
+def build_attendance_matrix(group_id, date_from=None, date_to=None):
+    rows = Journal.objects.filter(group_id=group_id)
+    if date_from:
+        rows = rows.filter(date__gte=date_from)
+    if date_to:
+        rows = rows.filter(date__lte=date_to)
+    rows = rows.order_by("user_id", "date").values_list("user_id", "date", "status")
+
+    users = []
+    cells = []  # one {date: status char} per user
+    for user_id, date, status in rows.iterator(chunk_size=2000):
+        if not users or users[-1] != user_id:
+            users.append(user_id)
+            cells.append({})
+        cells[-1][date] = PRESENT if status else ABSENT
+
+    dates = sorted({date for user_cells in cells for date in user_cells})
+    matrix = [
+        "".join(user_cells.get(date, MISSING) for date in dates)
+        for user_cells in cells
+    ]
+    return {
+        "group": int(group_id),
+        "users": users,
+        "dates": [date.isoformat() for date in dates],
+        "matrix": matrix,
+    }
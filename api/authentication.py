@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import authentication, exceptions, permissions
+
+from .cache import TTLCache
+from .models import Integration, User
+
+# api_key_hash -> Integration (with .user loaded). Entries are dropped when
+# the integration or its owner changes, the TTL only covers other processes.
+integration_cache = TTLCache(
+    maxsize=getattr(settings, "INTEGRATION_KEY_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "INTEGRATION_KEY_CACHE_TTL", 10),
+)
+
+
+class IntegrationUser:
+    """
+    request.user for requests authenticated with an Integration API key.
+    Wraps the owning api.models.User; request.auth is the Integration.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, integration):
+        self.integration = integration
+        self.user = integration.user
+        self.pk = self.id = integration.user_id
+        self.email = integration.user.email
+
+    def __str__(self):
+        return f"{self.user} via {self.integration.title}"
+
+
+class IntegrationAPIKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates partner systems by Integration.api_key.
+
+    The key is read from either header:
+      - Authorization: Api-Key <key>
+      - X-API-Key: <key>
+
+    Integrations with permission OFF are rejected, READONLY keys may only
+    use safe methods. Keys are looked up by their sha256 (indexed
+    Integration.api_key_hash) and resolved integrations are kept in a
+    process-local LRU+TTL cache, so a polling partner costs no queries.
+    """
+
+    keyword = "Api-Key"
+    header = "HTTP_X_API_KEY"
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+
+        integration = self.get_integration(key)
+        if integration is None:
+            raise exceptions.AuthenticationFailed("Invalid API key.")
+        if integration.permission == Integration.Permission.OFF:
+            raise exceptions.AuthenticationFailed("API key is disabled.")
+        if request.method not in permissions.SAFE_METHODS:
+            raise exceptions.PermissionDenied("API key is read-only.")
+
+        return IntegrationUser(integration), integration
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+    def get_key(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if auth and auth[0].lower() == self.keyword.lower().encode():
+            if len(auth) != 2:
+                raise exceptions.AuthenticationFailed("Invalid API key header.")
+            try:
+                return auth[1].decode()
+            except UnicodeError:
+                raise exceptions.AuthenticationFailed("Invalid API key header.")
+
+        return request.META.get(self.header) or None
+
+    def get_integration(self, key):
+        key_hash = Integration.hash_key(key)
+        integration = integration_cache.get(key_hash)
+        if integration is None:
+            integration = (
+                Integration.objects.select_related("user")
+                .filter(api_key_hash=key_hash)
+                .first()
+            )
+            if integration is not None:
+                integration_cache.set(key_hash, integration)
+        return integration
+
+
+@receiver(post_save, sender=Integration)
+@receiver(post_delete, sender=Integration)
+def invalidate_integration(sender, instance, **kwargs):
+    # by pk, so the entry of a rotated (old) key goes away as well
+    integration_cache.pop_where(lambda integration: integration.pk == instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_integrations(sender, instance, **kwargs):
+    integration_cache.pop_where(lambda integration: integration.user_id == instance.pk)
@@ -0,0 +1,306 @@
+"""
+In-memory autocomplete for the admin pickers (/autocomplete/users/,
+/autocomplete/courses/).
+
+Each AutocompleteIndex keeps, per process:
+  - a sorted array of (token, pk) over the normalized words of the indexed
+    fields (api.search.tokenize: lowercase, no diacritics), so a prefix is
+    a bisect range;
+  - the display payload of every row, so answers never touch the DB;
+  - token -> pks and trigram -> tokens maps for the fuzzy fallback.
+
+Lookups: every query term must prefix-match a word of the row. Rows come
+out in (matched word, pk) order, i.e. exact words first, and the scan stops
+after `limit` rows. When that yields fewer than `limit` rows, terms are
+also matched fuzzily: words sharing a trigram with the term are candidates,
+accepted when their trigram similarity reaches AUTOCOMPLETE_FUZZY_THRESHOLD
+or they are one or two typos away (edit distance with transpositions, also
+against the word's prefix of the same length), so "jhon" and "smiht" find
+"John Smith".
+
+The index is built on first use, updated in place from post_save /
+post_delete and rebuilt after AUTOCOMPLETE_INDEX_TTL seconds to pick up
+writes from other processes or bulk operations. A rebuild reads the rows
+into fresh structures without holding the lock, so lookups keep being
+answered from the previous index meanwhile, and swaps them in at the end.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Course, User
+from .search import tokenize
+
+# trigrams shared by more words than this carry no signal and are skipped
+MAX_TRIGRAM_TOKENS = 2000
+HIGHEST = "\U0010ffff"
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """
+    Optimal string alignment distance (Levenshtein plus transpositions).
+    """
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def allowed_typos(term):
+    return 0 if len(term) < 3 else 1 if len(term) < 6 else 2
+
+
+class AutocompleteIndex:
+    def __init__(self, model, fields, display_fields):
+        self.model = model
+        self.fields = fields
+        self.display_fields = display_fields
+        self.columns = list(dict.fromkeys(["pk", *display_fields, *fields]))
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._built_at = None
+        self._pending = None  # pk -> row or None (deleted), saved during a rebuild
+        self._keys = []  # sorted (token, pk)
+        self._rows = {}  # pk -> (tokens, payload)
+        self._token_pks = {}  # token -> {pk}
+        self._trigrams = {}  # trigram -> {token}
+
+    @property
+    def ttl(self):
+        return getattr(settings, "AUTOCOMPLETE_INDEX_TTL", 600)
+
+    @property
+    def fuzzy_threshold(self):
+        return getattr(settings, "AUTOCOMPLETE_FUZZY_THRESHOLD", 0.4)
+
+    # --- maintenance --------------------------------------------------------
+
+    def _entry(self, row):
+        tokens = set()
+        for field in self.fields:
+            tokens.update(tokenize(row[field]))
+        return frozenset(tokens), {field: row[field] for field in self.display_fields}
+
+    def _is_fresh(self):
+        return self._built_at is not None and time.monotonic() - self._built_at < self.ttl
+
+    def _ensure_built(self):
+        if self._is_fresh():
+            return
+        # one rebuild at a time; only the very first build makes others wait
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self._is_fresh():
+                return
+            with self._lock:
+                self._pending = {}
+            fresh = self._load()
+            with self._lock:
+                self._keys, self._rows = fresh._keys, fresh._rows
+                self._token_pks, self._trigrams = fresh._token_pks, fresh._trigrams
+                # writes seen while loading may be missing from the rows read
+                for pk, row in self._pending.items():
+                    self._remove(pk)
+                    if row is not None:
+                        self._add(pk, *self._entry(row))
+                self._pending = None
+                self._built_at = time.monotonic()
+        finally:
+            self._build_lock.release()
+
+    def _load(self):
+        """
+        A new, unshared index filled from the database.
+        """
+        fresh = type(self)(self.model, self.fields, self.display_fields)
+        for values in self.model.objects.values_list(*self.columns).iterator(chunk_size=2000):
+            fresh._add(values[0], *fresh._entry(dict(zip(self.columns, values))), sort=False)
+        fresh._keys.sort()
+        return fresh
+
+    def _add(self, pk, tokens, payload, sort=True):
+        self._rows[pk] = (tokens, payload)
+        for token in tokens:
+            if sort:
+                insort(self._keys, (token, pk))
+            else:
+                self._keys.append((token, pk))
+            pks = self._token_pks.get(token)
+            if pks is None:
+                pks = self._token_pks[token] = set()
+                for trigram in trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+            pks.add(pk)
+
+    def _remove(self, pk):
+        tokens, _ = self._rows.pop(pk, (frozenset(), None))
+        for token in tokens:
+            position = bisect_left(self._keys, (token, pk))
+            if position < len(self._keys) and self._keys[position] == (token, pk):
+                del self._keys[position]
+            pks = self._token_pks.get(token)
+            if pks is not None:
+                pks.discard(pk)
+                if not pks:
+                    del self._token_pks[token]
+                    for trigram in trigrams(token):
+                        self._trigrams.get(trigram, set()).discard(token)
+
+    def update(self, instance):
+        row = {column: getattr(instance, column) for column in self.columns}
+        with self._lock:
+            if self._pending is not None:
+                self._pending[instance.pk] = row
+            if self._built_at is None:
+                return
+            self._remove(instance.pk)
+            self._add(instance.pk, *self._entry(row))
+
+    def delete(self, pk):
+        with self._lock:
+            if self._pending is not None:
+                self._pending[pk] = None
+            if self._built_at is not None:
+                self._remove(pk)
+
+    def reset(self):
+        """
+        Drop the index; the next query rebuilds it.
+        """
+        with self._lock:
+            self._built_at = None
+            self._keys, self._rows, self._token_pks, self._trigrams = [], {}, {}, {}
+
+    # --- lookups ------------------------------------------------------------
+
+    def _prefix_range(self, term):
+        return bisect_left(self._keys, (term,)), bisect_left(self._keys, (term + HIGHEST,))
+
+    def _prefix_matches(self, terms, limit):
+        # drive the scan with the term that has the fewest (token, pk) entries
+        ranges = sorted(
+            (end - start, start, end, term)
+            for term in set(terms)
+            for start, end in [self._prefix_range(term)]
+        )
+        _, start, end, _ = ranges[0]
+        others = [term for _, _, _, term in ranges[1:]]
+
+        found = []
+        seen = set()
+        for position in range(start, end):
+            pk = self._keys[position][1]
+            if pk in seen:
+                continue
+            seen.add(pk)
+            tokens = self._rows[pk][0]
+            if all(any(token.startswith(term) for token in tokens) for term in others):
+                found.append(pk)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _similar_tokens(self, term):
+        """
+        {token: similarity in (0, 1)} for words close to `term`.
+        """
+        grams = trigrams(term)
+        shared = Counter()
+        for trigram in grams:
+            tokens = self._trigrams.get(trigram, ())
+            if len(tokens) <= MAX_TRIGRAM_TOKENS:
+                shared.update(tokens)
+
+        typos = allowed_typos(term)
+        similar = {}
+        for token, common in shared.items():
+            score = common / (len(grams) + len(trigrams(token)) - common)
+            if score < self.fuzzy_threshold and typos:
+                distance = min(edit_distance(term, token), edit_distance(term, token[: len(term)]))
+                if distance <= typos:
+                    score = max(score, 1 - distance / (len(term) + 1))
+            if score >= self.fuzzy_threshold or score > 0.5:
+                # below 1.0, so exact prefix matches always rank first
+                similar[token] = min(score, 0.99)
+        return similar
+
+    def _fuzzy_matches(self, terms, limit, exclude):
+        scores = None
+        for term in terms:
+            term_scores = {}
+            start, end = self._prefix_range(term)
+            for _, pk in self._keys[start:end]:
+                term_scores[pk] = 1.0
+            for token, score in self._similar_tokens(term).items():
+                for pk in self._token_pks[token]:
+                    term_scores[pk] = max(term_scores.get(pk, 0), score)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+            if not scores:
+                return []
+        ranked = heapq.nsmallest(limit, ((-score, pk) for pk, score in scores.items() if pk not in exclude))
+        return [pk for _, pk in ranked]
+
+    def query(self, text, limit=10):
+        """
+        Return ([payload, ...], fuzzy) with at most `limit` rows; `fuzzy` is
+        True when some rows came from the trigram fallback.
+        """
+        terms = tokenize(text)
+        if not terms or limit < 1:
+            return [], False
+        self._ensure_built()
+        with self._lock:
+            pks = self._prefix_matches(terms, limit)
+            fuzzy = False
+            if len(pks) < limit:
+                extra = self._fuzzy_matches(terms, limit - len(pks), set(pks))
+                fuzzy = bool(extra)
+                pks += extra
+            return [self._rows[pk][1] for pk in pks], fuzzy
+
+
+users = AutocompleteIndex(User, ["firstname", "lastname", "login"], ["id", "firstname", "lastname", "login"])
+courses = AutocompleteIndex(Course, ["title"], ["id", "title"])
+
+INDEXES = {User: users, Course: courses}
+
+
+def reset_indexes():
+    for index in INDEXES.values():
+        index.reset()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Course)
+def update_autocomplete(sender, instance, **kwargs):
+    INDEXES[sender].update(instance)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Course)
+def delete_from_autocomplete(sender, instance, **kwargs):
+    INDEXES[sender].delete(instance.pk)
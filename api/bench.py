@@ -0,0 +1,584 @@
+"""
+Synthetic data and a load benchmark for the API.
+
+`generate()` fills the database with a deterministic (seeded) school:
+courses, groups, students, tests with questions, solves, attendance,
+payments, applications, lessons and the landing page tables, sized by a
+scale factor. Rows are written with bulk_create in batches, so no signals
+run – Balance / StudentSummary rows are not maintained (`manage.py
+seed_bench` rebuilds them afterwards). auto_now_add fields are overwritten
+by bulk_create, so their spread-out values are written back with
+bulk_update.
+
+`router_endpoints()` + `run_benchmark()` drive every GET route of the
+router through the Django test client and collect latency percentiles
+and query counts per endpoint (`manage.py bench_api`).
+
+`run_concurrency_benchmark()` keeps a fixed number of requests in flight
+against the WSGI application, Django's stock ASGI handler and the async
+views of website.asgi, and reports throughput per endpoint
+(`manage.py bench_concurrency`).
+"""
+import asyncio
+import datetime
+import io
+import json
+import math
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.views import APIView
+
+from .async_views import AsyncReadMixin
+from .models import (
+    FAQ, Application, ContactInfo, ContactStats, Course, CourseIncluded,
+    CourseProcess, Group, Integration, Journal, Lesson, Material, Partner,
+    Payment, Question, StudentSolve, SuccessStory, Team, Test, User,
+)
+
+# rows per unit of scale
+SIZES = {
+    "courses": 10,
+    "groups_per_course": 5,
+    "users": 1000,
+    "tests_per_course": 5,
+    "questions_per_test": 10,
+    "solves_per_user": 5,
+    "lessons_per_group": 30,
+    "payments_per_user": 5,
+    "applications": 2000,
+    "success_stories": 100,
+    "lessons_per_course": 20,
+    "integrations": 10,
+    "landing_rows": 20,
+}
+HISTORY_DAYS = 730
+
+
+def _create(model, objects, batch_size):
+    return model.objects.bulk_create(objects, batch_size=batch_size)
+
+
+def _backdate(model, objects, field, values, batch_size):
+    for obj, value in zip(objects, values):
+        setattr(obj, field, value)
+    model.objects.bulk_update(objects, [field], batch_size=batch_size)
+
+
+def generate(scale=1, seed=0, batch_size=1000, stdout=None):
+    """
+    Create a synthetic dataset and return {model name: rows created}.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    today = timezone.localdate()
+    scaled = lambda name: max(int(SIZES[name] * scale), 1)  # noqa: E731
+    counts = {}
+
+    def log(name, objects):
+        counts[name] = len(objects)
+        if stdout is not None:
+            stdout.write(f"  {name}: {len(objects)}")
+
+    def past(days=HISTORY_DAYS):
+        return now - datetime.timedelta(seconds=rng.randrange(days * 86400))
+
+    # keep emails / logins unique across repeated runs
+    offset = (User.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    with transaction.atomic():
+        courses = _create(Course, [
+            Course(
+                title=f"Course {i}",
+                description=f"Synthetic course {i}",
+                classes=rng.randint(12, 96),
+                price=Decimal(rng.randrange(100, 1000) * 10),
+            )
+            for i in range(scaled("courses"))
+        ], batch_size)
+        log("courses", courses)
+
+        groups = _create(Group, [
+            Group(
+                title=f"{course.title} / {i}",
+                starting_date=today - datetime.timedelta(days=rng.randrange(HISTORY_DAYS)),
+                course=course,
+                archived=rng.random() < 0.3,
+            )
+            for course in courses
+            for i in range(SIZES["groups_per_course"])
+        ], batch_size)
+        log("groups", groups)
+
+        users = _create(User, [
+            User(
+                firstname=f"Student{n}",
+                lastname=rng.choice(["Smith", "Karimov", "Lee", "Garcia", "Ivanova", "Tashkentov"]),
+                email=f"bench{n}@example.com",
+                login=f"bench{n}",
+                password="!",
+                # the first one is always an admin (bench_api logs in as it)
+                role=User.Role.ADMIN if n == offset or rng.random() < 0.01 else User.Role.STUDENT,
+                group=rng.choice(groups),
+                status=rng.choice(User.Status.values),
+            )
+            for n in range(offset, offset + scaled("users"))
+        ], batch_size)
+        log("users", users)
+
+        tests = _create(Test, [
+            Test(course=course, title=f"{course.title} test {i}")
+            for course in courses
+            for i in range(SIZES["tests_per_course"])
+        ], batch_size)
+        log("tests", tests)
+
+        questions = _create(Question, [
+            Question(
+                test=test,
+                title=f"Question {i}",
+                type=Question.QuestionType.ONE,
+                correct="a",
+                incorrect1="b",
+                incorrect2="c",
+                incorrect3="d",
+            )
+            for test in tests
+            for i in range(SIZES["questions_per_test"])
+        ], batch_size)
+        log("questions", questions)
+
+        tests_by_course = {}
+        for test in tests:
+            tests_by_course.setdefault(test.course_id, []).append(test)
+        questions_by_test = {}
+        for question in questions:
+            questions_by_test.setdefault(question.test_id, []).append(question.pk)
+        group_course = {group.pk: group.course_id for group in groups}
+        solves = []
+        for user in users:
+            course_tests = tests_by_course[group_course[user.group_id]]
+            for test in rng.sample(course_tests, min(SIZES["solves_per_user"], len(course_tests))):
+                # stored like api.grading does, so `manage.py regrade` can grade them
+                answers = {str(pk): rng.choice("abcd") for pk in questions_by_test[test.pk]}
+                solves.append(StudentSolve(
+                    user=user,
+                    test=test,
+                    solve=json.dumps(answers),
+                    solve_typed="{}",
+                    solve_status=list(answers.values()).count("a") >= len(answers) * 0.6,
+                ))
+        solves = _create(StudentSolve, solves, batch_size)
+        _backdate(StudentSolve, solves, "created_at", [past() for _ in solves], batch_size)
+        log("solves", solves)
+
+        members = {}
+        for user in users:
+            members.setdefault(user.group_id, []).append(user)
+        journal = []
+        for group in groups:
+            for day in range(SIZES["lessons_per_group"]):
+                date = group.starting_date + datetime.timedelta(days=day * 2)
+                journal.extend(
+                    Journal(group=group, user=user, date=date, status=rng.random() < 0.85)
+                    for user in members.get(group.pk, [])
+                )
+        journal = _create(Journal, journal, batch_size)
+        log("journal", journal)
+
+        payments = _create(Payment, [
+            Payment(
+                user=user,
+                type=rng.choice(Payment.PaymentType.values),
+                payed=Decimal(rng.randrange(10, 300) * 10),
+                discount=Decimal(rng.choice([0, 0, 0, 50, 100])),
+                status=rng.choice(Payment.Status.values),
+            )
+            for user in users
+            for _ in range(rng.randint(0, SIZES["payments_per_user"] * 2))
+        ], batch_size)
+        _backdate(Payment, payments, "date", [past() for _ in payments], batch_size)
+        log("payments", payments)
+
+        applications = _create(Application, [
+            Application(
+                firstname=f"Applicant{i}",
+                lastname="Bench",
+                # some applicants end up as students (funnel)
+                email=rng.choice(users).email if rng.random() < 0.2 else f"applicant{offset}-{i}@example.com",
+                course=rng.choice(courses),
+            )
+            for i in range(scaled("applications"))
+        ], batch_size)
+        _backdate(Application, applications, "date", [past() for _ in applications], batch_size)
+        log("applications", applications)
+
+        stories = _create(SuccessStory, [
+            SuccessStory(
+                user=rng.choice(users),
+                description="Synthetic success story",
+                rate=Decimal(rng.randint(30, 50)) / 10,
+                published=rng.random() < 0.5,
+            )
+            for _ in range(scaled("success_stories"))
+        ], batch_size)
+        log("success_stories", stories)
+
+        materials = _create(Material, [
+            Material(title=f"Material {i}", source=f"https://example.com/materials/{i}.pdf",
+                     type=rng.choice(Material.MaterialType.values))
+            for i in range(scaled("lessons_per_course"))
+        ], batch_size)
+        log("materials", materials)
+
+        lessons = _create(Lesson, [
+            Lesson(title=f"{course.title} lesson {i}", description="Synthetic lesson",
+                   material=rng.choice(materials), course=course)
+            for course in courses
+            for i in range(SIZES["lessons_per_course"])
+        ], batch_size)
+        log("lessons", lessons)
+
+        admins = [user for user in users if user.role == User.Role.ADMIN]
+        integrations = []
+        for i in range(scaled("integrations")):
+            api_key = f"bench-{offset}-{i}-{rng.getrandbits(64):016x}"
+            # bulk_create skips Integration.save(), which fills the hash
+            integrations.append(Integration(
+                user=rng.choice(admins), title=f"Integration {i}",
+                api_key=api_key, api_key_hash=Integration.hash_key(api_key),
+            ))
+        integrations = _create(Integration, integrations, batch_size)
+        log("integrations", integrations)
+
+        landing = SIZES["landing_rows"]
+        log("course_included", _create(CourseIncluded, [
+            CourseIncluded(course=course, title=f"Included {i}")
+            for course in courses for i in range(4)
+        ], batch_size))
+        log("course_process", _create(CourseProcess, [
+            CourseProcess(course=course, rank=rank, title=f"Step {rank}")
+            for course in courses for rank in range(1, 5)
+        ], batch_size))
+        log("team", _create(Team, [
+            Team(fullname=f"Mentor {i}", speciality="Mentor") for i in range(landing)
+        ], batch_size))
+        log("partners", _create(Partner, [
+            Partner(name=f"Partner {i}") for i in range(landing)
+        ], batch_size))
+        log("faq", _create(FAQ, [
+            FAQ(question=f"Question {i}?", answer="Synthetic answer") for i in range(landing)
+        ], batch_size))
+        log("contact_stats", _create(ContactStats, [
+            ContactStats(avg_response=1.5, satisfaction=97, students=len(users))
+        ], batch_size))
+        log("contact_info", _create(ContactInfo, [
+            ContactInfo(email="info@example.com", phone="+998 00 000 00 00", address="Tashkent",
+                        workTimeInDT="09:00-18:00", workTimeinUST="04:00-13:00")
+        ], batch_size))
+
+    return counts
+
+
+def router_endpoints(router):
+    """
+    [(name, url)] for every GET route of `router`: list, retrieve (first
+    object) and GET extra actions.
+    """
+    endpoints = []
+    for prefix, viewset, _ in router.registry:
+        base = f"/{prefix}/"
+        obj = None
+        queryset = getattr(viewset, "queryset", None)
+        if queryset is not None:
+            obj = queryset.model._default_manager.order_by("pk").first()
+        lookup = getattr(obj, getattr(viewset, "lookup_field", "pk"), None)
+
+        if hasattr(viewset, "list"):
+            endpoints.append((f"{prefix} list", base))
+        if hasattr(viewset, "retrieve") and lookup is not None:
+            endpoints.append((f"{prefix} retrieve", f"{base}{lookup}/"))
+        for extra in viewset.get_extra_actions():
+            if "get" not in extra.mapping:
+                continue
+            if extra.detail:
+                if lookup is None:
+                    continue
+                endpoints.append((f"{prefix} {extra.url_path}", f"{base}{lookup}/{extra.url_path}/"))
+            else:
+                endpoints.append((f"{prefix} {extra.url_path}", f"{base}{extra.url_path}/"))
+    return endpoints
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def _request(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = client.get(url, HTTP_ACCEPT="application/json")
+        size = len(b"".join(response.streaming_content) if response.streaming else response.content)
+        elapsed = (time.perf_counter() - started) * 1000
+    return response.status_code, elapsed, len(queries), size
+
+
+def run_benchmark(client, endpoints, repeat=20, warmup=1):
+    """
+    GET each endpoint `warmup` + `repeat` times and return
+    {name: {url, status, p50_ms, p95_ms, p99_ms, mean_ms, queries, queries_max, bytes}}.
+    Endpoints answering anything but 200 get {url, status, error: True} only.
+
+    Throttling is switched off for the run; response caches stay on, so
+    the percentiles reflect warm caches like a busy production process.
+    """
+    report = {}
+    with mock.patch.object(APIView, "check_throttles", lambda self, request: None):
+        for name, url in endpoints:
+            for _ in range(warmup):
+                _request(client, url)
+            samples = [_request(client, url) for _ in range(repeat)]
+            statuses = {status for status, _, _, _ in samples}
+            if statuses != {200}:
+                # error pages are not timings of the endpoint
+                report[name] = {"url": url, "status": max(statuses - {200}), "error": True}
+                continue
+            timings = [elapsed for _, elapsed, _, _ in samples]
+            queries = [count for _, _, count, _ in samples]
+            report[name] = {
+                "url": url,
+                "status": samples[-1][0],
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p95_ms": round(percentile(timings, 95), 3),
+                "p99_ms": round(percentile(timings, 99), 3),
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "queries": int(statistics.median(queries)),
+                "queries_max": max(queries),
+                "bytes": samples[-1][3],
+            }
+    return report
+
+
+def compare_reports(old, new, threshold=1.25):
+    """
+    [(name, message)] for endpoints whose p95 grew by more than `threshold`
+    times or that run more queries than in `old`.
+    """
+    regressions = []
+    for name, current in sorted(new["endpoints"].items()):
+        previous = old.get("endpoints", {}).get(name)
+        if previous is None or previous.get("error") or current.get("error"):
+            continue
+        if current["queries_max"] > previous["queries_max"]:
+            regressions.append((name, f"queries {previous['queries_max']} -> {current['queries_max']}"))
+        if current["p95_ms"] > previous["p95_ms"] * threshold:
+            regressions.append((name, f"p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"))
+    return regressions
+
+
+# --- concurrency: WSGI vs ASGI ----------------------------------------------
+
+def async_endpoints(router):
+    """
+    router_endpoints() limited to the list/retrieve routes of viewsets with
+    async views (api.async_views.AsyncReadMixin).
+    """
+    prefixes = {
+        prefix for prefix, viewset, _ in router.registry if issubclass(viewset, AsyncReadMixin)
+    }
+    endpoints = []
+    for name, url in router_endpoints(router):
+        prefix, action = name.rsplit(" ", 1)
+        if prefix in prefixes and action in ("list", "retrieve"):
+            endpoints.append((name, url))
+    return endpoints
+
+
+def bench_host():
+    """
+    A Host header the configured ALLOWED_HOSTS accept; "localhost" when the
+    list is empty (DEBUG) or only has wildcards.
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def wsgi_get(application, url, host="localhost"):
+    """
+    GET `url` from a WSGI application the way a server thread would;
+    returns the status code.
+    """
+    path, _, query = url.partition("?")
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": host,
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    statuses = []
+    result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in result:
+            pass
+    finally:
+        # sends request_finished, which closes the DB connection
+        result.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_get(application, url, host="localhost"):
+    """
+    GET `url` from an ASGI application the way a server would; returns the
+    status code.
+    """
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", host.encode()), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": (host, 80),
+    }
+    body_sent = False
+    finished = asyncio.Event()
+    statuses = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+        elif not message.get("more_body"):
+            finished.set()
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+def _drive_wsgi(application, url, requests, connections, threads, host):
+    """
+    `connections` clients share a server pool of `threads` threads: a new
+    request is issued whenever one completes, so `connections` requests
+    are always in flight and the surplus waits for a thread.
+    """
+    in_flight = threading.BoundedSemaphore(connections)
+    timings, statuses = [], []
+    lock = threading.Lock()
+
+    def request(issued):
+        try:
+            status = wsgi_get(application, url, host)
+            with lock:
+                timings.append((time.perf_counter() - issued) * 1000)
+                statuses.append(status)
+        finally:
+            in_flight.release()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi") as pool:
+        for _ in range(requests):
+            in_flight.acquire()
+            pool.submit(request, time.perf_counter())
+    return time.perf_counter() - started, timings, statuses
+
+
+async def _drive_asgi(application, url, requests, connections, host):
+    """
+    `connections` clients on one event loop, each sending its next request
+    as soon as the previous response is complete.
+    """
+    remaining = requests
+    timings, statuses = [], []
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            issued = time.perf_counter()
+            statuses.append(await asgi_get(application, url, host))
+            timings.append((time.perf_counter() - issued) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return time.perf_counter() - started, timings, statuses
+
+
+def run_concurrency_benchmark(applications, endpoints, requests=2000, connections=500,
+                              wsgi_threads=32, warmup=20, host=None):
+    """
+    Send `requests` GETs per endpoint with `connections` of them in flight
+    to each of `applications` ({name: (kind, app)}, kind "wsgi" or "asgi")
+    and return {endpoint: {url, <name>: {requests_per_s, p50_ms, p95_ms,
+    p99_ms, errors}}}.
+
+    Latency is measured from issuing a request to its complete response, so
+    it includes the time spent waiting for a free WSGI thread. Throttling is
+    switched off for the run; response caches stay on. Requests are sent
+    to `host`, by default bench_host().
+    """
+    host = host or bench_host()
+    report = {}
+    with mock.patch.object(APIView, "check_throttles", lambda self, request: None):
+        for name, url in endpoints:
+            row = report[name] = {"url": url}
+            for label, (kind, application) in applications.items():
+                if kind == "wsgi":
+                    _drive_wsgi(application, url, warmup, min(connections, warmup), wsgi_threads, host)
+                    elapsed, timings, statuses = _drive_wsgi(
+                        application, url, requests, connections, wsgi_threads, host,
+                    )
+                else:
+                    asyncio.run(_drive_asgi(application, url, warmup, min(connections, warmup), host))
+                    elapsed, timings, statuses = asyncio.run(
+                        _drive_asgi(application, url, requests, connections, host)
+                    )
+                row[label] = {
+                    "requests_per_s": round(len(timings) / elapsed, 1),
+                    "p50_ms": round(percentile(timings, 50), 3),
+                    "p95_ms": round(percentile(timings, 95), 3),
+                    "p99_ms": round(percentile(timings, 99), 3),
+                    "errors": sum(status != 200 for status in statuses),
+                }
+    return report
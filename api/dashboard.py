@@ -0,0 +1,149 @@
+"""
+Student dashboard aggregates.
+
+By default everything is computed by the database in a single query: the
+user row (with group and course) is annotated with scalar subqueries that
+count Journal/StudentSolve rows and sum Payment.payed and the payment
+credit (api.ledger: payed plus the cash discount) for that user.
+
+With STUDENT_DASHBOARD_MATERIALIZED = True the same numbers are read from
+StudentSummary instead. Its rows are recomputed per user (after commit)
+whenever one of their Journal/StudentSolve/Payment rows is written, so the
+cost of a write is one small aggregate over that user's rows and a read at
+peak is a single row. Run `manage.py refresh_dashboards` after enabling it.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ledger import CENT, credit_expression
+from .models import Journal, Payment, StudentSolve, StudentSummary, User
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def is_materialized():
+    return getattr(settings, "STUDENT_DASHBOARD_MATERIALIZED", False)
+
+
+def _per_user(queryset, aggregate, output_field):
+    subquery = (
+        queryset.filter(user=OuterRef("pk"))
+        .order_by()
+        .values("user")
+        .annotate(value=aggregate)
+        .values("value")
+    )
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def annotate_aggregates(queryset):
+    """
+    Annotate a User queryset with the dashboard aggregates (no extra queries).
+    """
+    count = IntegerField()
+    return queryset.annotate(
+        attendance_total=_per_user(Journal.objects.all(), Count("pk"), count),
+        attendance_present=_per_user(Journal.objects.filter(status=True), Count("pk"), count),
+        solves_passed=_per_user(StudentSolve.objects.filter(solve_status=True), Count("pk"), count),
+        solves_failed=_per_user(StudentSolve.objects.filter(solve_status=False), Count("pk"), count),
+        payed_total=_per_user(Payment.objects.all(), Sum("payed"), MONEY),
+        credited_total=_per_user(Payment.objects.all(), Sum(credit_expression()), MONEY),
+    )
+
+
+def dashboard_queryset(queryset=None):
+    queryset = User.objects.all() if queryset is None else queryset
+    queryset = queryset.select_related("group__course")
+    if is_materialized():
+        return queryset.select_related("summary")
+    return annotate_aggregates(queryset)
+
+
+def build_dashboard(user):
+    """
+    Serialize a user from dashboard_queryset() into the dashboard payload.
+    """
+    source = user
+    if is_materialized():
+        source = getattr(user, "summary", None)
+        if source is None:
+            source = refresh_summaries([user.pk])[user.pk]
+
+    group = user.group
+    course = group.course if group else None
+    price = Decimal(course.price if course else 0).quantize(CENT)
+    attendance_total = source.attendance_total
+    payed_total = Decimal(source.payed_total or 0).quantize(CENT)
+    # owed as in api.ledger, so the dashboard agrees with /balances/
+    due = max(price - Decimal(source.credited_total or 0), Decimal("0")).quantize(CENT)
+
+    return {
+        "user": user.pk,
+        "firstname": user.firstname,
+        "lastname": user.lastname,
+        "status": user.status,
+        "group": {"id": group.pk, "title": group.title} if group else None,
+        "course": {"id": course.pk, "title": course.title} if course else None,
+        "attendance": {
+            "total": attendance_total,
+            "present": source.attendance_present,
+            "rate": round(source.attendance_present / attendance_total, 4) if attendance_total else None,
+        },
+        "tests": {
+            "passed": source.solves_passed,
+            "failed": source.solves_failed,
+        },
+        "payments": {
+            # strings, like DecimalField in the serializers
+            "payed": str(payed_total),
+            "price": str(price),
+            "due": str(due),
+        },
+    }
+
+
+def refresh_summaries(user_ids):
+    """
+    Recompute StudentSummary rows for the given users. Returns {user_id: row}.
+    """
+    fields = [
+        "attendance_total", "attendance_present", "solves_passed", "solves_failed",
+        "payed_total", "credited_total",
+    ]
+    users = annotate_aggregates(User.objects.filter(pk__in=user_ids)).values("pk", *fields)
+    summaries = {row["pk"]: StudentSummary(user_id=row["pk"], **{f: row[f] for f in fields}) for row in users}
+    StudentSummary.objects.bulk_create(
+        summaries.values(),
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=fields + ["updated_at"],
+    )
+    return summaries
+
+
+def schedule_refresh(user_ids):
+    """
+    Refresh the given users' summaries once the current transaction commits.
+    Bulk writers (which bypass signals) should call this with all ids at once.
+    """
+    if not is_materialized():
+        return
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: refresh_summaries(user_ids))
+
+
+@receiver(post_save, sender=Journal)
+@receiver(post_delete, sender=Journal)
+@receiver(post_save, sender=StudentSolve)
+@receiver(post_delete, sender=StudentSolve)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_dashboard_summary(sender, instance, **kwargs):
+    schedule_refresh([instance.user_id])
@@ -0,0 +1,51 @@
+"""
+Streaming CSV / NDJSON exports.
+
+ExportMixin adds GET /<resource>/export/?format=csv|ndjson to a viewset.
+Rows come from the viewset's own get_queryset() + filter backends (so
+?user=, ?group=, ?ordering= etc. behave like the list endpoint) and are
+read as plain values_list() tuples with iterator(), i.e. a server-side
+cursor where the database supports it, fetched `export_chunk_size` rows at
+a time. Memory stays flat no matter how many rows are exported.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
+
+from .renderers import CSVRenderer, NDJSONRenderer
+
+
+def streaming_export(renderer, fields, rows, filename):
+    if not hasattr(renderer, "stream"):
+        renderer = NDJSONRenderer()
+    response = StreamingHttpResponse(
+        renderer.stream(fields, rows),
+        content_type=f"{renderer.media_type}; charset={renderer.charset}",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{renderer.format}"'
+    return response
+
+
+class ExportMixin:
+    """
+    `export_fields` – [(column name, model field / lookup), ...]
+    `export_chunk_size` – rows fetched from the cursor per round trip
+    """
+
+    export_fields = None
+    export_chunk_size = 2000
+
+    @action(
+        detail=False,
+        methods=["get"],
+        renderer_classes=[NDJSONRenderer, CSVRenderer, JSONRenderer],
+    )
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = [column for column, _ in self.export_fields]
+        rows = (
+            queryset.select_related(None)
+            .values_list(*(lookup for _, lookup in self.export_fields))
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        return streaming_export(request.accepted_renderer, columns, rows, self.basename)
@@ -0,0 +1,307 @@
+"""
+Server-side grading of StudentSolve submissions.
+
+Each Test is compiled once into an AnswerKey (question id -> expected
+answer) and kept in a process-local cache, so grading a whole submission
+costs no queries once the key is warm. The cache is invalidated whenever a
+Question of the test is saved or deleted (see the receivers at the bottom),
+and entries also expire after GRADING_ANSWER_KEY_TTL seconds so other
+worker processes pick up edits made elsewhere.
+
+Stored format of a graded StudentSolve:
+  - solve        – JSON {"<question_id>": "answer" | ["a", "b"]} for ONE/MULTI
+  - solve_typed  – JSON {"<question_id>": "text"} for TYPED
+"""
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .dashboard import schedule_refresh
+from .jobs import task
+from .models import Question, StudentSolve, Test
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_answer(value):
+    """
+    Canonical form of a single answer: trimmed, case-folded, single spaces.
+    """
+    if value is None:
+        return ""
+    return _WHITESPACE.sub(" ", str(value)).strip().casefold()
+
+
+def normalize_choices(value):
+    """
+    Multi-choice answer as a frozenset; accepts a list or "A,B" string.
+    """
+    if value is None:
+        return frozenset()
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, (list, tuple)):
+        # e.g. a number in a legacy stored solve
+        value = [value]
+    return frozenset(filter(None, (normalize_answer(item) for item in value)))
+
+
+class GradeResult:
+    __slots__ = ("correct", "total", "results")
+
+    def __init__(self, correct, total, results):
+        self.correct = correct
+        self.total = total
+        self.results = results
+
+    @property
+    def ratio(self):
+        return self.correct / self.total if self.total else 0.0
+
+    @property
+    def passed(self):
+        return bool(self.total) and self.ratio >= get_pass_ratio()
+
+
+class AnswerKey:
+    """
+    Compiled answers of one Test: {question_id: (type, expected)} where
+    expected is a normalized string (ONE/TYPED) or a frozenset (MULTI).
+    """
+
+    __slots__ = ("test_id", "questions")
+
+    def __init__(self, test_id, questions):
+        self.test_id = test_id
+        self.questions = questions
+
+    @classmethod
+    def from_rows(cls, test_id, rows):
+        questions = {}
+        for question_id, question_type, correct in rows:
+            if question_type == Question.QuestionType.MULTI:
+                expected = normalize_choices(correct)
+            else:
+                expected = normalize_answer(correct)
+            questions[question_id] = (question_type, expected)
+        return cls(test_id, questions)
+
+    def grade(self, answers):
+        """
+        Grade {question_id: answer} in one pass. Unknown question ids are
+        ignored, unanswered questions count as wrong.
+        """
+        answers = {str(key): value for key, value in (answers or {}).items()}
+        results = {}
+        correct = 0
+        for question_id, (question_type, expected) in self.questions.items():
+            given = answers.get(str(question_id))
+            if question_type == Question.QuestionType.MULTI:
+                ok = bool(expected) and normalize_choices(given) == expected
+            else:
+                ok = bool(expected) and normalize_answer(given) == expected
+            results[question_id] = ok
+            correct += ok
+        return GradeResult(correct, len(self.questions), results)
+
+    def split_answers(self, answers):
+        """
+        Return (solve, solve_typed) JSON strings for storing on StudentSolve.
+        """
+        choices, typed = {}, {}
+        for key, value in (answers or {}).items():
+            try:
+                question_id = int(key)
+            except (TypeError, ValueError):
+                continue
+            entry = self.questions.get(question_id)
+            if entry is None:
+                continue
+            if entry[0] == Question.QuestionType.TYPED:
+                typed[str(question_id)] = value
+            else:
+                choices[str(question_id)] = value
+        return json.dumps(choices), json.dumps(typed)
+
+
+def answers_from_solve(solve, solve_typed):
+    """
+    Inverse of AnswerKey.split_answers for a stored StudentSolve.
+    Returns None for legacy rows that were not stored by the grader.
+    """
+    answers = {}
+    for raw in (solve, solve_typed):
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        answers.update(data)
+    return answers
+
+
+def get_pass_ratio():
+    return getattr(settings, "GRADING_PASS_RATIO", 0.6)
+
+
+def compile_answer_keys(test_ids):
+    """
+    Compile answer keys for many tests with a single query.
+    """
+    test_ids = list(test_ids)
+    rows = {test_id: [] for test_id in test_ids}
+    questions = (
+        Question.objects.filter(test_id__in=test_ids)
+        .order_by("test_id", "id")
+        .values_list("test_id", "id", "type", "correct")
+    )
+    for test_id, question_id, question_type, correct in questions:
+        rows[test_id].append((question_id, question_type, correct))
+    return {test_id: AnswerKey.from_rows(test_id, rows[test_id]) for test_id in test_ids}
+
+
+class AnswerKeyCache:
+    """
+    Thread-safe process-local cache of compiled AnswerKeys.
+
+    A per-test version counter guards against storing a key compiled from
+    data that was changed (and invalidated) while the query was running.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._versions = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, "GRADING_ANSWER_KEY_TTL", 300)
+
+    def get(self, test_id):
+        return self.get_many([test_id])[test_id]
+
+    def get_many(self, test_ids):
+        now = time.monotonic()
+        found, missing, versions = {}, [], {}
+        with self._lock:
+            for test_id in test_ids:
+                entry = self._keys.get(test_id)
+                if entry is not None and entry[1] > now:
+                    found[test_id] = entry[0]
+                else:
+                    missing.append(test_id)
+                    versions[test_id] = self._versions.get(test_id, 0)
+
+        if missing:
+            compiled = compile_answer_keys(missing)
+            expires = time.monotonic() + self.ttl
+            with self._lock:
+                for test_id, key in compiled.items():
+                    if self._versions.get(test_id, 0) == versions[test_id]:
+                        self._keys[test_id] = (key, expires)
+            found.update(compiled)
+        return found
+
+    def invalidate(self, test_id):
+        with self._lock:
+            self._keys.pop(test_id, None)
+            self._versions[test_id] = self._versions.get(test_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            for test_id in self._keys:
+                self._versions[test_id] = self._versions.get(test_id, 0) + 1
+            self._keys.clear()
+
+
+answer_keys = AnswerKeyCache()
+
+
+def grade_submission(test_id, answers):
+    """
+    Grade a whole test submission against the cached answer key.
+    Returns (answer_key, GradeResult).
+    """
+    key = answer_keys.get(test_id)
+    return key, key.grade(answers)
+
+
+def grade_stored_solve(test_id, solve, solve_typed):
+    """
+    Grade the stored `solve` / `solve_typed` columns of a StudentSolve.
+    Returns whether it passed, or None for answers not in the grader's format.
+    """
+    answers = answers_from_solve(solve, solve_typed)
+    if answers is None:
+        return None
+    return grade_submission(test_id, answers)[1].passed
+
+
+def regrade_solves(test_ids, chunk_size=2000, dry_run=False):
+    """
+    Regrade every StudentSolve of the given tests against freshly compiled
+    answer keys (the cache is bypassed on purpose, a regrade usually follows
+    a fix to Question.correct).
+
+    Rows are streamed with iterator() and only changed solve_status values
+    are written back with bulk_update, one batch per chunk, and the dashboard
+    summaries of their users are refreshed. Legacy rows whose
+    answers were not stored by the grader are left untouched.
+    Returns (scanned, changed).
+    """
+    keys = compile_answer_keys(test_ids)
+    rows = (
+        StudentSolve.objects.filter(test_id__in=keys.keys())
+        .order_by("test_id", "id")
+        .values_list("id", "test_id", "user_id", "solve", "solve_typed", "solve_status")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    scanned = changed = 0
+    batch = []
+    for solve_id, test_id, user_id, solve, solve_typed, old_status in rows:
+        scanned += 1
+        answers = answers_from_solve(solve, solve_typed)
+        if answers is None:
+            continue
+        result = keys[test_id].grade(answers)
+        if result.passed != old_status:
+            batch.append(StudentSolve(pk=solve_id, user_id=user_id, solve_status=result.passed))
+        if len(batch) >= chunk_size:
+            changed += _flush(batch, dry_run)
+            batch = []
+    changed += _flush(batch, dry_run)
+    return scanned, changed
+
+
+def _flush(batch, dry_run):
+    if batch and not dry_run:
+        StudentSolve.objects.bulk_update(batch, ["solve_status"], batch_size=500)
+        # bulk_update sends no signals
+        schedule_refresh({solve.user_id for solve in batch})
+    return len(batch)
+
+
+@task("grading.regrade", max_attempts=3)
+def regrade_job(test_ids):
+    # POST /tests/{id}/regrade/; re-running a regrade is harmless
+    regrade_solves(test_ids)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_answer_key(sender, instance, **kwargs):
+    answer_keys.invalidate(instance.test_id)
+
+
+@receiver(post_delete, sender=Test)
+def invalidate_test_answer_key(sender, instance, **kwargs):
+    answer_keys.invalidate(instance.pk)
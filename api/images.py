@@ -0,0 +1,192 @@
+"""
+Resized derivatives of the uploaded images (Course.image_path,
+User.image_path, Team.image, Partner.image).
+
+Saving a row with a new image queues an "images.render_derivatives" job
+(api.jobs); a `manage.py runworkers` worker renders the source at every
+width of IMAGE_DERIVATIVE_WIDTHS (never upscaled) as WebP and JPEG:
+
+    derivatives/<digest[:2]>/<digest>/<width>.webp / <width>.jpg
+    derivatives/<digest[:2]>/<digest>/manifest.json   (written last)
+
+<digest> is the sha256 the source is stored under (api.storage), so an
+image uploaded twice is rendered and stored once, and the request that
+saved it never waits for Pillow.
+
+ImageSrcsetField exposes the derivatives as srcset strings. It reads a
+manifest once per process and digest – derivatives never change – and
+returns None until the manifest exists, so clients fall back to the
+original image.
+
+`manage.py build_image_derivatives` moves images uploaded before the
+content-addressed storage to hashed names and renders what is missing.
+"""
+import io
+import json
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from .jobs import enqueue_once, task
+from .models import Course, Partner, Team, User
+from .response_cache import bump_generation
+from .storage import image_storage, name_digest
+
+IMAGE_FIELDS = {
+    Course: ["image_path"],
+    User: ["image_path"],
+    Team: ["image"],
+    Partner: ["image"],
+}
+
+# srcset key -> (Pillow format, file extension, save options)
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def derivative_widths():
+    return sorted(getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", (320, 640, 1280)))
+
+
+def derivative_dir(digest):
+    return f"derivatives/{digest[:2]}/{digest}"
+
+
+def derivative_name(digest, width, extension):
+    return f"{derivative_dir(digest)}/{width}.{extension}"
+
+
+def manifest_name(digest):
+    return f"{derivative_dir(digest)}/manifest.json"
+
+
+# --- rendering --------------------------------------------------------------
+
+def _encode(image, pillow_format, options):
+    if pillow_format == "JPEG" and image.mode != "RGB":
+        # flatten transparency onto white
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = background
+    output = io.BytesIO()
+    image.save(output, pillow_format, **options)
+    return output.getvalue()
+
+
+def render_derivatives(name):
+    """
+    Render the derivatives of the stored image `name` (if not done yet) and
+    return its manifest, or None for a name that is not content-addressed.
+    """
+    digest = name_digest(name)
+    if digest is None:
+        return None
+    manifest = get_manifest(name)
+    if manifest is not None:
+        return manifest
+
+    with image_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+
+    widths = sorted({min(width, image.width) for width in derivative_widths()})
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for pillow_format, extension, options in FORMATS.values():
+            image_storage.store(
+                derivative_name(digest, width, extension), ContentFile(_encode(resized, pillow_format, options))
+            )
+
+    manifest = {"width": image.width, "height": image.height, "widths": widths, "formats": list(FORMATS)}
+    image_storage.store(manifest_name(digest), ContentFile(json.dumps(manifest).encode()))
+    _manifests[digest] = manifest
+    return manifest
+
+
+# digest -> manifest; only ever grows by one entry per distinct image
+_manifests = {}
+
+
+def get_manifest(name):
+    digest = name_digest(name)
+    if digest is None:
+        return None
+    manifest = _manifests.get(digest)
+    if manifest is None and image_storage.exists(manifest_name(digest)):
+        with image_storage.open(manifest_name(digest)) as file:
+            manifest = _manifests[digest] = json.load(file)
+    return manifest
+
+
+# --- jobs -------------------------------------------------------------------
+
+@task("images.render_derivatives", max_attempts=3)
+def render_derivatives_job(name, label):
+    render_derivatives(name)
+    # cached responses were rendered without a srcset
+    bump_generation(label)
+
+
+def pending_names(instance):
+    names = []
+    for field in IMAGE_FIELDS[type(instance)]:
+        name = getattr(instance, field).name
+        if name and name_digest(name) is not None and get_manifest(name) is None:
+            names.append(name)
+    return names
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Team)
+@receiver(post_save, sender=Partner)
+def render_saved_images(sender, instance, **kwargs):
+    # saves while the derivatives are pending must not pile up jobs
+    for name in pending_names(instance):
+        enqueue_once("images.render_derivatives", name=name, label=sender._meta.label_lower)
+
+
+# --- serializers ------------------------------------------------------------
+
+class ImageSrcsetField(serializers.Field):
+    """
+    Read-only srcsets of an image field:
+
+        {"webp": "<url> 320w, <url> 640w", "jpeg": "...", "width": 1600, "height": 900}
+
+    or None while the derivatives are not rendered yet.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def url(self, name):
+        url = image_storage.url(name)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, value):
+        manifest = get_manifest(value.name) if value else None
+        if manifest is None:
+            return None
+        digest = name_digest(value.name)
+        srcset = {
+            key: ", ".join(
+                f"{self.url(derivative_name(digest, width, FORMATS[key][1]))} {width}w"
+                for width in manifest["widths"]
+            )
+            for key in manifest["formats"]
+            if key in FORMATS
+        }
+        srcset.update(width=manifest["width"], height=manifest["height"])
+        return srcset
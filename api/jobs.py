@@ -0,0 +1,312 @@
+"""
+Durable background jobs stored in the database (api.models.Job).
+
+    @task("applications.notify", max_attempts=3)
+    def notify_application(application_id): ...
+
+    enqueue("applications.notify", application_id=application.pk)
+
+enqueue() inserts the Job row in the caller's transaction, so a job exists
+exactly when the change that asked for it was committed. `manage.py
+runworkers` claims due jobs with one conditional UPDATE each (queued ->
+running), so concurrent workers never run the same job, and runs them in a
+thread or process pool.
+
+A job that raises is retried after JOB_RETRY_BACKOFF * 2**(attempts - 1)
+seconds (capped at JOB_RETRY_MAX_DELAY, plus up to 10% jitter) until it has
+failed max_attempts times; tasks must therefore be idempotent. Jobs left
+running by a dead worker are requeued after JOB_LOCK_TIMEOUT seconds, and
+finished jobs are deleted after JOB_RETENTION_DAYS.
+"""
+import datetime
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+
+import django
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger("api.jobs")
+
+_tasks = {}
+
+
+class Task:
+    def __init__(self, name, func, max_attempts):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+
+
+def task(name, max_attempts=5):
+    """
+    Register the decorated function as the job task `name`. It is called
+    with the enqueued payload as keyword arguments.
+    """
+
+    def register(func):
+        _tasks[name] = Task(name, func, max_attempts)
+        return func
+
+    return register
+
+
+def enqueue(name, /, run_at=None, **payload):
+    """
+    Queue a job; `payload` must be JSON-serializable and cannot use the
+    key "run_at" (the earliest start, default now).
+    """
+    if name not in _tasks:
+        raise ValueError(f"Unknown job task {name!r}.")
+    return Job.objects.create(
+        task=name,
+        payload=payload,
+        max_attempts=_tasks[name].max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def enqueue_once(name, /, run_at=None, **payload):
+    """
+    enqueue() unless a job of `name` with the same payload is still queued;
+    returns that job then.
+    """
+    queued = Job.objects.filter(task=name, status=Job.Status.QUEUED, payload=payload).first()
+    if queued is not None:
+        return queued
+    return enqueue(name, run_at=run_at, **payload)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, "JOB_RETRY_BACKOFF", 10)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, "JOB_RETRY_MAX_DELAY", 3600))
+    return delay * (1 + random.random() / 10)
+
+
+# --- claiming and running ---------------------------------------------------
+
+def requeue_stale(now=None):
+    """
+    Requeue (or fail, when out of attempts) jobs whose worker stopped
+    reporting more than JOB_LOCK_TIMEOUT seconds ago.
+    """
+    now = now or timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING,
+        started_at__lt=now - datetime.timedelta(seconds=getattr(settings, "JOB_LOCK_TIMEOUT", 600)),
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.Status.FAILED, finished_at=now, last_error="Worker lost.",
+    )
+    return failed + stale.update(status=Job.Status.QUEUED, run_at=now, locked_by="")
+
+
+def claim(worker_id, limit):
+    """
+    Mark up to `limit` due jobs as running for `worker_id`; returns their ids.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.Status.QUEUED, run_at__lte=now)
+        .order_by("run_at", "id")
+        .values_list("pk", flat=True)
+    )
+    claimed = []
+    # a few spares, other workers may take some of them first
+    for pk in candidates[: limit * 2]:
+        updated = Job.objects.filter(pk=pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            locked_by=worker_id,
+        )
+        if updated:
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+def execute(job_id):
+    """
+    Run a claimed job and record the outcome. Returns (task, outcome,
+    seconds) with outcome "done", "retry" or "failed".
+    """
+    job = Job.objects.get(pk=job_id)
+    registered = _tasks.get(job.task)
+    started = time.perf_counter()
+    try:
+        if registered is None:
+            raise LookupError(f"No task registered as {job.task!r}.")
+        registered.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if registered is not None and job.attempts < job.max_attempts:
+            outcome = "retry"
+            run_at = now + datetime.timedelta(seconds=retry_delay(job.attempts))
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.Status.QUEUED, run_at=run_at, locked_by="", last_error=error,
+            )
+        else:
+            outcome = "failed"
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.Status.FAILED, finished_at=now, last_error=error,
+            )
+        logger.warning("Job %s #%s attempt %s: %s\n%s", job.task, job.pk, job.attempts, outcome, error)
+    else:
+        outcome = "done"
+        Job.objects.filter(pk=job.pk).update(status=Job.Status.DONE, finished_at=timezone.now())
+    return job.task, outcome, time.perf_counter() - started
+
+
+def _execute_in_pool(job_id):
+    try:
+        return execute(job_id)
+    finally:
+        close_old_connections()
+
+
+def prune(now=None):
+    """
+    Delete jobs that finished more than JOB_RETENTION_DAYS ago.
+    """
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(days=getattr(settings, "JOB_RETENTION_DAYS", 7))
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.Status.DONE, Job.Status.FAILED], finished_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def run_pending(worker_id="inline"):
+    """
+    Run every due job in the calling thread, e.g. in tests. Returns the
+    number of jobs run.
+    """
+    count = 0
+    while True:
+        claimed = claim(worker_id, 1)
+        if not claimed:
+            return count
+        execute(claimed[0])
+        count += 1
+
+
+class Worker:
+    """
+    Claims due jobs while it has free slots and runs them in a pool of
+    `concurrency` threads (or spawned processes, for CPU-bound tasks).
+    """
+
+    def __init__(self, concurrency=4, pool="thread", poll_interval=None, stdout=None):
+        self.concurrency = max(concurrency, 1)
+        self.pool = pool
+        self.poll_interval = poll_interval or getattr(settings, "JOB_POLL_INTERVAL", 1)
+        self.id = f"{socket.gethostname()}:{os.getpid()}"[:100]
+        self.stdout = stdout
+        self.stopping = threading.Event()
+        self.outcomes = {}  # (task, outcome) -> count
+
+    def stop(self):
+        self.stopping.set()
+
+    def make_executor(self):
+        if self.pool == "process":
+            # spawned, not forked: children open their own DB connections.
+            # django.setup must run before this module is unpickled there.
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job-worker")
+
+    def run(self, burst=False):
+        """
+        Work until stop() is called or, with `burst`, until no job is due.
+        """
+        executor = self.make_executor()
+        running = set()
+        last_maintenance = 0
+        try:
+            while not self.stopping.is_set():
+                if time.monotonic() - last_maintenance > 60:
+                    requeue_stale()
+                    prune()
+                    last_maintenance = time.monotonic()
+
+                free = self.concurrency - len(running)
+                claimed = claim(self.id, free) if free else []
+                running.update(executor.submit(_execute_in_pool, pk) for pk in claimed)
+                if not running:
+                    if burst:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                # a full pool waits for a slot; otherwise poll for new jobs
+                timeout = None if len(running) >= self.concurrency else self.poll_interval
+                done, running = wait_futures(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.record(future)
+        finally:
+            for future in wait_futures(running).done:
+                self.record(future)
+            executor.shutdown()
+            close_old_connections()
+
+    def record(self, future):
+        try:
+            name, outcome, seconds = future.result()
+        except Exception:
+            # execute() itself failed (e.g. the database went away); the job
+            # stays running and is requeued after JOB_LOCK_TIMEOUT
+            logger.exception("Job worker error")
+            return
+        self.outcomes[name, outcome] = self.outcomes.get((name, outcome), 0) + 1
+        if self.stdout is not None:
+            self.stdout.write(f"{name}: {outcome} in {seconds * 1000:.0f}ms")
+
+
+# --- stats ------------------------------------------------------------------
+
+def task_stats(since):
+    """
+    Per task: current queue state plus outcomes and durations of the jobs
+    finished since `since`.
+    """
+    now = timezone.now()
+    finished = Q(finished_at__gte=since)
+    duration = ExpressionWrapper(F("finished_at") - F("started_at"), output_field=DurationField())
+    rows = Job.objects.values("task").order_by("task").annotate(
+        queued=Count("pk", filter=Q(status=Job.Status.QUEUED)),
+        due=Count("pk", filter=Q(status=Job.Status.QUEUED, run_at__lte=now)),
+        oldest_due=Min("run_at", filter=Q(status=Job.Status.QUEUED, run_at__lte=now)),
+        running=Count("pk", filter=Q(status=Job.Status.RUNNING)),
+        done=Count("pk", filter=finished & Q(status=Job.Status.DONE)),
+        failed=Count("pk", filter=finished & Q(status=Job.Status.FAILED)),
+        retried=Count("pk", filter=finished & Q(status=Job.Status.DONE, attempts__gt=1)),
+        avg_duration=Avg(duration, filter=finished & Q(status=Job.Status.DONE)),
+        max_duration=Max(duration, filter=finished & Q(status=Job.Status.DONE)),
+    )
+    stats = []
+    for row in rows:
+        oldest_due = row.pop("oldest_due")
+        row["lag_seconds"] = round((now - oldest_due).total_seconds(), 3) if oldest_due else 0
+        for key in ("avg_duration", "max_duration"):
+            value = row.pop(key)
+            row[f"{key}_seconds"] = round(value.total_seconds(), 3) if value is not None else None
+        stats.append(row)
+    return stats
@@ -0,0 +1,184 @@
+"""
+Per-user balance ledger.
+
+Balance rows are kept up to date incrementally inside the transaction of
+every Payment write (Payment.save/delete run in transaction.atomic):
+  - create  – credited += credit(payment)
+  - update  – credited += credit(new) - credit(old), old row read in pre_save
+  - delete  – credited -= credit(payment)
+each applied as a single UPDATE ... SET credited = credited + delta.
+
+charged follows the course price of the user's group and is recomputed
+when a User is created or changes group, and when a Group or a Course
+price changes. `manage.py reconcile_balances`
+recomputes everything from scratch and reports (and optionally fixes)
+drift, e.g. after QuerySet.update() calls, which bypass signals.
+
+A payment's credit is `payed`, plus `discount` as an absolute amount for
+cash payments (the only type the discount applies to).
+"""
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Balance, Course, Group, Payment, User
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+BALANCE_FIELDS = ["charged", "credited", "owed"]
+
+
+def payment_credit(payment_type, payed, discount):
+    credit = payed or ZERO
+    if payment_type == Payment.PaymentType.CASH:
+        credit += discount or ZERO
+    return credit
+
+
+def credit_expression():
+    return Case(
+        When(type=Payment.PaymentType.CASH, then=F("payed") + F("discount")),
+        default=F("payed"),
+        output_field=MONEY,
+    )
+
+
+def annotate_expected(queryset):
+    """
+    Annotate a User queryset with charged / credited / owed from scratch.
+    """
+    credited = (
+        Payment.objects.filter(user=OuterRef("pk"))
+        .order_by()
+        .values("user")
+        .annotate(total=Sum(credit_expression()))
+        .values("total")
+    )
+    return queryset.annotate(
+        charged=Coalesce(F("group__course__price"), Value(ZERO), output_field=MONEY),
+        credited=Coalesce(Subquery(credited, output_field=MONEY), Value(ZERO), output_field=MONEY),
+    ).annotate(owed=F("charged") - F("credited"))
+
+
+def expected_balances(user_ids):
+    """
+    {user_id: (charged, credited, owed)} computed from Payment/Course rows.
+    """
+    rows = annotate_expected(User.objects.filter(pk__in=user_ids)).values_list("pk", *BALANCE_FIELDS)
+    return {pk: tuple(Decimal(value).quantize(CENT) for value in values) for pk, *values in rows}
+
+
+def write_balances(balances):
+    Balance.objects.bulk_create(
+        [
+            Balance(user_id=user_id, charged=charged, credited=credited, owed=owed)
+            for user_id, (charged, credited, owed) in balances.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=BALANCE_FIELDS + ["updated_at"],
+        batch_size=500,
+    )
+
+
+def recompute_balances(user_ids):
+    balances = expected_balances(user_ids)
+    write_balances(balances)
+    return balances
+
+
+def apply_credit(user_id, delta):
+    if not delta:
+        return
+    updated = Balance.objects.filter(user_id=user_id).update(
+        credited=F("credited") + delta,
+        owed=F("owed") - delta,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # first payment of this user (or missing row) – build it from scratch
+        recompute_balances([user_id])
+
+
+@receiver(pre_save, sender=Payment)
+def remember_previous_payment(sender, instance, **kwargs):
+    instance._ledger_previous = None
+    if instance.pk is not None:
+        instance._ledger_previous = (
+            Payment.objects.filter(pk=instance.pk)
+            .values_list("user_id", "type", "payed", "discount")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Payment)
+def update_balance_on_payment_save(sender, instance, created, **kwargs):
+    credit = payment_credit(instance.type, Decimal(instance.payed), Decimal(instance.discount))
+    previous = getattr(instance, "_ledger_previous", None)
+    if previous is None:
+        apply_credit(instance.user_id, credit)
+        return
+
+    old_user_id, old_type, old_payed, old_discount = previous
+    old_credit = payment_credit(old_type, old_payed, old_discount)
+    if old_user_id == instance.user_id:
+        apply_credit(instance.user_id, credit - old_credit)
+    else:
+        apply_credit(old_user_id, -old_credit)
+        apply_credit(instance.user_id, credit)
+
+
+@receiver(post_delete, sender=Payment)
+def update_balance_on_payment_delete(sender, instance, **kwargs):
+    apply_credit(instance.user_id, -payment_credit(instance.type, instance.payed, instance.discount))
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_group(sender, instance, update_fields=None, **kwargs):
+    instance._ledger_previous_group = None
+    if instance.pk is not None and (update_fields is None or "group" in update_fields):
+        instance._ledger_previous_group = (
+            User.objects.filter(pk=instance.pk).values_list("group_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=User)
+def update_balance_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    # charged follows the course of the user's group
+    if created:
+        recompute_balances([instance.pk])
+    elif update_fields is None or "group" in update_fields:
+        if getattr(instance, "_ledger_previous_group", None) != instance.group_id:
+            recompute_balances([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+def update_balances_on_group_save(sender, instance, created, **kwargs):
+    if not created:
+        recompute_balances(list(instance.users.values_list("pk", flat=True)))
+
+
+@receiver(pre_save, sender=Course)
+def remember_previous_price(sender, instance, **kwargs):
+    instance._ledger_previous_price = None
+    if instance.pk is not None:
+        instance._ledger_previous_price = (
+            Course.objects.filter(pk=instance.pk).values_list("price", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Course)
+def update_balances_on_price_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_ledger_previous_price", None)
+    if previous is None or Decimal(previous) == Decimal(instance.price):
+        return
+    Balance.objects.filter(user__group__course=instance).update(
+        charged=Decimal(instance.price),
+        owed=Decimal(instance.price) - F("credited"),
+        updated_at=timezone.now(),
+    )
@@ -0,0 +1,121 @@
+import json
+import subprocess
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from api.bench import compare_reports, router_endpoints, run_benchmark
+from api.models import User
+from api.urls import router
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every GET route of the API router with the Django test client "
+        "and write p50/p95/p99 latency and query counts per endpoint as JSON.\n"
+        "Run against a database filled by `manage.py seed_bench`.\n"
+        "Example: manage.py bench_api --output before.json; ...; "
+        "manage.py bench_api --output after.json --compare before.json"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Measured requests per endpoint.")
+        parser.add_argument("--output", default="bench-report.json",
+                            help="Where to write the JSON report ('-' for stdout).")
+        parser.add_argument("--endpoint", action="append", dest="endpoints", default=[],
+                            help="Only endpoints whose name contains this text (can be repeated).")
+        parser.add_argument("--anonymous", action="store_true",
+                            help="Do not log in as an admin.")
+        parser.add_argument("--compare", metavar="REPORT",
+                            help="Previous report; list endpoints that got slower or run more queries.")
+        parser.add_argument("--threshold", type=float, default=1.25,
+                            help="p95 growth factor reported as a regression.")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        endpoints = router_endpoints(router)
+        if options["endpoints"]:
+            endpoints = [
+                (name, url) for name, url in endpoints
+                if any(text in name for text in options["endpoints"])
+            ]
+        if not endpoints:
+            raise CommandError("No matching endpoints.")
+
+        # allows the "testserver" host and keeps outgoing email in memory
+        setup_test_environment()
+        try:
+            client = Client()
+            if not options["anonymous"]:
+                client.force_login(self.admin_login())
+            report = {
+                "generated_at": timezone.now().isoformat(),
+                "revision": _git_revision(),
+                "repeat": max(options["repeat"], 1),
+                "rows": {
+                    model._meta.label: model._default_manager.count()
+                    for model in apps.get_app_config("api").get_models()
+                },
+                "endpoints": run_benchmark(client, endpoints, repeat=max(options["repeat"], 1)),
+            }
+        finally:
+            teardown_test_environment()
+
+        width = max(len(name) for name, _ in endpoints)
+        self.stdout.write(
+            f"{'endpoint':<{width}}  status  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  queries"
+        )
+        for name, row in report["endpoints"].items():
+            if row.get("error"):
+                self.stdout.write(self.style.WARNING(
+                    f"{name:<{width}}  {row['status']:>6}  not timed, {row['url']} did not answer 200"
+                ))
+                continue
+            self.stdout.write(
+                f"{name:<{width}}  {row['status']:>6}  {row['p50_ms']:>8.2f}  "
+                f"{row['p95_ms']:>8.2f}  {row['p99_ms']:>8.2f}  {row['queries_max']:>7}"
+            )
+
+        data = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"] == "-":
+            self.stdout.write(data)
+        else:
+            with open(options["output"], "w") as fh:
+                fh.write(data + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}."))
+
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                regressions = compare_reports(json.load(fh), report, options["threshold"])
+            for name, message in regressions:
+                self.stdout.write(self.style.WARNING(f"REGRESSION {name}: {message}"))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("No regressions."))
+            elif options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} regression(s).")
+
+    def admin_login(self):
+        """
+        A Django auth user whose email matches an api admin (see api.principals).
+        """
+        admin = User.objects.filter(role=User.Role.ADMIN).order_by("pk").first()
+        if admin is None:
+            raise CommandError("No admin api User; run `manage.py seed_bench` first or pass --anonymous.")
+        auth_user, _ = get_user_model().objects.get_or_create(
+            username=f"bench-{admin.login}"[:150], defaults={"email": admin.email},
+        )
+        return auth_user
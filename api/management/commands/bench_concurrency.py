@@ -0,0 +1,95 @@
+import json
+import logging
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.utils import timezone
+
+from api.bench import async_endpoints, run_concurrency_benchmark
+from api.urls import router
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the async list/retrieve views (website.asgi) with "
+        "the WSGI application and Django's stock ASGI handler, keeping --connections "
+        "requests in flight. The applications are called in-process, so the numbers "
+        "exclude HTTP parsing and the network; run against a database filled by "
+        "`manage.py seed_bench`.\n"
+        "Example: manage.py bench_concurrency --connections 500 --requests 5000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000,
+                            help="Measured requests per endpoint and application.")
+        parser.add_argument("--connections", type=int, default=500,
+                            help="Requests kept in flight.")
+        parser.add_argument("--wsgi-threads", type=int, default=32,
+                            help="Threads of the simulated WSGI server.")
+        parser.add_argument("--endpoint", action="append", dest="endpoints", default=[],
+                            help="Only endpoints whose name contains this text (can be repeated).")
+        parser.add_argument("--output", help="Also write the JSON report here ('-' for stdout).")
+
+    def handle(self, *args, **options):
+        endpoints = async_endpoints(router)
+        if options["endpoints"]:
+            endpoints = [
+                (name, url) for name, url in endpoints
+                if any(text in name for text in options["endpoints"])
+            ]
+        if not endpoints:
+            raise CommandError("No matching endpoints.")
+
+        from website.asgi import application as async_application
+
+        applications = {
+            "wsgi": ("wsgi", get_wsgi_application()),
+            "asgi-sync": ("asgi", ASGIHandler()),
+            "asgi": ("asgi", async_application),
+        }
+        connections = max(options["connections"], 1)
+        # with this many requests queued nearly all of them are "slow"
+        metrics_logger = logging.getLogger("website.metrics")
+        metrics_level = metrics_logger.level
+        metrics_logger.setLevel(logging.ERROR)
+        try:
+            results = run_concurrency_benchmark(
+                applications, endpoints,
+                requests=max(options["requests"], 1),
+                connections=connections,
+                wsgi_threads=max(options["wsgi_threads"], 1),
+            )
+        finally:
+            metrics_logger.setLevel(metrics_level)
+
+        width = max(len(name) for name, _ in endpoints)
+        self.stdout.write(
+            f"{connections} connections, {options['wsgi_threads']} WSGI threads; "
+            "requests/s and p95 ms (asgi-sync: stock ASGI handler, sync views)"
+        )
+        self.stdout.write(f"{'endpoint':<{width}}" + "".join(f"  {label:>20}" for label in applications))
+        for name, row in results.items():
+            cells = "".join(
+                f"  {row[label]['requests_per_s']:>8.0f} {row[label]['p95_ms']:>8.1f}ms"
+                + ("!" if row[label]["errors"] else " ")
+                for label in applications
+            )
+            self.stdout.write(f"{name:<{width}}{cells}")
+        if any(row[label]["errors"] for row in results.values() for label in applications):
+            self.stdout.write(self.style.WARNING("! some responses were not 200, see the JSON report"))
+
+        if options["output"]:
+            data = json.dumps({
+                "generated_at": timezone.now().isoformat(),
+                "connections": connections,
+                "requests": options["requests"],
+                "wsgi_threads": options["wsgi_threads"],
+                "endpoints": results,
+            }, indent=2, sort_keys=True)
+            if options["output"] == "-":
+                self.stdout.write(data)
+            else:
+                with open(options["output"], "w") as fh:
+                    fh.write(data + "\n")
+                self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}."))
@@ -0,0 +1,120 @@
+import datetime
+import statistics
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from api.bench import generate
+from api.models import Application, Group, Journal, Payment, StudentSolve, SuccessStory, User
+from api.throttling import applications_by_email
+
+PAGE = 51  # one cursor page (page_size + 1)
+
+
+def query_paths():
+    """
+    (name, queryset) pairs mirroring the viewsets' get_queryset filter +
+    ordering combinations.
+    """
+    user = User.objects.filter(group__isnull=False).order_by("pk").first()
+    group_id = user.group_id
+    test_id = StudentSolve.objects.values_list("test_id", flat=True).first()
+    course_id = Group.objects.filter(pk=group_id).values_list("course_id", flat=True).get()
+    first_day = Journal.objects.filter(group_id=group_id).aggregate(first=Min("date"))["first"]
+    email = Application.objects.values_list("email", flat=True).first()
+    month_ago = timezone.now() - datetime.timedelta(days=30)
+
+    return [
+        ("users ?role=student", User.objects.filter(role=User.Role.STUDENT).order_by("id")[:PAGE]),
+        ("users ?status=active", User.objects.filter(status=User.Status.ACTIVE).order_by("id")[:PAGE]),
+        ("payments", Payment.objects.order_by("-date", "id")[:PAGE]),
+        ("payments ?user=", Payment.objects.filter(user_id=user.pk).order_by("-date", "id")[:PAGE]),
+        ("payments last 30 days (revenue)", Payment.objects.filter(date__gte=month_ago).order_by()),
+        ("journal", Journal.objects.order_by("-date", "id")[:PAGE]),
+        ("journal ?group=", Journal.objects.filter(group_id=group_id).order_by("-date", "id")[:PAGE]),
+        ("journal ?user=", Journal.objects.filter(user_id=user.pk).order_by("-date", "id")[:PAGE]),
+        ("journal by date", Journal.objects.filter(date=first_day).order_by("id")[:PAGE]),
+        ("solves", StudentSolve.objects.order_by("-created_at", "id")[:PAGE]),
+        ("solves ?user=", StudentSolve.objects.filter(user_id=user.pk).order_by("-created_at", "id")[:PAGE]),
+        ("solves ?test=", StudentSolve.objects.filter(test_id=test_id).order_by("-created_at", "id")[:PAGE]),
+        ("applications", Application.objects.order_by("-date", "id")[:PAGE]),
+        ("applications by email", applications_by_email(email).order_by()),
+        ("active groups of a course", Group.objects.filter(course_id=course_id, archived=False)),
+        ("success stories ?published=", SuccessStory.objects.filter(published=True).order_by("id")[:PAGE]),
+    ]
+
+
+def measure(queryset, repeat):
+    list(queryset.all())  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), queryset.explain()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the viewset query paths with and without the api indexes.\n"
+        "Seeds a synthetic dataset, prints EXPLAIN plans and median timings "
+        "without the indexes (dropped inside a savepoint) and with them, then "
+        "rolls everything back unless --keep is given.\n"
+        "Example: manage.py bench_indexes --scale 20 --repeat 50"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=5,
+                            help="Dataset scale factor (see api.bench.SIZES).")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Timed runs per query.")
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the generated rows instead of rolling back.")
+
+    def handle(self, *args, **options):
+        repeat = max(options["repeat"], 1)
+        indexes = [
+            index
+            for model in apps.get_app_config("api").get_models()
+            for index in model._meta.indexes
+        ]
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding (scale {options['scale']}, seed {options['seed']})...")
+            generate(scale=options["scale"], seed=options["seed"], stdout=self.stdout)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            paths = query_paths()
+
+            savepoint = transaction.savepoint()
+            with connection.cursor() as cursor:
+                for index in indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+                # refresh planner statistics for the index-less tables
+                cursor.execute("ANALYZE")
+            before = [measure(queryset, repeat) for _, queryset in paths]
+            transaction.savepoint_rollback(savepoint)
+
+            after = [measure(queryset, repeat) for _, queryset in paths]
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        self.stdout.write("")
+        for (name, _), (before_ms, before_plan), (after_ms, after_plan) in zip(paths, before, after):
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write("  before: " + before_plan.replace("\n", "\n          "))
+            self.stdout.write("  after:  " + after_plan.replace("\n", "\n          "))
+
+        self.stdout.write("")
+        width = max(len(name) for name, _ in paths)
+        self.stdout.write(f"{'query':<{width}}  {'before ms':>10}  {'after ms':>10}  {'speedup':>8}")
+        for (name, _), (before_ms, _), (after_ms, _) in zip(paths, before, after):
+            speedup = before_ms / after_ms if after_ms else float("inf")
+            line = f"{name:<{width}}  {before_ms:>10.3f}  {after_ms:>10.3f}  {speedup:>7.1f}x"
+            self.stdout.write(self.style.SUCCESS(line) if speedup >= 1.5 else line)
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api import images
+from api.response_cache import bump_generation
+from api.storage import image_storage, name_digest
+
+
+class Command(BaseCommand):
+    help = (
+        "Move uploaded images to content-addressed names and render their "
+        "missing WebP/JPEG derivatives."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Rendering threads.")
+
+    def handle(self, *args, **options):
+        renamed = missing = 0
+        names = {}
+        for model, fields in images.IMAGE_FIELDS.items():
+            label = model._meta.label_lower
+            for field in fields:
+                rows = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                for pk, name in rows.values_list("pk", field).iterator():
+                    if name_digest(name) is None:
+                        if not image_storage.exists(name):
+                            self.stderr.write(f"{label} {pk}: {name} does not exist")
+                            missing += 1
+                            continue
+                        # the original stays in place: other rows may use it
+                        with image_storage.open(name) as file:
+                            name = image_storage.save(name, file)
+                        model.objects.filter(pk=pk).update(**{field: name})
+                        bump_generation(label)
+                        renamed += 1
+                    names.setdefault(name, label)
+
+        # Pillow releases the GIL while resizing and encoding
+        with ThreadPoolExecutor(max_workers=max(options["workers"], 1)) as pool:
+            for label in pool.map(self.render, names.items()):
+                bump_generation(label)
+
+        rendered = sum(images.get_manifest(name) is not None for name in names)
+        self.stdout.write(self.style.SUCCESS(
+            f"{rendered} of {len(names)} images have derivatives; "
+            f"{renamed} renamed, {missing} missing."
+        ))
+
+    def render(self, item):
+        name, label = item
+        try:
+            images.render_derivatives(name)
+        except Exception as error:
+            self.stderr.write(f"{name}: {error}")
+        return label
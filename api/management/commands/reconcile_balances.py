@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.ledger import expected_balances, write_balances
+from api.models import Balance, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every student's Balance from Payment/Course rows in streaming "
+        "batches and report drift against the materialized table. "
+        "Pass --fix to write the recomputed values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--fix", action="store_true",
+                            help="Overwrite drifted (and create missing) Balance rows.")
+        parser.add_argument("--show", type=int, default=20,
+                            help="Number of drifted users to list.")
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        started = time.perf_counter()
+
+        checked = drifted = 0
+        total_drift = 0
+        shown = 0
+        last_pk = 0
+        while True:
+            # keyset over user ids, one batch in memory at a time
+            ids = list(
+                User.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_pk = ids[-1]
+
+            expected = expected_balances(ids)
+            stored = {
+                user_id: (charged, credited, owed)
+                for user_id, charged, credited, owed in Balance.objects.filter(
+                    user_id__in=ids
+                ).values_list("user_id", "charged", "credited", "owed")
+            }
+
+            wrong = {}
+            for user_id, values in expected.items():
+                current = stored.get(user_id)
+                if current != values:
+                    wrong[user_id] = values
+                    drift = values[2] - (current[2] if current else 0)
+                    total_drift += abs(drift)
+                    if shown < options["show"]:
+                        shown += 1
+                        self.stdout.write(
+                            f"  user {user_id}: stored owed "
+                            f"{current[2] if current else 'missing'}, expected {values[2]}"
+                        )
+
+            checked += len(expected)
+            drifted += len(wrong)
+            if wrong and options["fix"]:
+                with transaction.atomic():
+                    write_balances(wrong)
+
+        elapsed = time.perf_counter() - started
+        message = (
+            f"Checked {checked} balances in {elapsed:.2f}s: {drifted} drifted, "
+            f"total owed drift {total_drift}."
+        )
+        if drifted and options["fix"]:
+            message += " Fixed."
+        self.stdout.write(self.style.SUCCESS(message) if not drifted else self.style.WARNING(message))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboard import refresh_summaries
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild StudentSummary rows (materialized student dashboards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        ids = User.objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=batch_size)
+
+        total = 0
+        batch = []
+        for user_id in ids:
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                total += len(refresh_summaries(batch))
+                batch = []
+        if batch:
+            total += len(refresh_summaries(batch))
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {total} student summaries."))
@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.grading import regrade_solves
+from api.models import Test
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+    # never share the parent's database connection with a forked child
+    connections.close_all()
+
+
+def _regrade_worker(test_ids, chunk_size, dry_run):
+    try:
+        return regrade_solves(test_ids, chunk_size=chunk_size, dry_run=dry_run)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Regrade StudentSolve rows against the current Question answers.\n"
+        "Examples:\n"
+        "  manage.py regrade --test 12\n"
+        "  manage.py regrade --course 3 --workers 4 --chunk-size 5000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--test", type=int, action="append", dest="tests", default=[],
+                            help="Test id to regrade (can be repeated).")
+        parser.add_argument("--course", type=int, action="append", dest="courses", default=[],
+                            help="Regrade every test of this course (can be repeated).")
+        parser.add_argument("--all", action="store_true",
+                            help="Regrade every test.")
+        parser.add_argument("--chunk-size", type=int, default=2000,
+                            help="Rows fetched and written per batch.")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes; tests are split between them by id.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Grade and report, but do not write anything.")
+
+    def handle(self, *args, **options):
+        tests = Test.objects.all()
+        if options["tests"] or options["courses"]:
+            tests = tests.filter(pk__in=options["tests"]) | tests.filter(course_id__in=options["courses"])
+        elif not options["all"]:
+            raise CommandError("Pass --test, --course or --all.")
+
+        test_ids = sorted(tests.values_list("id", flat=True).distinct())
+        if not test_ids:
+            raise CommandError("No matching tests.")
+
+        chunk_size = max(options["chunk_size"], 1)
+        workers = max(options["workers"], 1)
+        dry_run = options["dry_run"]
+
+        started = time.perf_counter()
+        if workers == 1:
+            scanned, changed = regrade_solves(test_ids, chunk_size=chunk_size, dry_run=dry_run)
+        else:
+            scanned = changed = 0
+            parts = [test_ids[i::workers] for i in range(workers)]
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_regrade_worker, part, chunk_size, dry_run)
+                    for part in parts if part
+                ]
+                for future in as_completed(futures):
+                    part_scanned, part_changed = future.result()
+                    scanned += part_scanned
+                    changed += part_changed
+        elapsed = time.perf_counter() - started
+
+        rate = scanned / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would regrade' if dry_run else 'Regraded'} {scanned} solves "
+            f"across {len(test_ids)} tests: {changed} changed, "
+            f"{elapsed:.2f}s ({rate:,.0f} rows/sec)."
+        ))
@@ -0,0 +1,45 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs (api.jobs) until SIGINT/SIGTERM.\n"
+        "Examples:\n"
+        "  manage.py runworkers --concurrency 8\n"
+        "  manage.py runworkers --pool process --concurrency 4\n"
+        "  manage.py runworkers --burst   # exit once no job is due"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4,
+                            help="Jobs run at the same time.")
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread",
+                            help="Run jobs in threads (I/O-bound) or processes (CPU-bound).")
+        parser.add_argument("--burst", action="store_true",
+                            help="Exit when no job is due instead of polling.")
+        parser.add_argument("--quiet", action="store_true",
+                            help="Do not print a line per finished job.")
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"],
+            pool=options["pool"],
+            stdout=None if options["quiet"] else self.stdout,
+        )
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the running jobs...")
+            worker.stop()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        self.stdout.write(f"Worker {worker.id}: {worker.concurrency} {options['pool']} slots.")
+        worker.run(burst=options["burst"])
+
+        summary = ", ".join(f"{name} {outcome}: {count}" for (name, outcome), count in sorted(worker.outcomes.items()))
+        self.stdout.write(self.style.SUCCESS(f"Stopped. {summary or 'No jobs run.'}"))
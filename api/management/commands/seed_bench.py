@@ -0,0 +1,44 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from api.bench import SIZES, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a deterministic synthetic dataset for benchmarks.\n"
+        f"--scale 1 is about {SIZES['users']} students, "
+        f"{SIZES['users'] * SIZES['solves_per_user']} solves and "
+        f"{SIZES['users'] * SIZES['payments_per_user']} payments.\n"
+        "Example: manage.py seed_bench --scale 20 --seed 42"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1,
+                            help="Scale factor for every table (see api.bench.SIZES).")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Random seed; the same seed on an empty database gives the same data.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows per bulk_create / bulk_update statement.")
+        parser.add_argument("--skip-derived", action="store_true",
+                            help="Do not rebuild Balance / StudentSummary rows afterwards.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = generate(
+            scale=options["scale"],
+            seed=options["seed"],
+            batch_size=max(options["batch_size"], 1),
+            stdout=self.stdout,
+        )
+        if not options["skip_derived"]:
+            # bulk_create sends no signals, so the materialized tables are stale
+            call_command("reconcile_balances", fix=True, show=0, stdout=self.stdout)
+            call_command("refresh_dashboards", stdout=self.stdout)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {sum(counts.values())} rows in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,66 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_guard import DEFAULT_THRESHOLD, NPlusOneError, logger, query_guard
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Adds X-RateLimit-* headers for requests limited by
+    api.throttling.IntegrationRateThrottle.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.add_headers(request, await self.get_response(request))
+
+    def add_headers(self, request, response):
+        result = getattr(request, "rate_limit", None)
+        if result is not None:
+            response["X-RateLimit-Limit"] = str(result.limit)
+            response["X-RateLimit-Remaining"] = str(result.remaining)
+            response["X-RateLimit-Reset"] = str(result.reset)
+        return response
+
+
+class QueryGuardMiddleware:
+    """
+    Debug aid: reports statements repeated QUERY_GUARD_THRESHOLD times or
+    more within one request (N+1 queries, see api.query_guard).
+    QUERY_GUARD = "warn" logs them to "api.query_guard", "raise" raises
+    NPlusOneError instead of returning the response. Off by default.
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, "QUERY_GUARD", None)
+        if self.mode not in ("warn", "raise"):
+            raise MiddlewareNotUsed
+        self.threshold = getattr(settings, "QUERY_GUARD_THRESHOLD", DEFAULT_THRESHOLD)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with query_guard(self.threshold) as guard:
+            response = self.get_response(request)
+
+        if guard.repeated():
+            message = (
+                f"Possible N+1 in {request.method} {request.get_full_path()}: "
+                f"{guard.count} queries\n{guard.report()}"
+            )
+            if self.mode == "raise":
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
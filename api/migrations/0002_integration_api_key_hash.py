@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:30
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_api_key_hash(apps, schema_editor):
+    Integration = apps.get_model('api', 'Integration')
+    integrations = list(Integration.objects.only('id', 'api_key'))
+    for integration in integrations:
+        integration.api_key_hash = hashlib.sha256(integration.api_key.encode('utf-8')).hexdigest()
+    Integration.objects.bulk_update(integrations, ['api_key_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='integration',
+            name='api_key_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_api_key_hash, migrations.RunPython.noop),
+    ]
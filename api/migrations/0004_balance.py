@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_studentsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Balance',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='api.user')),
+                ('charged', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('credited', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('owed', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
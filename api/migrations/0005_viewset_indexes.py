@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['-date', 'id'], name='api_application_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['email'], name='api_application_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['course', 'archived'], name='api_group_course_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['-date', 'id'], name='api_journal_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['group', '-date', 'id'], name='api_journal_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['user', '-date', 'id'], name='api_journal_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-date', 'id'], name='api_payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user', '-date', 'id'], name='api_payment_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentsolve',
+            index=models.Index(fields=['-created_at', 'id'], name='api_solve_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentsolve',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='api_solve_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentsolve',
+            index=models.Index(fields=['test', '-created_at', 'id'], name='api_solve_test_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='successstory',
+            index=models.Index(fields=['published', 'id'], name='api_story_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'id'], name='api_user_role_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['status', 'id'], name='api_user_status_id_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+
+# FTS5 DDL, defined here rather than imported: app modules load the
+# current models, which a migration must not depend on
+def fts_create_sql(table, content_table, fields):
+    """
+    Statements creating the FTS5 table for `content_table` with its sync
+    triggers, and filling it from the existing rows.
+    """
+    columns = ", ".join(fields)
+    new = ", ".join(f"new.{field}" for field in fields)
+    old = ", ".join(f"old.{field}" for field in fields)
+    delete = f"INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {table}(rowid, {columns}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5({columns}, content='{content_table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {table}_ai AFTER INSERT ON {content_table} BEGIN {insert} END",
+        f"CREATE TRIGGER {table}_ad AFTER DELETE ON {content_table} BEGIN {delete} END",
+        f"CREATE TRIGGER {table}_au AFTER UPDATE OF {columns} ON {content_table} "
+        f"BEGIN {delete} {insert} END",
+        f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+    ]
+
+
+def fts_drop_sql(table):
+    return [f"DROP TRIGGER IF EXISTS {table}_{suffix}" for suffix in ("ai", "ad", "au")] + [
+        f"DROP TABLE IF EXISTS {table}"
+    ]
+
+
+# table -> (content table, indexed fields); see api.search.SEARCH_INDEXES
+INDEXES = {
+    "api_search_user": ("api_user", ["firstname", "lastname", "email", "login"]),
+    "api_search_course": ("api_course", ["title", "description"]),
+    "api_search_faq": ("api_faq", ["question", "answer"]),
+    "api_search_lesson": ("api_lesson", ["title", "description"]),
+    "api_search_material": ("api_material", ["title", "source"]),
+}
+
+
+def fts5_supported(schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any("ENABLE_FTS5" in row[0] for row in cursor.fetchall())
+
+
+def create_search_tables(apps, schema_editor):
+    # other databases (or SQLite without FTS5) use the in-process index
+    if not fts5_supported(schema_editor):
+        return
+    for table, (content_table, fields) in INDEXES.items():
+        for statement in fts_create_sql(table, content_table, fields):
+            schema_editor.execute(statement)
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table in INDEXES:
+        for statement in fts_drop_sql(table):
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_viewset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
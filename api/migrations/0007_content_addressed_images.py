@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:58
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_search_index'),
+    ]
+
+    # storage is not a database attribute, but SQLite's schema editor would
+    # still rebuild the tables (dropping the FTS5 sync triggers of 0006):
+    # only the migration state changes.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='course',
+                    name='image_path',
+                    field=models.ImageField(blank=True, null=True, storage=api.storage.ContentAddressedStorage(), upload_to='courses/'),
+                ),
+                migrations.AlterField(
+                    model_name='partner',
+                    name='image',
+                    field=models.ImageField(blank=True, null=True, storage=api.storage.ContentAddressedStorage(), upload_to='partners/'),
+                ),
+                migrations.AlterField(
+                    model_name='team',
+                    name='image',
+                    field=models.ImageField(blank=True, null=True, storage=api.storage.ContentAddressedStorage(), upload_to='team/'),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='image_path',
+                    field=models.ImageField(blank=True, null=True, storage=api.storage.ContentAddressedStorage(), upload_to='users/'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:35
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_job'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='application',
+            name='api_application_email_idx',
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='api_application_lemail_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:39
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def fill_credited_total(apps, schema_editor):
+    Payment = apps.get_model('api', 'Payment')
+    StudentSummary = apps.get_model('api', 'StudentSummary')
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    credited = (
+        Payment.objects.filter(user=OuterRef('user'))
+        .order_by()
+        .values('user')
+        .annotate(total=Sum(Case(
+            When(type='cash', then=F('payed') + F('discount')),
+            default=F('payed'),
+            output_field=money,
+        )))
+        .values('total')
+    )
+    StudentSummary.objects.update(
+        credited_total=Coalesce(Subquery(credited, output_field=money), Value(0), output_field=money),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_application_email_lower'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentsummary',
+            name='credited_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(fill_credited_total, migrations.RunPython.noop),
+    ]
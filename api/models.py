@@ -1,11 +1,17 @@
+import hashlib
+
 from django import forms
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .storage import image_storage
 
 
 class Course(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
-    image_path = models.ImageField(upload_to="courses/", blank=True, null=True)
+    image_path = models.ImageField(upload_to="courses/", storage=image_storage, blank=True, null=True)
     duration = models.CharField(max_length=100, blank=True)   # e.g. "3 months"
     classes = models.PositiveIntegerField(default=0)
     team_size = models.PositiveIntegerField(default=0)
@@ -23,6 +29,12 @@ class Group(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="groups")
     archived = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # active groups of a course (course page)
+            models.Index(fields=["course", "archived"], name="api_group_course_archived_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.course.title})"
 
@@ -40,7 +52,7 @@ class User(models.Model):
 
     firstname = models.CharField(max_length=150)
     lastname = models.CharField(max_length=150)
-    image_path = models.ImageField(upload_to="users/", blank=True, null=True)
+    image_path = models.ImageField(upload_to="users/", storage=image_storage, blank=True, null=True)
 
     email = models.EmailField(unique=True)
     login = models.CharField(max_length=150, unique=True)
@@ -64,6 +76,13 @@ class User(models.Model):
         default=Status.UPCOMING,
     )
 
+    class Meta:
+        indexes = [
+            # UserViewSet: ?role= / ?status= ordered by id
+            models.Index(fields=["role", "id"], name="api_user_role_id_idx"),
+            models.Index(fields=["status", "id"], name="api_user_status_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.firstname} {self.lastname}"
 
@@ -129,6 +148,12 @@ class StudentSolve(models.Model):
 
     class Meta:
         unique_together = ("user", "test")
+        indexes = [
+            # StudentSolveViewSet ordering (-created_at, id), unfiltered / ?user= / ?test=
+            models.Index(fields=["-created_at", "id"], name="api_solve_created_idx"),
+            models.Index(fields=["user", "-created_at", "id"], name="api_solve_user_created_idx"),
+            models.Index(fields=["test", "-created_at", "id"], name="api_solve_test_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} – {self.test} ({'OK' if self.solve_status else 'FAIL'})"
@@ -146,6 +171,8 @@ class Integration(models.Model):
     )
     title = models.CharField(max_length=255)
     api_key = models.CharField(max_length=255)
+    # sha256 of api_key, used for indexed lookups during authentication
+    api_key_hash = models.CharField(max_length=64, editable=False, db_index=True, blank=True)
     date = models.DateTimeField(auto_now_add=True)
 
     permission = models.CharField(
@@ -168,6 +195,17 @@ class Integration(models.Model):
         if self.user.role != User.Role.ADMIN:
             raise ValidationError("Only ADMIN users can create API integrations.")
 
+    @staticmethod
+    def hash_key(api_key):
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.api_key_hash = self.hash_key(self.api_key)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "api_key" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "api_key_hash"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.title} ({self.user})"
 
@@ -189,6 +227,13 @@ class Journal(models.Model):
 
     class Meta:
         unique_together = ("group", "user", "date")
+        indexes = [
+            # JournalViewSet ordering (-date, id), unfiltered / ?group= / ?user=;
+            # (group, -date) also serves the attendance matrix date range
+            models.Index(fields=["-date", "id"], name="api_journal_date_idx"),
+            models.Index(fields=["group", "-date", "id"], name="api_journal_group_date_idx"),
+            models.Index(fields=["user", "-date", "id"], name="api_journal_user_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.date} – {self.group} – {self.user} – {self.status}"
@@ -257,6 +302,14 @@ class Application(models.Model):
         help_text="Datetime until which new applications from same email/IP are blocked.",
     )
 
+    class Meta:
+        indexes = [
+            # ApplicationViewSet ordering (-date, id) and analytics buckets
+            models.Index(fields=["-date", "id"], name="api_application_date_idx"),
+            # throttle marking, case-insensitive (api.throttling.applications_by_email)
+            models.Index(Lower("email"), name="api_application_lemail_idx"),
+        ]
+
     def __str__(self):
         return f"{self.firstname} {self.lastname} – {self.course}"
 
@@ -296,13 +349,30 @@ class Payment(models.Model):
         default=Status.UNCOMPLETED,
     )
 
+    class Meta:
+        indexes = [
+            # PaymentViewSet ordering (-date, id), unfiltered / ?user=;
+            # the first one also serves the revenue analytics buckets
+            models.Index(fields=["-date", "id"], name="api_payment_date_idx"),
+            models.Index(fields=["user", "-date", "id"], name="api_payment_user_date_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # the ledger (api.ledger) updates Balance from signals in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"{self.user} – {self.payed} ({self.get_status_display()})"
 
 
 class Team(models.Model):
     fullname = models.CharField(max_length=255)
-    image = models.ImageField(upload_to="team/", blank=True, null=True)
+    image = models.ImageField(upload_to="team/", storage=image_storage, blank=True, null=True)
     speciality = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
@@ -310,7 +380,7 @@ class Team(models.Model):
 
 
 class Partner(models.Model):
-    image = models.ImageField(upload_to="partners/", blank=True, null=True)
+    image = models.ImageField(upload_to="partners/", storage=image_storage, blank=True, null=True)
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
 
@@ -392,5 +462,88 @@ class SuccessStory(models.Model):
     )
     published = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["published", "id"], name="api_story_published_idx"),
+        ]
+
+    def __str__(self):
+        return f"SuccessStory #{self.pk} ({'published' if self.published else 'draft'})"
+
+
+class StudentSummary(models.Model):
+    """
+    Materialized dashboard aggregates of one student, refreshed by
+    api.dashboard whenever their Journal/StudentSolve/Payment rows change.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="summary",
+        primary_key=True,
+    )
+    attendance_total = models.PositiveIntegerField(default=0)
+    attendance_present = models.PositiveIntegerField(default=0)
+    solves_passed = models.PositiveIntegerField(default=0)
+    solves_failed = models.PositiveIntegerField(default=0)
+    payed_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    credited_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary of {self.user_id}"
+
+
+class Balance(models.Model):
+    """
+    Materialized running balance of one student, maintained by api.ledger:
+    charged = price of the course of the user's group,
+    credited = payments (plus cash discounts), owed = charged - credited.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="balance",
+        primary_key=True,
+    )
+    charged = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    credited = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    owed = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: owes {self.owed}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by `manage.py runworkers` (api.jobs).
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # claiming: due queued jobs, oldest first
+            models.Index(fields=["status", "run_at"], name="api_job_status_run_at_idx"),
+            models.Index(fields=["task", "status"], name="api_job_task_status_idx"),
+        ]
+
     def __str__(self):
-        return f"SuccessStory #{self.pk} ({'published' if self.published else 'draft'})"
\ No newline at end of file
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,36 @@
+"""
+Staff e-mail notifications, sent from background jobs (api.jobs) so a slow
+or unreachable mail server never holds up a request.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .jobs import enqueue, task
+from .models import Application
+
+
+def recipients():
+    return list(getattr(settings, "APPLICATION_NOTIFY_EMAILS", []))
+
+
+@task("applications.notify")
+def notify_application(application_id):
+    application = Application.objects.select_related("course").filter(pk=application_id).first()
+    if application is None or not recipients():
+        return
+    name = f"{application.firstname} {application.lastname}"
+    course = application.course.title if application.course else "-"
+    send_mail(
+        f"New application: {name}",
+        f"{name} <{application.email}>\nCourse: {course}\nDate: {application.date:%Y-%m-%d %H:%M} UTC\n",
+        None,
+        recipients(),
+    )
+
+
+@receiver(post_save, sender=Application)
+def notify_new_application(sender, instance, created, **kwargs):
+    if created and recipients():
+        enqueue("applications.notify", application_id=instance.pk)
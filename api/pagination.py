@@ -0,0 +1,254 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset ("seek") pagination over the viewset ordering.
+
+    Unlike DRF's CursorPagination, the cursor stores the *full* ordering key
+    of the boundary row (e.g. ``(-created_at, id)``), so every page is a
+    ``WHERE (created_at, id) < (...) ORDER BY ... LIMIT n`` query and deep
+    pages cost the same as the first one – no OFFSET is ever used.
+
+    Per-viewset settings (all optional):
+      - ``page_size``      – default number of rows per page
+      - ``max_page_size``  – hard cap for ``?page_size=``
+
+    The ordering comes from the view's OrderingFilter (``?ordering=`` or
+    ``view.ordering``); the primary key is appended as a tiebreaker so the
+    cursor is always unique and stable.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    ordering = "id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views, fetching the page with the
+        async ORM in a single round trip to the sync thread.
+        """
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        # a chunk larger than the slice: aiterator stops after one fetch
+        rows = queryset.aiterator(chunk_size=self.page_size + 2)
+        return self.set_page([obj async for obj in rows])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        The sliced queryset of the requested page plus one extra row, or
+        None when pagination is off. Does not touch the database.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request, view)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.reverse, self.position = False, None
+        else:
+            self.reverse, self.position = self.cursor
+
+        queryset = queryset.order_by(*self._order_by(self.reverse))
+        if self.position is not None:
+            queryset = queryset.filter(self._seek_filter(self.position, self.reverse))
+
+        # fetch one extra row to know whether there is a following page
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        if self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_page_size(self, request, view=None):
+        page_size = getattr(view, "page_size", None) or self.page_size
+        max_page_size = getattr(view, "max_page_size", None) or self.max_page_size
+
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                requested = int(value)
+            except ValueError:
+                requested = 0
+            if requested > 0:
+                page_size = requested
+
+        return min(page_size, max_page_size)
+
+    def get_keyset_ordering(self, request, queryset, view):
+        """
+        Return a tuple of ``(field, descending)`` pairs, always ending in pk.
+        """
+        ordering = []
+        for name in self.get_ordering(request, queryset, view):
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+            if name == "pk":
+                name = self.model._meta.pk.name
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not getattr(field, "concrete", False):
+                continue
+            ordering.append((field, descending))
+            if field.primary_key:
+                break
+        else:
+            ordering.append((self.model._meta.pk, False))
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            # empty page reached while going backwards – restart from the top
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor((False, position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor((True, position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            if payload["o"] != self._ordering_signature():
+                raise ValueError("cursor was issued for a different ordering")
+            values = payload["p"]
+            if len(values) != len(self.ordering):
+                raise ValueError("cursor length does not match ordering")
+            position = [
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(self.ordering, values)
+            ]
+            reverse = bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, BinasciiError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, position
+
+    def encode_cursor(self, cursor):
+        reverse, position = cursor
+        payload = {"o": self._ordering_signature(), "p": position}
+        if reverse:
+            payload["r"] = 1
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        encoded = urlsafe_b64encode(data).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field, _ in ordering:
+            value = field.value_from_object(instance)
+            if value is not None and not isinstance(value, (int, str)):
+                value = field.value_to_string(instance)
+            position.append(value)
+        return position
+
+    def _ordering_signature(self):
+        return ",".join(
+            ("-" if descending else "") + field.attname
+            for field, descending in self.ordering
+        )
+
+    def _order_by(self, reverse):
+        # NULLs always sort last in the forward direction so that the seek
+        # predicate below does not depend on the database's NULL ordering.
+        order_by = []
+        for field, descending in self.ordering:
+            descending = descending != reverse
+            if not field.null:
+                order_by.append(("-" if descending else "") + field.attname)
+                continue
+            nulls = {"nulls_first": True} if reverse else {"nulls_last": True}
+            expression = F(field.attname)
+            order_by.append(expression.desc(**nulls) if descending else expression.asc(**nulls))
+        return order_by
+
+    def _seek_filter(self, position, reverse):
+        """
+        Build ``(a, b, c) > (x, y, z)`` in the direction of the ordering as
+        ``a > x OR (a = x AND (b > y OR (b = y AND c > z)))``, ANDed with
+        ``a >= x`` so the database can seek the index on the leading column
+        instead of scanning it (SQLite does not derive that bound itself).
+        """
+        condition = None
+        for (field, descending), value in reversed(list(zip(self.ordering, position))):
+            name = field.attname
+            descending = descending != reverse
+            nulls_last = not reverse
+
+            if value is None:
+                after = Q(**{f"{name}__isnull": False}) if not nulls_last else Q(pk__in=[])
+                equal = Q(**{f"{name}__isnull": True})
+            else:
+                lookup = "lt" if descending else "gt"
+                after = Q(**{f"{name}__{lookup}": value})
+                if field.null and nulls_last:
+                    after |= Q(**{f"{name}__isnull": True})
+                equal = Q(**{name: value})
+
+            condition = after if condition is None else after | (equal & condition)
+
+        bound = self._leading_bound(position[0], reverse)
+        return condition if bound is None else condition & bound
+
+    def _leading_bound(self, value, reverse):
+        field, descending = self.ordering[0]
+        name = field.attname
+        nulls_last = not reverse
+        if value is None:
+            # past a NULL only NULLs follow when they sort last; otherwise
+            # every non-NULL value is still ahead and there is nothing to bound
+            return Q(**{f"{name}__isnull": True}) if nulls_last else None
+        lookup = "lte" if descending != reverse else "gte"
+        bound = Q(**{f"{name}__{lookup}": value})
+        if field.null and nulls_last:
+            bound |= Q(**{f"{name}__isnull": True})
+        return bound
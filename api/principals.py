@@ -0,0 +1,102 @@
+"""
+Maps request.user (Django auth user or IntegrationUser) to the api.models.User
+that carries the role. Requests authenticated by an Integration API key get an
+IntegrationPrincipal instead: integrations have a role of their own and never
+inherit the role (e.g. ADMIN) of the user who owns them.
+
+The result is memoized on the request, and across requests in a short-TTL
+cache keyed by auth user id + email; it is dropped as soon as any api User
+with that id or email is saved or deleted.
+
+Usage from any view / permission:
+    user = resolve_principal(request)
+    if is_admin(request): ...
+    if is_integration(request): ...
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import TTLCache
+from .models import User
+
+# (auth user id, email) -> (email, api User or None)
+principal_cache = TTLCache(
+    maxsize=getattr(settings, "PRINCIPAL_CACHE_SIZE", 4096),
+    ttl=getattr(settings, "PRINCIPAL_CACHE_TTL", 30),
+)
+
+_MISSING = object()
+
+INTEGRATION_ROLE = "integration"
+
+
+class IntegrationPrincipal:
+    """
+    The principal of a request made with an Integration API key.
+    """
+
+    role = INTEGRATION_ROLE
+
+    def __init__(self, integration):
+        self.integration = integration
+        self.pk = integration.pk
+
+    def __eq__(self, other):
+        return isinstance(other, IntegrationPrincipal) and other.pk == self.pk
+
+    def __hash__(self):
+        return hash((IntegrationPrincipal, self.pk))
+
+
+def resolve_principal(request):
+    """
+    Return the api.models.User behind request.user, an IntegrationPrincipal
+    for API-key requests, or None.
+    """
+    django_request = getattr(request, "_request", request)
+    principal = getattr(django_request, "_api_principal", _MISSING)
+    if principal is _MISSING:
+        principal = _resolve(getattr(request, "user", None))
+        django_request._api_principal = principal
+    return principal
+
+
+def is_admin(request):
+    principal = resolve_principal(request)
+    return principal is not None and principal.role == User.Role.ADMIN
+
+
+def is_integration(request):
+    principal = resolve_principal(request)
+    return principal is not None and principal.role == INTEGRATION_ROLE
+
+
+def _resolve(auth_user):
+    if auth_user is None or not auth_user.is_authenticated:
+        return None
+
+    # requests authenticated by an Integration API key
+    integration = getattr(auth_user, "integration", None)
+    if integration is not None:
+        return IntegrationPrincipal(integration)
+
+    email = getattr(auth_user, "email", "")
+    if not email:
+        return None
+
+    key = (auth_user.pk, email)
+    entry = principal_cache.get(key)
+    if entry is None:
+        entry = (email, User.objects.filter(email=email).first())
+        principal_cache.set(key, entry)
+    return entry[1]
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_principal(sender, instance, **kwargs):
+    principal_cache.pop_where(
+        lambda entry: entry[0] == instance.email
+        or (entry[1] is not None and entry[1].pk == instance.pk)
+    )
@@ -0,0 +1,65 @@
+"""
+N+1 query detection.
+
+QueryGuard is a connection.execute_wrapper that groups statements by their
+SQL text (parameters excluded). The same statement running once per row –
+e.g. `SELECT ... FROM api_course WHERE id = %s` for every Group of a page
+whose serializer or __str__ reads group.course – shows up as one SQL text
+repeated many times.
+
+Used by
+  - api.middleware.QueryGuardMiddleware in debug mode (QUERY_GUARD = "warn"
+    logs, "raise" turns the response into an error);
+  - api.tests.utils.ConstantQueryCountMixin, which requests every
+    registered list endpoint with a small and a large table and fails if
+    the number of queries grows.
+"""
+import logging
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+logger = logging.getLogger("api.query_guard")
+
+DEFAULT_THRESHOLD = 5
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+class QueryGuard:
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements[sql] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    def repeated(self):
+        """
+        [(sql, times)] for statements run at least `threshold` times.
+        """
+        return [(sql, times) for sql, times in self.statements.most_common() if times >= self.threshold]
+
+    def report(self):
+        return "\n".join(f"  {times}x  {sql}" for sql, times in self.repeated())
+
+
+@contextmanager
+def query_guard(threshold=DEFAULT_THRESHOLD):
+    """
+    with query_guard() as guard: ...  then inspect guard.repeated()
+    """
+    guard = QueryGuard(threshold)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(guard))
+        yield guard
+
@@ -0,0 +1,107 @@
+"""
+Bulk import / export of a Test's questions.
+
+Import reads the request body line by line (NDJSON, or CSV with a header
+row), validates each row with QuestionImportSerializer and inserts valid
+rows with bulk_create in batches, so a 2000-question bank costs a handful of
+INSERTs instead of 2000 requests. Export streams rows with iterator().
+"""
+import csv
+import json
+
+from django.db import transaction
+
+from .grading import answer_keys
+from .models import Question
+from .serializers import QuestionImportSerializer
+
+FIELDS = ["title", "type", "correct", "incorrect1", "incorrect2", "incorrect3"]
+MAX_REPORTED_ERRORS = 100
+
+
+def decode_lines(lines, encoding="utf-8-sig"):
+    for line in lines:
+        yield line.decode(encoding) if isinstance(line, bytes) else line
+
+
+def iter_ndjson_rows(lines):
+    """
+    Yield (line_number, row dict or None, error) for NDJSON input.
+    """
+    for number, line in enumerate(decode_lines(lines), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Expected a JSON object."
+            continue
+        yield number, row, None
+
+
+def iter_csv_rows(lines):
+    """
+    Yield (line_number, row dict, None) for CSV input with a header row.
+    """
+    reader = csv.DictReader(decode_lines(lines))
+    for row in reader:
+        # strip columns that are not in the header (key None)
+        row.pop(None, None)
+        yield reader.line_num, row, None
+
+
+def import_questions(test, rows, batch_size=500, partial=False):
+    """
+    Validate and insert question rows for `test`.
+
+    With partial=False nothing is stored if any row is invalid.
+    Returns (created, error_count, errors) where errors lists the first
+    MAX_REPORTED_ERRORS problems as [{"line": n, "errors": ...}].
+    """
+    created = 0
+    error_count = 0
+    errors = []
+    batch = []
+
+    with transaction.atomic():
+        for number, row, error in rows:
+            if error is None:
+                serializer = QuestionImportSerializer(data=row)
+                if serializer.is_valid():
+                    batch.append(Question(test=test, **serializer.validated_data))
+                else:
+                    error = serializer.errors
+            if error is not None:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": number, "errors": error})
+                continue
+
+            if len(batch) >= batch_size:
+                Question.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if batch:
+            Question.objects.bulk_create(batch)
+            created += len(batch)
+
+        if error_count and not partial:
+            transaction.set_rollback(True)
+            created = 0
+
+    # bulk_create sends no signals
+    answer_keys.invalidate(test.pk)
+    return created, error_count, errors
+
+
+def export_rows(test):
+    return (
+        Question.objects.filter(test=test)
+        .order_by("id")
+        .values_list("id", *FIELDS)
+        .iterator(chunk_size=2000)
+    )
@@ -0,0 +1,68 @@
+"""
+CSV / NDJSON renderers for export endpoints.
+
+Besides the regular DRF `render()`, each renderer can `stream()` an iterable
+of row tuples as bytes, which export actions wrap in a StreamingHttpResponse
+so that only one chunk of rows is ever held in memory. Select them with
+`?format=csv|ndjson` or the Accept header.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import renderers
+
+
+class _Echo:
+    # file-like object for csv.writer that just returns what is written
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    # ISO dates/datetimes, like the JSON renderers
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def stream(self, fields, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields).encode(self.charset)
+        for row in rows:
+            yield writer.writerow([_cell(value) for value in row]).encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0].keys()) if rows and isinstance(rows[0], dict) else []
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([row.get(field) for field in fields])
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def stream(self, fields, rows):
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        for row in rows:
+            yield (encoder.encode(dict(zip(fields, row))) + "\n").encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        return "".join(
+            json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n" for row in rows
+        ).encode(self.charset)
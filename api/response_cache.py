@@ -0,0 +1,190 @@
+"""
+Rendered-response caching for read-mostly viewsets.
+
+CachedResponseMixin stores the rendered bytes of list/retrieve responses in
+the Django cache (RESPONSE_CACHE_ALIAS), keyed by host + path + normalized
+query params + media type. Every key also embeds a generation counter per
+model in `cache_models`; saving or deleting any instance of such a model
+bumps its generation, which orphans all cached responses built from it
+without having to track individual keys.
+
+Responses carry a strong ETag (sha256 of the body) and a matching
+If-None-Match is answered with 304 Not Modified.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+# labels of models that back at least one cached viewset
+_cached_models = set()
+
+REPLAYED_HEADERS = ("Content-Type", "Vary", "Allow")
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def generation_key(label):
+    return f"respcache:gen:{label}"
+
+
+def bump_generation(label):
+    cache = get_cache()
+    key = generation_key(label)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_responses(sender, **kwargs):
+    label = sender._meta.label_lower
+    if label in _cached_models:
+        bump_generation(label)
+
+
+class CachedResponseMixin:
+    """
+    Mix into a viewset (before BaseViewSet) to cache GET list/retrieve.
+
+    `cache_models` – models whose changes invalidate this viewset's cached
+    responses; defaults to the queryset model.
+    `action_cache_models` – {action: [models]} invalidating only the cached
+    responses of that action, e.g. the children shown by a detail page.
+    `cache_timeout` – seconds, defaults to RESPONSE_CACHE_TIMEOUT.
+
+    Put it before api.async_views.AsyncReadMixin to cache the async
+    list/retrieve as well.
+    """
+
+    cache_models = None
+    action_cache_models = {}
+    cache_timeout = None
+    cached_actions = ("list", "retrieve")
+    cache_lookup = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for action in [None, *cls.action_cache_models]:
+            for model in cls.get_cache_models(action):
+                _cached_models.add(model._meta.label_lower)
+
+    @classmethod
+    def get_cache_models(cls, action=None):
+        if cls.cache_models is not None:
+            models = list(cls.cache_models)
+        else:
+            queryset = getattr(cls, "queryset", None)
+            models = [queryset.model] if queryset is not None else []
+        return models + list(cls.action_cache_models.get(action, ()))
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached(super().aretrieve, request, *args, **kwargs)
+
+    def cached(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        cache, key, entry = self.get_cached_entry(request)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = self.make_cache_entry(request, response, *args, **kwargs)
+            cache.set(key, entry, self.get_cache_timeout())
+        return self.replay(request, entry)
+
+    async def acached(self, handler, request, *args, **kwargs):
+        """
+        cached() for the async handlers of api.async_views.AsyncReadMixin.
+        """
+        if not self.is_cacheable(request):
+            return await handler(request, *args, **kwargs)
+
+        cache, key, entry = self.cache_lookup or await sync_to_async(self.get_cached_entry)(request)
+        if entry is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = self.make_cache_entry(request, response, *args, **kwargs)
+            await cache.aset(key, entry, self.get_cache_timeout())
+        return self.replay(request, entry)
+
+    def initial_sync(self, request, *args, **kwargs):
+        super().initial_sync(request, *args, **kwargs)
+        # saves acached() a second trip to the sync thread
+        if self.is_cacheable(request):
+            self.cache_lookup = self.get_cached_entry(request)
+
+    def get_cached_entry(self, request):
+        cache = get_cache()
+        key = self.get_response_cache_key(request, cache)
+        return cache, key, cache.get(key)
+
+    def make_cache_entry(self, request, response, *args, **kwargs):
+        # render now so the body can be stored and hashed
+        response = self.finalize_response(request, response, *args, **kwargs)
+        response.render()
+        return (
+            response.content,
+            f'"{hashlib.sha256(response.content).hexdigest()}"',
+            [(name, response[name]) for name in REPLAYED_HEADERS if response.has_header(name)],
+        )
+
+    def replay(self, request, entry):
+        content, etag, headers = entry
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content)
+        for name, value in headers:
+            response[name] = value
+        response["ETag"] = etag
+        return response
+
+    def is_cacheable(self, request):
+        # the browsable API renders the current user, never cache it
+        return (
+            request.method == "GET"
+            and self.action in self.cached_actions
+            and getattr(request.accepted_renderer, "format", None) != "api"
+        )
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+    def get_response_cache_key(self, request, cache):
+        labels = [model._meta.label_lower for model in self.get_cache_models(self.action)]
+        generations = cache.get_many([generation_key(label) for label in labels])
+        params = sorted(
+            (name, sorted(values)) for name, values in request.query_params.lists()
+        )
+        raw = "|".join([
+            request.get_host(),
+            request.path,
+            repr(params),
+            request.accepted_media_type or "",
+            ",".join(str(generations.get(generation_key(label), 0)) for label in labels),
+        ])
+        return f"respcache:{hashlib.sha256(raw.encode()).hexdigest()}"
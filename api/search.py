@@ -0,0 +1,343 @@
+"""
+Full-text search for ?search= on the larger tables.
+
+SearchFilter turns ?search= into OR'ed `LIKE '%term%'` clauses that scan
+the whole table. FullTextSearchFilter answers the same `search_fields` from
+an inverted index instead:
+
+  - SQLite: an FTS5 external-content table per model (api_search_<model>),
+    created by migration 0006 and kept in sync by INSERT/UPDATE/DELETE
+    triggers, so bulk_create() and QuerySet.update() are covered too.
+    Matching rows come from one `MATCH` subquery.
+  - Anything else (or SQLite built without FTS5): a process-local
+    PythonIndex, built on first use, updated from post_save/post_delete
+    and rebuilt after SEARCH_INDEX_TTL seconds to pick up writes made by
+    other processes. Rebuilds load fresh structures without holding the
+    lock and swap them in; searches use the previous index meanwhile.
+
+Every search term must match (AND), each as a prefix of a word: "jo smi"
+finds "John Smith", but unlike SearchFilter's substring match "mith" does
+not. Results are unranked and keep the view's ordering, which the keyset
+pagination needs: the FTS5 filter is a plain MATCH subquery, the Python
+one an `id IN (...)` of every matching row.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core import checks
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.filters import SearchFilter
+
+from .models import FAQ, Course, Lesson, Material, User
+
+# model -> indexed fields; changing a list needs a migration for FTS5.
+# On SQLite, altering any column of an indexed table rebuilds it and drops
+# the FTS5 sync triggers: such a migration must recreate them afterwards, or
+# keep state-only changes out of the database with SeparateDatabaseAndState
+# as 0007 does (check_search_triggers reports misses).
+SEARCH_INDEXES = {
+    User: ["firstname", "lastname", "email", "login"],
+    Course: ["title", "description"],
+    FAQ: ["question", "answer"],
+    Lesson: ["title", "description"],
+    Material: ["title", "source"],
+}
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Lowercased word tokens without diacritics, like FTS5's unicode61
+    tokenizer with remove_diacritics.
+    """
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return TOKEN_RE.findall(text)
+
+
+def fts_table(model):
+    return f"api_search_{model._meta.model_name}"
+
+
+@checks.register(checks.Tags.database)
+def check_search_triggers(app_configs=None, databases=None, **kwargs):
+    """
+    Every FTS5 search table needs its three sync triggers; without them
+    ?search= silently misses new and changed rows.
+    """
+    errors = []
+    for alias in databases or []:
+        if connections[alias].vendor != "sqlite":
+            continue
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            names = {(kind, name) for kind, name in cursor.fetchall()}
+        for model in SEARCH_INDEXES:
+            table = fts_table(model)
+            if ("table", table) not in names:
+                continue
+            triggers = [f"{table}_{suffix}" for suffix in ("ai", "ad", "au")]
+            missing = [name for name in triggers if ("trigger", name) not in names]
+            if missing:
+                errors.append(checks.Error(
+                    f"Search table {table} is missing its sync triggers: {', '.join(missing)}.",
+                    hint="Recreate them in the migration that altered the table (see 0006).",
+                    obj=model,
+                    id="api.E001",
+                ))
+    return errors
+
+
+class FTS5Index:
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.table = fts_table(model)
+
+    def match_expression(self, text, fields):
+        terms = tokenize(text)
+        if not terms:
+            return None
+        query = " AND ".join(f'"{term}"*' for term in terms)
+        return f"{{{' '.join(fields)}}} : ({query})"
+
+    def filter(self, queryset, text, fields):
+        match = self.match_expression(text, fields)
+        if match is None:
+            return queryset.none()
+        # unranked: the page is ordered by the view anyway
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        )
+
+
+class PythonIndex:
+    """
+    In-memory inverted index: token -> {pk: fields containing it} plus a
+    sorted vocabulary for prefix lookups.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._built_at = None
+        self._pending = None  # pk -> values or None (deleted), saved during a rebuild
+        self._postings = {}
+        self._vocabulary = []
+        self._documents = {}  # pk -> {token: fields containing it}
+
+    @property
+    def ttl(self):
+        return getattr(settings, "SEARCH_INDEX_TTL", 300)
+
+    def _is_fresh(self):
+        return self._built_at is not None and time.monotonic() - self._built_at < self.ttl
+
+    def _ensure_built(self):
+        if self._is_fresh():
+            return
+        # one rebuild at a time; only the very first build makes others wait
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self._is_fresh():
+                return
+            with self._lock:
+                self._pending = {}
+            fresh = self._load()
+            with self._lock:
+                self._postings, self._vocabulary, self._documents = (
+                    fresh._postings, fresh._vocabulary, fresh._documents
+                )
+                # writes seen while loading may be missing from the rows read
+                for pk, values in self._pending.items():
+                    self._remove(pk)
+                    if values is not None:
+                        self._add(pk, values, keep_sorted=True)
+                self._pending = None
+                self._built_at = time.monotonic()
+        finally:
+            self._build_lock.release()
+
+    def _load(self):
+        """
+        A new, unshared index filled from the database.
+        """
+        fresh = type(self)(self.model, self.fields)
+        for pk, *values in self.model.objects.values_list("pk", *self.fields).iterator(chunk_size=2000):
+            fresh._add(pk, values)
+        fresh._vocabulary.sort()
+        return fresh
+
+    def _add(self, pk, values, keep_sorted=False):
+        document = {}
+        for field, value in zip(self.fields, values):
+            for token in tokenize(value):
+                document.setdefault(token, set()).add(field)
+        for token, fields in document.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if keep_sorted:
+                    insort(self._vocabulary, token)
+                else:
+                    self._vocabulary.append(token)
+            postings[pk] = fields
+        self._documents[pk] = document
+
+    def _remove(self, pk):
+        # emptied tokens stay in the vocabulary until the next rebuild
+        for token in self._documents.pop(pk, {}):
+            self._postings.get(token, {}).pop(pk, None)
+
+    def update(self, instance):
+        values = [getattr(instance, field) for field in self.fields]
+        with self._lock:
+            if self._pending is not None:
+                self._pending[instance.pk] = values
+            if self._built_at is None:
+                return
+            self._remove(instance.pk)
+            self._add(instance.pk, values, keep_sorted=True)
+
+    def delete(self, pk):
+        with self._lock:
+            if self._pending is not None:
+                self._pending[pk] = None
+            if self._built_at is not None:
+                self._remove(pk)
+
+    def _prefix_range(self, term):
+        return (
+            bisect_left(self._vocabulary, term),
+            bisect_left(self._vocabulary, term + "\U0010ffff"),
+        )
+
+    def _matches(self, start, end, cap):
+        """
+        Number of postings in a vocabulary range, counted up to `cap`.
+        """
+        count = 0
+        for token in self._vocabulary[start:end]:
+            count += len(self._postings[token])
+            if count > cap:
+                break
+        return count
+
+    def matching_ids(self, text, fields):
+        """
+        Primary keys of the documents in which every term of `text` is the
+        prefix of a token of one of `fields`.
+        """
+        terms = tokenize(text)
+        if not terms:
+            return set()
+        self._ensure_built()
+        fields = set(fields)
+        with self._lock:
+            # expand the most selective term from the postings, then check
+            # the other terms only against its (few) candidate documents
+            ranges = []
+            best = len(self._documents)
+            for term in set(terms):
+                start, end = self._prefix_range(term)
+                count = self._matches(start, end, best)
+                best = min(best, count)
+                ranges.append((count, term, start, end))
+            ranges.sort()
+            _, _, start, end = ranges[0]
+
+            matched = {
+                pk
+                for token in self._vocabulary[start:end]
+                for pk, found in self._postings[token].items()
+                if found & fields
+            }
+            for _, term, _, _ in ranges[1:]:
+                matched = {
+                    pk for pk in matched
+                    if any(token.startswith(term) and found & fields for token, found in self._documents[pk].items())
+                }
+        return matched
+
+    def filter(self, queryset, text, fields):
+        return queryset.filter(pk__in=self.matching_ids(text, fields))
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _fts5_available(model):
+    if getattr(settings, "SEARCH_BACKEND", "auto") == "python" or connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts_table(model)])
+        return cursor.fetchone() is not None
+
+
+def get_index(model):
+    """
+    The search index of `model`, or None if the model is not indexed.
+    """
+    if model not in SEARCH_INDEXES:
+        return None
+    index = _indexes.get(model)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(model)
+            if index is None:
+                backend = FTS5Index if _fts5_available(model) else PythonIndex
+                index = _indexes[model] = backend(model, SEARCH_INDEXES[model])
+    return index
+
+
+def reset_indexes():
+    """
+    Forget the per-model indexes (and the backend choice), e.g. after
+    changing SEARCH_BACKEND in tests.
+    """
+    with _indexes_lock:
+        _indexes.clear()
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in SearchFilter: uses the search index when every entry of the
+    view's search_fields is a plain indexed field, SearchFilter otherwise.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not search_fields or not terms:
+            return queryset
+
+        index = get_index(queryset.model)
+        if index is None or not set(search_fields) <= set(index.fields):
+            return super().filter_queryset(request, queryset, view)
+        return index.filter(queryset, " ".join(terms), search_fields)
+
+
+@receiver(post_save)
+def update_python_index(sender, instance, **kwargs):
+    index = _indexes.get(sender)
+    if isinstance(index, PythonIndex):
+        index.update(instance)
+
+
+@receiver(post_delete)
+def delete_from_python_index(sender, instance, **kwargs):
+    index = _indexes.get(sender)
+    if isinstance(index, PythonIndex):
+        index.delete(instance.pk)
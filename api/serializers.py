@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from .images import ImageSrcsetField
+
 from .models import (
     Course,
     Group,
@@ -21,10 +23,19 @@ from .models import (
     ContactStats,
     ContactInfo,
     SuccessStory,
+    Balance,
+    Job,
 )
 
+# Group.__str__ / Test.__str__ read course.title; the browsable API renders
+# every choice of these fields with str(), so join the course up front.
+GROUP_CHOICES = Group.objects.select_related("course")
+TEST_CHOICES = Test.objects.select_related("course")
+
 
 class CourseSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image_path")
+
     class Meta:
         model = Course
         fields = "__all__"
@@ -41,6 +52,10 @@ class GroupSerializer(serializers.ModelSerializer):
 class UserSerializer(serializers.ModelSerializer):
     # don't expose password on read
     password = serializers.CharField(write_only=True)
+    group = serializers.PrimaryKeyRelatedField(
+        queryset=GROUP_CHOICES, allow_null=True, required=False
+    )
+    image_srcset = ImageSrcsetField(source="image_path")
 
     class Meta:
         model = User
@@ -49,6 +64,7 @@ class UserSerializer(serializers.ModelSerializer):
             "firstname",
             "lastname",
             "image_path",
+            "image_srcset",
             "email",
             "login",
             "password",
@@ -90,20 +106,31 @@ class TestSerializer(serializers.ModelSerializer):
 
 
 class QuestionSerializer(serializers.ModelSerializer):
-    test = serializers.PrimaryKeyRelatedField(queryset=Test.objects.all())
+    test = serializers.PrimaryKeyRelatedField(queryset=TEST_CHOICES)
 
     class Meta:
         model = Question
         fields = "__all__"
 
 
+class QuestionImportSerializer(serializers.ModelSerializer):
+    """
+    One row of a question bank import; the test comes from the URL.
+    """
+    class Meta:
+        model = Question
+        fields = ["title", "type", "correct", "incorrect1", "incorrect2", "incorrect3"]
+
+
 class StudentSolveSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
-    test = serializers.PrimaryKeyRelatedField(queryset=Test.objects.all())
+    test = serializers.PrimaryKeyRelatedField(queryset=TEST_CHOICES)
 
     class Meta:
         model = StudentSolve
         fields = "__all__"
+        # only the grader decides whether a solve passed
+        read_only_fields = ("solve_status",)
 
 
 class IntegrationSerializer(serializers.ModelSerializer):
@@ -111,11 +138,11 @@ class IntegrationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Integration
-        fields = "__all__"
+        exclude = ("api_key_hash",)
 
 
 class JournalSerializer(serializers.ModelSerializer):
-    group = serializers.PrimaryKeyRelatedField(queryset=Group.objects.all())
+    group = serializers.PrimaryKeyRelatedField(queryset=GROUP_CHOICES)
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
 
     class Meta:
@@ -161,12 +188,16 @@ class PaymentSerializer(serializers.ModelSerializer):
 
 
 class TeamSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image")
+
     class Meta:
         model = Team
         fields = "__all__"
 
 
 class PartnerSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image")
+
     class Meta:
         model = Partner
         fields = "__all__"
@@ -213,4 +244,89 @@ class SuccessStorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SuccessStory
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+class TestSubmissionSerializer(serializers.Serializer):
+    """
+    Whole-test submission: {"user": 1, "answers": {"<question_id>": answer}}.
+    ONE/TYPED answers are strings, MULTI answers a list (or "A,B" string).
+    """
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    answers = serializers.DictField(child=serializers.JSONField(), allow_empty=True)
+
+    def validate_answers(self, value):
+        errors = {}
+        for question_id, answer in value.items():
+            if isinstance(answer, list):
+                valid = all(isinstance(item, str) for item in answer)
+            else:
+                valid = isinstance(answer, str)
+            if not valid:
+                errors[question_id] = "Expected a string or a list of strings."
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+
+
+class CoursePageLessonSerializer(LessonSerializer):
+    material = MaterialSerializer(read_only=True)
+
+
+class CoursePageSerializer(CourseSerializer):
+    """
+    Course with everything the course page needs. Expects the queryset of
+    CourseViewSet.page (prefetched children + test_count annotation).
+    """
+    included_items = CourseIncludedSerializer(many=True, read_only=True)
+    process_steps = CourseProcessSerializer(many=True, read_only=True)
+    lessons = CoursePageLessonSerializer(many=True, read_only=True)
+    groups = GroupSerializer(source="active_groups", many=True, read_only=True)
+    test_count = serializers.IntegerField(read_only=True)
+
+
+class JournalBulkEntrySerializer(serializers.Serializer):
+    # plain ids – all users are validated together with one IN query
+    user = serializers.IntegerField(min_value=1)
+    status = serializers.BooleanField()
+
+
+class JournalBulkSerializer(serializers.Serializer):
+    """
+    Attendance of a whole group for one day:
+    {"group": 1, "date": "2025-01-31", "entries": [{"user": 7, "status": true}, ...]}
+    """
+    group = serializers.PrimaryKeyRelatedField(queryset=GROUP_CHOICES)
+    date = serializers.DateField()
+    entries = JournalBulkEntrySerializer(many=True, allow_empty=False)
+
+    def validate_entries(self, entries):
+        user_ids = [entry["user"] for entry in entries]
+        if len(user_ids) != len(set(user_ids)):
+            raise serializers.ValidationError("Each user may appear only once.")
+        return entries
+
+    def validate(self, attrs):
+        user_ids = {entry["user"] for entry in attrs["entries"]}
+        members = set(
+            User.objects.filter(pk__in=user_ids, group=attrs["group"]).values_list("pk", flat=True)
+        )
+        invalid = sorted(user_ids - members)
+        if invalid:
+            raise serializers.ValidationError(
+                {"entries": f"Users not in group {attrs['group'].pk}: {invalid}"}
+            )
+        return attrs
+
+
+class BalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Balance
+        fields = ["user", "charged", "credited", "owed", "updated_at"]
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = "__all__"
+        read_only_fields = [field.name for field in Job._meta.fields]
@@ -0,0 +1,61 @@
+"""
+Content-addressed storage for uploaded images.
+
+Files are stored as <upload_to>/<sha256 of the content><extension>, so the
+same picture uploaded twice is stored once, and a stored name never changes
+its content – api.images relies on that to cache derivative manifests for
+good.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+DIGEST_RE = re.compile(r"(?:^|/)([0-9a-f]{64})\.[^/.]+$")
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def name_digest(name):
+    """
+    The content digest embedded in a stored name, None for legacy names.
+    """
+    match = DIGEST_RE.search(name or "")
+    return match.group(1) if match else None
+
+
+@deconstructible(path="api.storage.ContentAddressedStorage")
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        directory, filename = posixpath.split(name.replace("\\", "/"))
+        extension = posixpath.splitext(filename)[1].lower()
+        name = posixpath.join(directory, file_digest(content) + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def store(self, name, content):
+        """
+        Save derived content under exactly `name`; an existing file there
+        is kept (same name, same content).
+        """
+        if not self.exists(name):
+            self._save(name, content)
+        return name
+
+
+image_storage = ContentAddressedStorage()
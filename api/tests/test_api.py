@@ -0,0 +1,1419 @@
+import datetime
+import io
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import AsyncClient, Client, RequestFactory, TestCase, override_settings
+from django.test.client import AsyncClientHandler
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from website.asgi import AsyncViewASGIHandler
+from website.metrics import request_metrics
+
+from .. import analytics, autocomplete, images, jobs
+from ..authentication import IntegrationAPIKeyAuthentication, IntegrationUser, integration_cache
+from ..bench import bench_host, compare_reports, generate, router_endpoints, run_benchmark, wsgi_get
+from ..cache import TTLCache
+from ..grading import answer_keys, answers_from_solve, grade_submission
+from ..management.commands.bench_indexes import query_paths
+from ..models import (
+    FAQ,
+    Application,
+    Balance,
+    Course,
+    CourseIncluded,
+    CourseProcess,
+    Group,
+    Integration,
+    Job,
+    Journal,
+    Lesson,
+    Material,
+    Partner,
+    Payment,
+    Question,
+    StudentSolve,
+    StudentSummary,
+    Test,
+    User,
+)
+from ..pagination import KeysetCursorPagination
+from ..principals import (
+    INTEGRATION_ROLE,
+    IntegrationPrincipal,
+    is_admin,
+    is_integration,
+    principal_cache,
+    resolve_principal,
+)
+from ..query_guard import query_guard
+from ..search import FTS5Index, PythonIndex, check_search_triggers, get_index, reset_indexes
+from ..throttling import CacheRateLimitBackend, LocalRateLimitBackend, SlidingWindowLimiter, reset_limiter
+from ..urls import router
+from ..views import PaymentViewSet
+from .utils import ConstantQueryCountMixin, login_admin, make_rows
+
+
+class CoursePageTests(TestCase):
+    def setUp(self):
+        # throttling and the response cache both live in the default cache
+        cache.clear()
+        self.course = Course.objects.create(title="Python", price=100)
+
+    def add_children(self, count):
+        for i in range(count):
+            material = Material.objects.create(title=f"Slides {i}", source=f"/m/{i}.pdf")
+            Lesson.objects.create(course=self.course, title=f"Lesson {i}", material=material)
+            CourseIncluded.objects.create(course=self.course, title=f"Item {i}")
+            CourseProcess.objects.create(course=self.course, rank=i, title=f"Step {i}")
+            Group.objects.create(
+                course=self.course,
+                title=f"Group {i}",
+                starting_date=datetime.date(2025, 1, 1),
+                archived=i % 2 == 1,
+            )
+            Test.objects.create(course=self.course, title=f"Test {i}")
+
+    def get_page(self):
+        cache.clear()
+        return self.client.get(f"/courses/{self.course.pk}/page/")
+
+    def test_page_contains_children(self):
+        self.add_children(2)
+        response = self.get_page()
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["included_items"]), 2)
+        self.assertEqual([step["rank"] for step in data["process_steps"]], [0, 1])
+        self.assertEqual(data["lessons"][0]["material"]["title"], "Slides 0")
+        self.assertEqual([group["title"] for group in data["groups"]], ["Group 0"])
+        self.assertEqual(data["test_count"], 2)
+
+    def test_page_query_count_is_constant(self):
+        self.add_children(1)
+        with self.assertNumQueries(5):
+            self.get_page()
+
+        self.add_children(20)
+        with self.assertNumQueries(5):
+            self.get_page()
+
+    def test_page_is_cached_until_a_child_changes(self):
+        self.get_page()
+        with self.assertNumQueries(0):
+            self.client.get(f"/courses/{self.course.pk}/page/")
+
+        Lesson.objects.create(course=self.course, title="New lesson")
+        response = self.client.get(f"/courses/{self.course.pk}/page/")
+        self.assertEqual(len(response.json()["lessons"]), 1)
+
+    def test_children_only_invalidate_the_page(self):
+        self.client.get("/courses/")
+        self.client.get(f"/courses/{self.course.pk}/page/")
+        self.add_children(1)
+        with self.assertNumQueries(0):
+            self.client.get("/courses/")
+        self.assertEqual(self.client.get(f"/courses/{self.course.pk}/page/").json()["test_count"], 1)
+
+
+class BenchHarnessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        generate(scale=0.01, seed=1)
+        admin = User.objects.filter(role=User.Role.ADMIN).first()
+        self.client.force_login(
+            get_user_model().objects.create(username="bench-admin", email=admin.email)
+        )
+
+    def test_every_router_prefix_is_benchmarked(self):
+        endpoints = router_endpoints(router)
+        self.assertEqual(
+            {name.split(" ")[0] for name, _ in endpoints},
+            {prefix for prefix, _, _ in router.registry},
+        )
+
+        report = run_benchmark(self.client, endpoints, repeat=2)
+        failing = {name: row["status"] for name, row in report.items() if row["status"] != 200}
+        self.assertEqual(failing, {})
+        for row in report.values():
+            self.assertLessEqual(row["p50_ms"], row["p99_ms"])
+
+    def test_compare_reports_flags_more_queries(self):
+        old = {"endpoints": {"users list": {"p95_ms": 10.0, "queries_max": 3}}}
+        new = {"endpoints": {"users list": {"p95_ms": 10.5, "queries_max": 4}}}
+        self.assertEqual(compare_reports(old, new), [("users list", "queries 3 -> 4")])
+
+    def test_error_responses_are_not_timed(self):
+        report = run_benchmark(self.client, [("faq retrieve", "/faq/0/")], repeat=2)
+        self.assertEqual(report["faq retrieve"], {"url": "/faq/0/", "status": 404, "error": True})
+        old = {"endpoints": {"faq retrieve": {"p95_ms": 1.0, "queries_max": 1}}}
+        self.assertEqual(compare_reports(old, {"endpoints": report}), [])
+
+    def test_bench_host_is_allowed(self):
+        with override_settings(ALLOWED_HOSTS=[]):
+            self.assertEqual(bench_host(), "localhost")
+        with override_settings(ALLOWED_HOSTS=["*"]):
+            self.assertEqual(bench_host(), "localhost")
+        with override_settings(ALLOWED_HOSTS=[".example.com", "api.example.com"]):
+            self.assertEqual(bench_host(), "example.com")
+            self.assertEqual(wsgi_get(get_wsgi_application(), "/faq/", bench_host()), 200)
+
+    def test_seeded_solves_are_in_the_grader_format(self):
+        solves = StudentSolve.objects.values_list("solve", "solve_typed")
+        self.assertTrue(solves)
+        self.assertNotIn(None, [answers_from_solve(*solve) for solve in solves])
+        # and their stored status is what the grader computes
+        out = io.StringIO()
+        call_command("regrade", "--all", "--dry-run", stdout=out)
+        self.assertIn(" 0 changed", out.getvalue())
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        request_metrics.reset()
+        admin = User.objects.create(
+            firstname="A", lastname="Dmin", email="admin@example.com", login="admin",
+            password="!", role=User.Role.ADMIN,
+        )
+        self.admin = get_user_model().objects.create(username="admin", email=admin.email)
+
+    def test_metrics_are_admin_only(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    def test_requests_are_exported(self):
+        self.client.get("/faq/")
+        self.client.force_login(self.admin)
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="faq-list",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{view="faq-list",method="GET"} 1', body)
+        self.assertIn('http_request_db_queries_bucket{view="faq-list",method="GET",le="+Inf"} 1', body)
+
+    def test_streamed_responses_count_their_queries(self):
+        student = make_rows(User, 1)[0]
+        Payment.objects.create(user=student, type=Payment.PaymentType.CARD, payed=10)
+        response = self.client.get("/payments/export/", {"format": "csv"})
+        # recorded once the body has been streamed, with the queries it ran
+        self.assertNotIn("payment-export", request_metrics.render())
+        with CaptureQueriesContext(connection) as queries:
+            b"".join(response.streaming_content)
+        self.assertTrue(queries)
+        response.close()
+        body = request_metrics.render()
+        self.assertIn('http_request_db_queries_count{view="payment-export",method="GET"} 1', body)
+        self.assertIn(f'http_request_db_queries_sum{{view="payment-export",method="GET"}} {len(queries)}', body)
+
+    @override_settings(METRICS_SLOW_REQUEST_QUERIES=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs("website.metrics", "WARNING") as logs:
+            Client().get("/faq/")
+        self.assertIn("SELECT", logs.output[0])
+
+
+class ListQueryCountTests(ConstantQueryCountMixin, TestCase):
+    router = router
+    list_params = {"payments/balances": "all=1"}
+
+    def login(self):
+        admin = User.objects.create(
+            firstname="A", lastname="Dmin", email="guard-admin@example.com", login="guard-admin",
+            password="!", role=User.Role.ADMIN,
+        )
+        self.client.force_login(
+            get_user_model().objects.create(username="guard-admin", email=admin.email)
+        )
+
+    def test_browsable_api_choices_do_not_query_per_row(self):
+        # untitled tests render as "Test #1 (<course title>)"
+        Test.objects.filter(pk__in=[test.pk for test in make_rows(Test, 20)]).update(title="")
+        make_rows(Group, 20)
+        self.login()
+        for url in ["/questions/", "/student-solves/", "/journal/", "/users/"]:
+            cache.clear()
+            with self.subTest(url=url), query_guard() as guard:
+                self.client.get(url, HTTP_ACCEPT="text/html")
+                self.assertEqual(guard.repeated(), [])
+
+    @override_settings(QUERY_GUARD="warn", QUERY_GUARD_THRESHOLD=1)
+    def test_debug_middleware_logs_repeated_statements(self):
+        with self.assertLogs("api.query_guard", "WARNING") as logs:
+            Client().get("/faq/")
+        self.assertIn("Possible N+1 in GET /faq/", logs.output[0])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_indexes()
+        self.john = User.objects.create(
+            firstname="Jóhn", lastname="Smith", email="john.smith@example.com", login="jsmith", password="!",
+        )
+        self.johanna = User.objects.create(
+            firstname="Johanna", lastname="Smithson", email="jo@example.com", login="jo", password="!",
+        )
+        admin = User.objects.create(
+            firstname="A", lastname="Dmin", email="search-admin@example.com", login="search-admin",
+            password="!", role=User.Role.ADMIN,
+        )
+        self.client.force_login(get_user_model().objects.create(username="search-admin", email=admin.email))
+
+    def tearDown(self):
+        reset_indexes()
+
+    def search_users(self, text):
+        response = self.client.get("/users/", {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["id"] for row in response.json()["results"])
+
+    def check_backend(self):
+        self.assertEqual(self.search_users("jo smi"), [self.john.pk, self.johanna.pk])
+        self.assertEqual(self.search_users("john"), [self.john.pk])
+        self.assertEqual(self.search_users("smithson"), [self.johanna.pk])
+        # terms match word prefixes, not substrings
+        self.assertEqual(self.search_users("mith"), [])
+
+        self.john.lastname = "Brown"
+        self.john.save()
+        self.assertEqual(self.search_users("bro"), [self.john.pk])
+
+        self.johanna.delete()
+        self.assertEqual(self.search_users("johanna"), [])
+
+    def test_fts5_backend(self):
+        self.assertIsInstance(get_index(User), FTS5Index)
+        self.check_backend()
+
+        # triggers also see writes that bypass signals
+        User.objects.filter(pk=self.john.pk).update(login="zed")
+        self.assertEqual(self.search_users("zed"), [self.john.pk])
+
+    def test_missing_triggers_are_reported(self):
+        # no migration left an indexed table without its triggers
+        self.assertEqual(check_search_triggers(databases=["default"]), [])
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER api_search_course_au")
+        errors = check_search_triggers(databases=["default"])
+        self.assertEqual([error.id for error in errors], ["api.E001"])
+        self.assertIn("api_search_course_au", errors[0].msg)
+
+    @override_settings(SEARCH_BACKEND="python")
+    def test_python_backend(self):
+        self.assertIsInstance(get_index(User), PythonIndex)
+        self.check_backend()
+
+    @override_settings(SEARCH_BACKEND="python")
+    def test_python_rebuild_keeps_concurrent_saves(self):
+        index = get_index(User)
+        load = index._load
+
+        def load_during_save():
+            # the rows are read without holding the index lock
+            self.assertTrue(index._lock.acquire(blocking=False))
+            index._lock.release()
+            fresh = load()
+            self.john.lastname = "Brown"
+            self.john.save()
+            return fresh
+
+        with mock.patch.object(index, "_load", load_during_save):
+            self.assertEqual(index.matching_ids("bro", index.fields), {self.john.pk})
+        self.assertEqual(index.matching_ids("smith", ["lastname"]), {self.johanna.pk})
+
+    def test_unindexed_models_use_search_filter(self):
+        group = make_rows(Group, 1)[0]
+        response = self.client.get("/groups/", {"search": group.title[:5]})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [group.pk])
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        autocomplete.reset_indexes()
+        self.john = User.objects.create(
+            firstname="John", lastname="Smith", email="john@example.com", login="jsmith", password="!",
+        )
+        self.johanna = User.objects.create(
+            firstname="Johanna", lastname="Karimova", email="johanna@example.com", login="jk", password="!",
+        )
+        self.course = Course.objects.create(title="Advanced JavaScript")
+
+    def tearDown(self):
+        autocomplete.reset_indexes()
+
+    def ids(self, index, text):
+        rows, _ = index.query(text)
+        return [row["id"] for row in rows]
+
+    def test_prefix_and_fuzzy_matches(self):
+        self.assertEqual(self.ids(autocomplete.users, "jo"), [self.johanna.pk, self.john.pk])
+        self.assertEqual(self.ids(autocomplete.users, "smi jo"), [self.john.pk])
+        self.assertEqual(self.ids(autocomplete.users, "xyz"), [])
+
+        rows, fuzzy = autocomplete.users.query("jhon smiht")
+        self.assertEqual(([row["id"] for row in rows], fuzzy), ([self.john.pk], True))
+        self.assertEqual(self.ids(autocomplete.courses, "javscript"), [self.course.pk])
+
+    def test_follows_saves_and_deletes(self):
+        self.assertEqual(self.ids(autocomplete.courses, "adv"), [self.course.pk])
+        self.course.title = "Data Science"
+        self.course.save()
+        self.assertEqual(self.ids(autocomplete.courses, "adv"), [])
+        self.assertEqual(self.ids(autocomplete.courses, "data"), [self.course.pk])
+        self.course.delete()
+        self.assertEqual(self.ids(autocomplete.courses, "data"), [])
+
+    def test_rebuild_keeps_concurrent_saves(self):
+        index = autocomplete.courses
+        load = index._load
+
+        def load_during_save():
+            # the rows are read without holding the index lock
+            self.assertTrue(index._lock.acquire(blocking=False))
+            index._lock.release()
+            fresh = load()
+            self.course.title = "Data Science"
+            self.course.save()
+            return fresh
+
+        with mock.patch.object(index, "_load", load_during_save):
+            self.assertEqual(self.ids(index, "data"), [self.course.pk])
+        self.assertEqual(self.ids(index, "adv"), [])
+
+    def test_endpoints(self):
+        autocomplete.courses.query("warm")
+        with self.assertNumQueries(0):
+            response = self.client.get("/autocomplete/courses/", {"q": "adv"})
+        self.assertEqual(response.json(), {"results": [{"id": self.course.pk, "title": "Advanced JavaScript"}], "fuzzy": False})
+        self.assertEqual(self.client.get("/autocomplete/courses/", {"q": "adv", "limit": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/autocomplete/users/", {"q": "jo"}).status_code, 403)
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        images._manifests.clear()
+        cache.clear()
+
+    def upload(self, name, size):
+        buffer = io.BytesIO()
+        Image.new("RGBA", size, (200, 0, 0, 128)).save(buffer, "PNG")
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def create_partner(self, name, image):
+        partner = Partner.objects.create(name=name, image=image)
+        jobs.run_pending()
+        return partner
+
+    def test_derivatives_and_srcset(self):
+        first = self.create_partner("a", self.upload("logo.png", (2000, 1000)))
+        second = self.create_partner("b", self.upload("copy.PNG", (2000, 1000)))
+        # same content, same file
+        self.assertEqual(first.image.name, second.image.name)
+
+        srcset = self.client.get(f"/partners/{first.pk}/").json()["image_srcset"]
+        self.assertEqual((srcset["width"], srcset["height"]), (2000, 1000))
+        self.assertEqual([entry.split()[-1] for entry in srcset["webp"].split(", ")], ["320w", "640w", "1280w"])
+        self.assertTrue(srcset["jpeg"].startswith("http://testserver/media/derivatives/"))
+
+        small = self.create_partner("c", self.upload("small.png", (500, 100)))
+        self.assertEqual(images.get_manifest(small.image.name)["widths"], [320, 500])
+
+    def test_pending_derivatives_are_queued_once(self):
+        partner = Partner.objects.create(name="a", image=self.upload("logo.png", (800, 400)))
+        partner.name = "b"
+        partner.save()
+        self.assertEqual(Job.objects.filter(task="images.render_derivatives").count(), 1)
+
+    def test_build_command_renames_legacy_uploads(self):
+        partner = self.create_partner("a", None)
+        with self.upload("legacy.png", (400, 400)) as file:
+            legacy = images.image_storage._save("partners/legacy.png", file)
+        Partner.objects.filter(pk=partner.pk).update(image=legacy)
+        self.assertIsNone(self.client.get(f"/partners/{partner.pk}/").json()["image_srcset"])
+
+        call_command("build_image_derivatives", stdout=io.StringIO())
+        partner.refresh_from_db()
+        self.assertNotEqual(partner.image.name, legacy)
+        self.assertEqual(images.get_manifest(partner.image.name)["widths"], [320, 400])
+
+
+flaky_calls = []
+
+
+@jobs.task("tests.flaky", max_attempts=2)
+def flaky_task(fail):
+    flaky_calls.append(fail)
+    if fail:
+        raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        flaky_calls.clear()
+
+    def test_claims_are_exclusive(self):
+        for _ in range(3):
+            jobs.enqueue("tests.flaky", fail=False)
+        first, second = jobs.claim("a", 2), jobs.claim("b", 2)
+        self.assertEqual((len(first), len(second)), (2, 1))
+        self.assertEqual(jobs.claim("c", 2), [])
+        self.assertEqual(Job.objects.filter(status=Job.Status.RUNNING, attempts=1).count(), 3)
+
+    @override_settings(JOB_RETRY_BACKOFF=60)
+    def test_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue("tests.flaky", fail=True)
+        with self.assertLogs("api.jobs", "WARNING"):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.QUEUED, 1))
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreaterEqual((job.run_at - job.started_at).total_seconds(), 60)
+
+        self.assertEqual(jobs.run_pending(), 0)  # not due yet
+        Job.objects.filter(pk=job.pk).update(run_at=job.started_at)
+        with self.assertLogs("api.jobs", "WARNING"):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, len(flaky_calls)), (Job.Status.FAILED, 2, 2))
+
+        stats = {row["task"]: row for row in jobs.task_stats(job.created_at)}
+        self.assertEqual((stats["tests.flaky"]["failed"], stats["tests.flaky"]["queued"]), (1, 0))
+
+    @override_settings(APPLICATION_NOTIFY_EMAILS=["staff@example.com"])
+    def test_application_notification(self):
+        Application.objects.create(firstname="Ann", lastname="Lee", email="ann@example.com")
+        self.assertEqual(len(mail.outbox), 0)
+        jobs.run_pending()
+        self.assertEqual(mail.outbox[0].subject, "New application: Ann Lee")
+
+    def test_regrade_endpoint(self):
+        test = make_rows(Test, 1)[0]
+        self.assertEqual(self.client.post(f"/tests/{test.pk}/regrade/").status_code, 403)
+
+        admin = User.objects.create(
+            firstname="A", lastname="D", email="jobs-admin@example.com", login="jobs-admin",
+            password="!", role=User.Role.ADMIN,
+        )
+        self.client.force_login(get_user_model().objects.create(username="jobs-admin", email=admin.email))
+        response = self.client.post(f"/tests/{test.pk}/regrade/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get(pk=response.json()["job"]).payload, {"test_ids": [test.pk]})
+        self.assertEqual(jobs.run_pending(), 1)
+        stats = self.client.get("/jobs/stats/").json()["tasks"]
+        self.assertEqual([(row["task"], row["done"]) for row in stats], [("grading.regrade", 1)])
+
+        for hours in ["nan", "inf", "-1", "0", "1e12", "x"]:
+            response = self.client.get("/jobs/stats/", {"hours": hours})
+            self.assertEqual(response.status_code, 400, hours)
+            self.assertIn("hours", response.json())
+        self.assertEqual(self.client.get("/jobs/stats/", {"hours": "0.5"}).status_code, 200)
+
+    def test_enqueue_once_while_queued(self):
+        first = jobs.enqueue_once("tests.flaky", fail=False)
+        self.assertEqual(jobs.enqueue_once("tests.flaky", fail=False), first)
+        self.assertNotEqual(jobs.enqueue_once("tests.flaky", fail=True), first)
+        jobs.run_pending()
+        self.assertNotEqual(jobs.enqueue_once("tests.flaky", fail=False), first)
+
+
+class AsyncTestClientHandler(AsyncClientHandler, AsyncViewASGIHandler):
+    """
+    The test client's handler with website.asgi's view resolution.
+    """
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        request_metrics.reset()
+        self.courses = make_rows(Course, 5)
+        make_rows(Lesson, 3)
+        make_rows(StudentSolve, 3)
+        self.faq = FAQ.objects.create(question="Q?", answer="A.")
+        self.async_client = AsyncClient(HTTP_ACCEPT="application/json")
+        self.async_client.handler = AsyncTestClientHandler(enforce_csrf_checks=False)
+
+    def test_handler_resolves_async_views(self):
+        paths = {
+            "/courses/": True,
+            f"/faq/{self.faq.pk}/": True,
+            f"/courses/{self.courses[0].pk}/page/": False,
+            "/users/": False,
+        }
+        for path, is_async in paths.items():
+            func = self.async_client.handler.resolve_request(RequestFactory().get(path)).func
+            self.assertEqual(hasattr(func, "sync_view"), is_async, path)
+
+    async def test_lists_match_the_sync_views(self):
+        for path in ["/courses/", "/lessons/", "/student-solves/", "/faq/"]:
+            response = await self.async_client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(response.json(), (await self.sync_get(path)).json(), path)
+
+        # keyset pages, forwards and back
+        response = await self.async_client.get("/courses/", {"page_size": 2})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [c.pk for c in self.courses[:2]])
+        response = await self.async_client.get(response.json()["next"])
+        self.assertEqual([row["id"] for row in response.json()["results"]], [c.pk for c in self.courses[2:4]])
+        response = await self.async_client.get(response.json()["previous"])
+        self.assertEqual([row["id"] for row in response.json()["results"]], [c.pk for c in self.courses[:2]])
+
+    async def test_retrieve_and_not_found(self):
+        response = await self.async_client.get(f"/courses/{self.courses[0].pk}/")
+        self.assertEqual(response.json()["id"], self.courses[0].pk)
+        for path in ["/courses/999999/", "/courses/abc/", "/lessons/0/"]:
+            response = await self.async_client.get(path)
+            self.assertEqual((response.status_code, response.json()), (404, {"detail": "Not found."}), path)
+
+    async def test_cached_responses(self):
+        first = await self.async_client.get(f"/faq/{self.faq.pk}/")
+        self.assertEqual(first.json()["question"], "Q?")
+        second = await self.async_client.get(f"/faq/{self.faq.pk}/", headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(second.status_code, 304)
+
+        # writes take the sync view and still invalidate the cache
+        response = await self.async_client.patch(
+            f"/faq/{self.faq.pk}/", {"question": "New?"}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(f"/faq/{self.faq.pk}/")
+        self.assertEqual(response.json()["question"], "New?")
+
+    async def test_queries_are_counted(self):
+        await self.async_client.get("/lessons/")
+        self.assertIn(
+            'http_request_db_queries_sum{view="lesson-list",method="GET"} 1', request_metrics.render(),
+        )
+
+    @staticmethod
+    async def sync_get(path):
+        return await sync_to_async(Client(HTTP_ACCEPT="application/json").get)(path)
+
+
+@override_settings(APPLICATION_THROTTLE_PER_EMAIL=3, APPLICATION_THROTTLE_PER_IP=10)
+class ApplicationThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_limiter()
+        self.addCleanup(reset_limiter)
+
+    def apply(self, firstname, email="Ann@Example.com"):
+        return self.client.post(
+            "/applications/", {"firstname": firstname, "lastname": "Lee", "email": email},
+            content_type="application/json",
+        )
+
+    def test_only_new_valid_applications_count(self):
+        self.assertEqual(self.apply("Ann").status_code, 201)
+        # identical resubmissions return the stored application
+        for _ in range(2):
+            response = self.apply("Ann", email="ann@example.com")
+            self.assertEqual(response.status_code, 200)
+        for _ in range(3):
+            self.assertEqual(self.apply("Ann", email="not-an-email").status_code, 400)
+
+        self.assertEqual(self.apply("Anna").status_code, 201)
+        self.assertEqual(self.apply("Annie").status_code, 201)
+        self.assertEqual(Application.objects.filter(throttled=True).count(), 0)
+
+        response = self.apply("Anne", email="ANN@example.com")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        self.assertEqual(Application.objects.count(), 3)
+        # stored rows are matched case-insensitively
+        self.assertEqual(Application.objects.filter(throttled=True, throttle_until__isnull=False).count(), 3)
+
+    @override_settings(APPLICATION_THROTTLE_PER_IP=2)
+    def test_ip_blocks_are_recorded(self):
+        self.assertEqual(self.apply("Ann").status_code, 201)
+        self.assertEqual(self.apply("Bob", email="bob@example.com").status_code, 201)
+        self.assertEqual(self.apply("Anne").status_code, 429)
+        self.assertEqual(
+            list(Application.objects.filter(throttled=True).values_list("email", flat=True)), ["Ann@Example.com"],
+        )
+
+
+class BalanceLedgerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(title="Python", price=Decimal("100"))
+        self.group = Group.objects.create(title="P1", starting_date=datetime.date(2026, 1, 1), course=self.course)
+        self.student = User.objects.create(
+            firstname="S", lastname="T", email="student@example.com", login="student",
+            password="!", group=self.group,
+        )
+
+    def balance(self, user=None):
+        return Balance.objects.values_list("charged", "credited", "owed").get(user=user or self.student)
+
+    def test_payments_update_the_balance(self):
+        self.assertEqual(self.balance(), (100, 0, 100))
+        cash = Payment.objects.create(user=self.student, type=Payment.PaymentType.CASH, payed=30, discount=5)
+        Payment.objects.create(user=self.student, type=Payment.PaymentType.CARD, payed=20, discount=5)
+        # the discount only counts for cash
+        self.assertEqual(self.balance(), (100, 55, 45))
+
+        cash.payed = 40
+        cash.save()
+        self.assertEqual(self.balance(), (100, 65, 35))
+        cash.delete()
+        self.assertEqual(self.balance(), (100, 20, 80))
+
+    def test_user_saves_recompute_only_on_group_change(self):
+        with mock.patch("api.ledger.recompute_balances") as recompute:
+            self.student.firstname = "Sam"
+            self.student.save()
+            self.student.save(update_fields=["status"])
+            recompute.assert_not_called()
+
+        other = Course.objects.create(title="Go", price=Decimal("80"))
+        self.student.group = Group.objects.create(title="G1", starting_date=datetime.date(2026, 1, 1), course=other)
+        self.student.save()
+        self.assertEqual(self.balance(), (80, 0, 80))
+
+    def test_reconcile_fixes_drift(self):
+        Balance.objects.filter(user=self.student).update(owed=1)
+        out = io.StringIO()
+        call_command("reconcile_balances", "--fix", stdout=out)
+        self.assertIn("1 drifted", out.getvalue())
+        self.assertEqual(self.balance(), (100, 0, 100))
+
+    def test_endpoint(self):
+        settled = User.objects.create(
+            firstname="P", lastname="Aid", email="paid@example.com", login="paid", password="!",
+        )
+        self.assertEqual(self.client.get("/payments/balances/").status_code, 403)
+
+        login_admin(self.client)
+        rows = self.client.get("/payments/balances/").json()["results"]
+        self.assertEqual([row["user"] for row in rows], [self.student.pk])
+        # the arrears filter is for the list only
+        response = self.client.get(f"/payments/balances/{settled.pk}/")
+        self.assertEqual((response.status_code, response.json()["owed"]), (200, "0.00"))
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(title="Python", price=Decimal("100"))
+        group = Group.objects.create(title="P1", starting_date=datetime.date(2026, 1, 1), course=course)
+        self.student = User.objects.create(
+            firstname="S", lastname="T", email="student@example.com", login="student",
+            password="!", group=group,
+        )
+        Payment.objects.create(user=self.student, type=Payment.PaymentType.CASH, payed=30, discount=5)
+        login_admin(self.client)
+
+    def payments(self):
+        response = self.client.get(f"/users/{self.student.pk}/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["payments"]
+
+    def test_due_matches_the_ledger(self):
+        expected = {"payed": "30.00", "price": "100.00", "due": "65.00"}
+        self.assertEqual(self.payments(), expected)
+        self.assertEqual(Balance.objects.get(user=self.student).owed, Decimal("65"))
+
+        with override_settings(STUDENT_DASHBOARD_MATERIALIZED=True):
+            self.assertEqual(self.payments(), expected)
+            with self.captureOnCommitCallbacks(execute=True):
+                Payment.objects.create(user=self.student, type=Payment.PaymentType.CARD, payed=80, discount=5)
+            self.assertEqual(self.payments(), {"payed": "110.00", "price": "100.00", "due": "0.00"})
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        answer_keys.clear()
+        self.test = make_rows(Test, 1)[0]
+        self.one = Question.objects.create(test=self.test, title="Capital?", correct="Paris")
+        self.multi = Question.objects.create(
+            test=self.test, title="Vowels?", type=Question.QuestionType.MULTI, correct="a, e",
+        )
+        self.typed = Question.objects.create(
+            test=self.test, title="Greet", type=Question.QuestionType.TYPED, correct="Hello World",
+        )
+        self.student = make_rows(User, 1)[0]
+
+    def submit(self, answers):
+        return self.client.post(
+            f"/tests/{self.test.pk}/submit/", {"user": self.student.pk, "answers": answers},
+            content_type="application/json",
+        )
+
+    def test_submit_grades_and_stores_the_solve(self):
+        response = self.submit({str(self.one.pk): " paris ", str(self.multi.pk): ["E", "a"],
+                                str(self.typed.pk): "hello   world"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["correct"], response.json()["passed"]), (3, True))
+
+        response = self.submit({str(self.one.pk): "Rome", str(self.multi.pk): "a"})
+        self.assertEqual((response.json()["correct"], response.json()["passed"]), (0, False))
+        solve = StudentSolve.objects.get(user=self.student, test=self.test)
+        self.assertFalse(solve.solve_status)
+        self.assertEqual(json.loads(solve.solve), {str(self.one.pk): "Rome", str(self.multi.pk): "a"})
+
+    def test_client_supplied_solve_status_is_ignored(self):
+        wrong = json.dumps({str(self.one.pk): "Rome"})
+        response = self.client.post(
+            "/student-solves/",
+            {"user": self.student.pk, "test": self.test.pk, "solve": wrong, "solve_status": True},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.json()["solve_status"])
+
+        right = json.dumps({str(self.one.pk): "Paris", str(self.multi.pk): ["a", "e"]})
+        url = f"/student-solves/{response.json()['id']}/"
+        response = self.client.patch(url, {"solve": right, "solve_status": False}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["solve_status"])
+        self.assertTrue(StudentSolve.objects.get().solve_status)
+
+    def test_answers_must_be_strings_or_lists_of_strings(self):
+        for answer in [3, [1, 2], {"a": True}, None]:
+            response = self.submit({str(self.multi.pk): answer})
+            self.assertEqual(response.status_code, 400, answer)
+            self.assertIn(str(self.multi.pk), response.json()["answers"])
+        self.assertFalse(StudentSolve.objects.exists())
+
+    def test_answer_key_is_cached_and_invalidated(self):
+        grade_submission(self.test.pk, {})
+        with self.assertNumQueries(0):
+            _, result = grade_submission(self.test.pk, {str(self.one.pk): "Paris"})
+        self.assertEqual(result.correct, 1)
+
+        self.one.correct = "Lyon"
+        self.one.save()
+        _, result = grade_submission(self.test.pk, {str(self.one.pk): "Paris"})
+        self.assertEqual(result.correct, 0)
+
+    def test_regrade_command_updates_solves_and_summaries(self):
+        self.submit({str(self.one.pk): "Lyon", str(self.multi.pk): ["a", "e"]})
+        solve = StudentSolve.objects.get(user=self.student, test=self.test)
+        self.assertFalse(solve.solve_status)
+
+        self.one.correct = "Lyon"
+        self.one.save()
+        with override_settings(STUDENT_DASHBOARD_MATERIALIZED=True):
+            call_command("regrade", "--test", str(self.test.pk), "--dry-run", stdout=io.StringIO())
+            solve.refresh_from_db()
+            self.assertFalse(solve.solve_status)
+
+            out = io.StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("regrade", "--test", str(self.test.pk), stdout=out)
+        self.assertIn("1 changed", out.getvalue())
+        solve.refresh_from_db()
+        self.assertTrue(solve.solve_status)
+        summary = StudentSummary.objects.get(user=self.student)
+        self.assertEqual((summary.solves_passed, summary.solves_failed), (1, 0))
+
+    def test_regrade_command_requires_a_selection(self):
+        with self.assertRaisesMessage(CommandError, "Pass --test, --course or --all."):
+            call_command("regrade")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        student = User.objects.create(firstname="S", lastname="T", email="s@example.com", login="s", password="!")
+        start = timezone.now()
+        # two payments share each timestamp, so the id tiebreaker matters
+        for i in range(7):
+            payment = Payment.objects.create(user=student, type=Payment.PaymentType.CARD, payed=10)
+            Payment.objects.filter(pk=payment.pk).update(date=start - datetime.timedelta(days=i // 2))
+        self.expected = list(Payment.objects.order_by("-date", "id").values_list("id", flat=True))
+
+    def walk(self, url, link="next"):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.append([row["id"] for row in data["results"]])
+            url = data[link]
+        return ids
+
+    def test_next_and_previous_follow_the_ordering(self):
+        with CaptureQueriesContext(connection) as queries:
+            pages = self.walk("/payments/?page_size=2")
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertFalse(any("OFFSET" in query["sql"] for query in queries))
+
+        last = self.client.get("/payments/?page_size=2").json()
+        for _ in range(3):
+            last = self.client.get(last["next"]).json()
+        self.assertIsNone(last["next"])
+        self.assertEqual(sum(reversed(self.walk(last["previous"], "previous")), []), self.expected[:6])
+
+    def test_next_page_seeks_the_index(self):
+        cursor = self.client.get("/payments/?page_size=2").json()["next"]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(cursor).status_code, 200)
+        sql = next(q["sql"] for q in queries if 'FROM "api_payment"' in q["sql"] and "LIMIT" in q["sql"])
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("SEARCH api_payment USING INDEX api_payment_date_idx", plan)
+        self.assertNotIn("SCAN api_payment", plan)
+
+    def test_ordering_param(self):
+        pages = self.walk("/payments/?page_size=3&ordering=id")
+        self.assertEqual(sum(pages, []), sorted(self.expected))
+        # unknown fields are ignored: the viewset ordering applies
+        pages = self.walk("/payments/?page_size=3&ordering=nope")
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_cursor_of_another_ordering_is_rejected(self):
+        cursor = self.client.get("/payments/?page_size=2&ordering=id").json()["next"]
+        response = self.client.get(cursor.replace("ordering=id", "ordering=-payed"))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/payments/?cursor=garbage").status_code, 404)
+
+    def test_page_size_is_capped(self):
+        request = APIRequestFactory().get("/payments/", {"page_size": 10_000})
+        paginator = KeysetCursorPagination()
+        self.assertEqual(paginator.get_page_size(Request(request), PaymentViewSet()), PaymentViewSet.max_page_size)
+        self.assertEqual(paginator.get_page_size(Request(APIRequestFactory().get("/")), PaymentViewSet()), 100)
+
+
+class IntegrationThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_limiter()
+        integration_cache.clear()
+        owner = User.objects.create(
+            firstname="P", lastname="Owner", email="owner@example.com", login="owner", password="!",
+        )
+        self.integration = Integration.objects.create(
+            user=owner, title="Partner", api_key="secret", rate_limit_per_minute=2,
+        )
+
+    def get(self, key="secret"):
+        return self.client.get("/payments/", HTTP_X_API_KEY=key)
+
+    def test_per_minute_limit_and_headers(self):
+        responses = [self.get() for _ in range(3)]
+        self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+        self.assertEqual([r["X-RateLimit-Limit"] for r in responses], ["2", "2", "2"])
+        self.assertEqual([r["X-RateLimit-Remaining"] for r in responses], ["1", "0", "0"])
+        self.assertGreater(int(responses[2]["Retry-After"]), 0)
+        self.assertLessEqual(int(responses[2]["Retry-After"]), 120)
+        # other clients keep their own limits
+        self.assertNotIn("X-RateLimit-Limit", self.client.get("/payments/"))
+
+    def test_per_day_limit(self):
+        self.integration.rate_limit_per_minute = 100
+        self.integration.rate_limit_per_day = 1
+        self.integration.save()
+        self.assertEqual([self.get().status_code for _ in range(2)], [200, 429])
+
+    def test_sliding_window_estimate(self):
+        for backend in [LocalRateLimitBackend(), CacheRateLimitBackend()]:
+            with self.subTest(backend=type(backend).__name__):
+                cache.clear()
+                limiter = SlidingWindowLimiter(backend)
+                start = 60 * 100
+                allowed = [limiter.hit([("k", 10, 60)], now=start)[0].allowed for _ in range(11)]
+                self.assertEqual(allowed.count(True), 10)
+
+                # half a window later the previous 10 hits weigh 5
+                now = start + 60 + 30
+                results = [limiter.hit([("k", 10, 60)], now=now)[0] for _ in range(6)]
+                self.assertEqual([r.allowed for r in results], [True] * 5 + [False])
+                self.assertEqual(results[-1].retry_after, 6)
+                self.assertTrue(limiter.hit([("k", 10, 60)], now=now + 6)[0].allowed)
+
+
+class IntegrationKeyCacheTests(TestCase):
+    def setUp(self):
+        integration_cache.clear()
+        owner = User.objects.create(
+            firstname="P", lastname="Owner", email="owner@example.com", login="owner", password="!",
+        )
+        self.integration = Integration.objects.create(user=owner, title="Partner", api_key="secret")
+        self.auth = IntegrationAPIKeyAuthentication()
+
+    def authenticate(self, key="secret", method="get", **headers):
+        headers = headers or {"HTTP_X_API_KEY": key}
+        return self.auth.authenticate(Request(getattr(APIRequestFactory(), method)("/payments/", **headers)))
+
+    def test_resolved_keys_are_cached(self):
+        with self.assertNumQueries(1):
+            user, integration = self.authenticate()
+        with self.assertNumQueries(0):
+            user, integration = self.authenticate(HTTP_AUTHORIZATION="Api-Key secret")
+        self.assertEqual((integration.pk, user.pk), (self.integration.pk, self.integration.user_id))
+
+        with self.assertRaisesMessage(AuthenticationFailed, "Invalid API key."):
+            self.authenticate("wrong")
+        with self.assertRaisesMessage(PermissionDenied, "API key is read-only."):
+            self.authenticate(method="post")
+
+    def test_disabling_and_rotation_are_picked_up(self):
+        self.authenticate()
+        self.integration.permission = Integration.Permission.OFF
+        self.integration.save()
+        with self.assertRaisesMessage(AuthenticationFailed, "API key is disabled."):
+            self.authenticate()
+
+        self.integration.permission = Integration.Permission.READONLY
+        self.integration.api_key = "rotated"
+        self.integration.save(update_fields=["permission", "api_key"])
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        self.assertEqual(self.authenticate("rotated")[1].pk, self.integration.pk)
+
+    def test_ttl_cache_evicts_lru_and_expired_entries(self):
+        ttl_cache = TTLCache(maxsize=2, ttl=10)
+        with mock.patch("api.cache.time.monotonic", return_value=100):
+            ttl_cache.set("a", 1)
+            ttl_cache.set("b", 2)
+            ttl_cache.get("a")
+            ttl_cache.set("c", 3)
+            self.assertEqual([ttl_cache.get(key) for key in "abc"], [1, None, 3])
+        with mock.patch("api.cache.time.monotonic", return_value=110):
+            self.assertIsNone(ttl_cache.get("a"))
+
+
+class PrincipalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        principal_cache.clear()
+        self.admin = User.objects.create(
+            firstname="A", lastname="Dmin", email="admin@example.com", login="admin",
+            password="!", role=User.Role.ADMIN,
+        )
+        self.auth_user = get_user_model().objects.create(username="admin", email=self.admin.email)
+        self.client.force_login(self.auth_user)
+
+    def request(self):
+        request = RequestFactory().get("/")
+        request.user = self.auth_user
+        return request
+
+    def test_principal_is_cached_per_request_and_process(self):
+        request = self.request()
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_principal(request), self.admin)
+            self.assertTrue(is_admin(request))
+        with self.assertNumQueries(0):
+            self.assertTrue(is_admin(self.request()))
+
+    def test_role_changes_are_picked_up(self):
+        self.assertTrue(is_admin(self.request()))
+        self.admin.role = User.Role.STUDENT
+        self.admin.save()
+        self.assertFalse(is_admin(self.request()))
+        self.assertEqual(self.client.post("/users/", {}).status_code, 403)
+
+        self.admin.role = User.Role.ADMIN
+        self.admin.save()
+        self.assertEqual(self.client.post("/users/", {}).status_code, 400)
+
+    def test_unknown_and_integration_users(self):
+        self.auth_user.email = "nobody@example.com"
+        self.assertIsNone(resolve_principal(self.request()))
+
+        integration = Integration.objects.create(user=self.admin, title="Partner", api_key="secret")
+        request = self.request()
+        request.user = IntegrationUser(integration)
+        with self.assertNumQueries(0):
+            principal = resolve_principal(request)
+        self.assertEqual(principal, IntegrationPrincipal(integration))
+        self.assertEqual(principal.role, INTEGRATION_ROLE)
+        self.assertTrue(is_integration(request))
+        self.assertFalse(is_admin(request))
+
+    def test_integration_keys_of_admins_are_not_admins(self):
+        integration_cache.clear()
+        Integration.objects.create(user=self.admin, title="Partner", api_key="secret")
+        self.client.logout()
+        for url in [
+            "/payments/balances/", "/analytics/revenue/", "/analytics/applications/", "/analytics/funnel/",
+            "/jobs/stats/", "/autocomplete/users/?q=adm", "/metrics",
+        ]:
+            self.assertEqual(self.client.get(url, HTTP_X_API_KEY="secret").status_code, 403, url)
+        self.assertEqual(self.client.get("/payments/", HTTP_X_API_KEY="secret").status_code, 200)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.faq = FAQ.objects.create(question="Price?", answer="100")
+
+    def test_responses_are_cached_with_etags(self):
+        first = self.client.get("/faq/?ordering=id&page_size=5")
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get("/faq/?page_size=5&ordering=id")
+        self.assertEqual((second.content, second["ETag"]), (first.content, first["ETag"]))
+        self.assertEqual(second["Content-Type"], "application/json")
+
+        response = self.client.get("/faq/?ordering=id&page_size=5", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+        self.assertEqual(self.client.get(f"/faq/{self.faq.pk}/", HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_saves_and_deletes_invalidate(self):
+        before = self.client.get(f"/faq/{self.faq.pk}/")
+        self.faq.answer = "120"
+        self.faq.save()
+        after = self.client.get(f"/faq/{self.faq.pk}/")
+        self.assertEqual(after.json()["answer"], "120")
+        self.assertNotEqual(after["ETag"], before["ETag"])
+
+        self.client.get("/faq/")
+        FAQ.objects.create(question="Duration?", answer="3 months")
+        self.assertEqual(len(self.client.get("/faq/").json()["results"]), 2)
+        self.faq.delete()
+        self.assertEqual(self.client.get(f"/faq/{self.faq.pk}/").status_code, 404)
+
+    def test_errors_and_the_browsable_api_are_not_cached(self):
+        self.client.get("/faq/0/")
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/faq/0/").status_code, 404)
+        self.client.get("/faq/", HTTP_ACCEPT="text/html")
+        response = self.client.get("/faq/", HTTP_ACCEPT="text/html")
+        self.assertNotIn("ETag", response)
+
+
+class JournalBulkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(title="Python")
+        self.group = Group.objects.create(title="P1", starting_date=datetime.date(2026, 1, 1), course=course)
+        self.students = [
+            User.objects.create(
+                firstname="S", lastname=str(i), email=f"s{i}@example.com", login=f"s{i}", password="!", group=self.group,
+            )
+            for i in range(30)
+        ]
+
+    def post(self, entries, date="2026-03-02"):
+        return self.client.post(
+            "/journal/bulk/", {"group": self.group.pk, "date": date, "entries": entries},
+            content_type="application/json",
+        )
+
+    def test_whole_class_costs_three_queries(self):
+        entries = [{"user": s.pk, "status": i % 3 != 0} for i, s in enumerate(self.students)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(entries)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 30)
+        statements = [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(len(statements), 3, "\n".join(statements))
+        self.assertEqual(Journal.objects.filter(group=self.group, status=True).count(), 20)
+
+    def test_resubmitting_updates_the_day(self):
+        student = self.students[0]
+        self.post([{"user": student.pk, "status": False}])
+        self.post([{"user": student.pk, "status": True}])
+        self.post([{"user": student.pk, "status": False}], date="2026-03-03")
+        self.assertEqual(
+            list(Journal.objects.filter(user=student).order_by("date").values_list("status", flat=True)),
+            [True, False],
+        )
+
+    def test_invalid_entries(self):
+        outsider = User.objects.create(firstname="O", lastname="T", email="o@example.com", login="o", password="!")
+        response = self.post([{"user": self.students[0].pk, "status": True}, {"user": outsider.pk, "status": True}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(outsider.pk), str(response.json()["entries"]))
+
+        student = self.students[0].pk
+        response = self.post([{"user": student, "status": True}, {"user": student, "status": False}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Journal.objects.exists())
+
+
+class AttendanceMatrixTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(title="Python")
+        self.group, other = [
+            Group.objects.create(title=title, starting_date=datetime.date(2026, 1, 1), course=course)
+            for title in ("P1", "P2")
+        ]
+        self.first, self.second = [
+            User.objects.create(firstname="S", lastname=str(i), email=f"s{i}@example.com", login=f"s{i}", password="!")
+            for i in range(2)
+        ]
+        day = datetime.date(2026, 3, 2)
+        for user, offset, status in [
+            (self.first, 0, True), (self.first, 2, False), (self.second, 2, True), (self.second, 9, True),
+        ]:
+            Journal.objects.create(group=self.group, user=user, date=day + datetime.timedelta(days=offset), status=status)
+        # another group's entries stay out
+        Journal.objects.create(group=other, user=self.first, date=day, status=False)
+
+    def get(self, **params):
+        return self.client.get(f"/groups/{self.group.pk}/attendance-matrix/", params)
+
+    def test_matrix(self):
+        with self.assertNumQueries(2):
+            response = self.get()
+        self.assertEqual(response.json(), {
+            "group": self.group.pk,
+            "users": [self.first.pk, self.second.pk],
+            "dates": ["2026-03-02", "2026-03-04", "2026-03-11"],
+            "matrix": ["10.", ".11"],
+        })
+
+    def test_date_range(self):
+        data = self.get(**{"from": "2026-03-03", "to": "2026-03-10"}).json()
+        self.assertEqual((data["users"], data["dates"], data["matrix"]), ([self.first.pk, self.second.pk], ["2026-03-04"], ["0", "1"]))
+        self.assertEqual(self.get(**{"from": "2027-01-01"}).json()["matrix"], [])
+
+        for value in ["yesterday", "2026-02-30"]:
+            response = self.get(to=value)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("to", response.json())
+        self.assertEqual(self.client.get("/groups/0/attendance-matrix/").status_code, 404)
+
+
+class QuestionBankTests(TestCase):
+    rows = [
+        {"title": "Capital of France?", "type": "one", "correct": "Paris", "incorrect1": "Lyon",
+         "incorrect2": "", "incorrect3": ""},
+        {"title": "Vowels, with a comma", "type": "multi", "correct": "a, e", "incorrect1": "b",
+         "incorrect2": "c", "incorrect3": "d"},
+        {"title": "Say \"hello\"", "type": "typed", "correct": "hello", "incorrect1": "",
+         "incorrect2": "", "incorrect3": ""},
+    ]
+
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(title="Python")
+        self.source, self.copy = [Test.objects.create(course=course, title=title) for title in ("Source", "Copy")]
+
+    def import_body(self, test, body, content_type="application/x-ndjson", query=""):
+        return self.client.post(f"/tests/{test.pk}/questions/import/{query}", body, content_type=content_type)
+
+    def export(self, test, fmt):
+        response = self.client.get(f"/tests/{test.pk}/questions/export/", {"format": fmt})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_and_csv_round_trip(self):
+        body = "".join(json.dumps(row) + "\n" for row in self.rows)
+        response = self.import_body(self.source, body)
+        self.assertEqual(response.json(), {"created": 3, "error_count": 0, "errors": []})
+
+        csv_body = self.export(self.source, "csv")
+        self.assertTrue(csv_body.startswith("id,title,type,correct,incorrect1,incorrect2,incorrect3\r\n"))
+        # the id column is ignored on import
+        self.assertEqual(self.import_body(self.copy, csv_body, "text/csv").json()["created"], 3)
+
+        exported = [json.loads(line) for line in self.export(self.copy, "ndjson").splitlines()]
+        self.assertEqual([{k: v for k, v in row.items() if k != "id"} for row in exported], self.rows)
+
+    def test_invalid_rows_are_reported(self):
+        body = "\n".join([
+            json.dumps(self.rows[0]),
+            "{not json",
+            json.dumps({"title": "Bad type", "type": "essay"}),
+            "[1, 2]",
+        ])
+        response = self.import_body(self.source, body)
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual((data["created"], data["error_count"]), (0, 3))
+        self.assertEqual([error["line"] for error in data["errors"]], [2, 3, 4])
+        self.assertIn("type", data["errors"][1]["errors"])
+        self.assertFalse(Question.objects.exists())
+
+        response = self.import_body(self.source, body, query="?partial=1")
+        self.assertEqual((response.status_code, response.json()["created"]), (200, 1))
+        self.assertEqual(Question.objects.filter(test=self.source).count(), 1)
+
+    def test_import_invalidates_the_answer_key(self):
+        answer_keys.clear()
+        grade_submission(self.source.pk, {})
+        self.import_body(self.source, json.dumps(self.rows[0]))
+        _, result = grade_submission(self.source.pk, {})
+        self.assertEqual(result.total, 1)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student, self.other = [
+            User.objects.create(firstname="S", lastname=str(i), email=f"s{i}@example.com", login=f"s{i}", password="!")
+            for i in range(2)
+        ]
+        for payed in ["10.00", "30.50", "20.00"]:
+            Payment.objects.create(user=self.student, type=Payment.PaymentType.CARD, payed=Decimal(payed))
+        Payment.objects.create(user=self.other, type=Payment.PaymentType.CASH, payed=5)
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_payments_csv_uses_the_list_filters(self):
+        response, body = self.export("/payments/export/", format="csv", user=self.student.pk, ordering="payed")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="payment.csv"')
+        lines = body.splitlines()
+        self.assertEqual(lines[0], "id,user,date,type,payed,discount,status")
+        self.assertEqual([line.split(",")[4] for line in lines[1:]], ["10.00", "20.00", "30.50"])
+
+    def test_ndjson_exports(self):
+        course = Course.objects.create(title="Python")
+        group, other = [
+            Group.objects.create(title=title, starting_date=datetime.date(2026, 1, 1), course=course)
+            for title in ("P1", "P2")
+        ]
+        Journal.objects.create(group=group, user=self.student, date=datetime.date(2026, 3, 2), status=True)
+        Journal.objects.create(group=other, user=self.student, date=datetime.date(2026, 3, 2))
+        _, body = self.export("/journal/export/", format="ndjson", group=group.pk)
+        self.assertEqual([json.loads(line) for line in body.splitlines()], [
+            {"id": Journal.objects.get(group=group).pk, "group": group.pk, "user": self.student.pk,
+             "date": "2026-03-02", "status": True},
+        ])
+
+        solve = StudentSolve.objects.create(user=self.student, test=Test.objects.create(course=course))
+        # NDJSON is the default format
+        response, body = self.export("/student-solves/export/")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        self.assertEqual(json.loads(body)["id"], solve.pk)
+
+    def test_rows_come_from_one_streamed_query(self):
+        with mock.patch.object(PaymentViewSet, "export_chunk_size", 2):
+            with CaptureQueriesContext(connection) as queries:
+                _, body = self.export("/payments/export/", format="csv")
+        self.assertEqual(len(body.splitlines()), 5)
+        selects = [q["sql"] for q in queries if "api_payment" in q["sql"]]
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn("JOIN", selects[0])
+
+
+class AnalyticsTests(TestCase):
+    now = datetime.datetime(2026, 3, 15, 12, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(title="Python", price=100)
+        group = Group.objects.create(title="P1", starting_date=datetime.date(2026, 1, 1), course=self.course)
+        self.student = User.objects.create(
+            firstname="S", lastname="T", email="student@example.com", login="student",
+            password="!", group=group, status=User.Status.ACTIVE,
+        )
+        for day, payed in [(datetime.date(2026, 1, 10), 40), (datetime.date(2026, 2, 3), 25),
+                           (datetime.date(2026, 2, 20), 5), (datetime.date(2026, 3, 14), 30)]:
+            payment = Payment.objects.create(user=self.student, type=Payment.PaymentType.CARD, payed=payed)
+            Payment.objects.filter(pk=payment.pk).update(date=datetime.datetime.combine(day, datetime.time(9), datetime.timezone.utc))
+
+        self.patcher = mock.patch("api.analytics.timezone.now", return_value=self.now)
+        self.patcher.start()
+        self.addCleanup(self.patcher.stop)
+
+    def revenue(self):
+        return analytics.revenue.report(datetime.date(2026, 1, 1), datetime.date(2026, 3, 31))
+
+    def test_revenue_buckets_are_cached_and_frozen(self):
+        with self.assertNumQueries(1):
+            report = self.revenue()
+        self.assertEqual(
+            [(b["start"], b["closed"], [row["revenue"] for row in b["rows"]]) for b in report["buckets"]],
+            [("2026-01-01", True, ["40.00"]), ("2026-02-01", True, ["30.00"]), ("2026-03-01", False, ["30.00"])],
+        )
+        self.assertEqual(report["buckets"][1]["rows"][0]["course"], self.course.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revenue(), report)
+
+        # a change inside a closed month recomputes only that month
+        payment = Payment.objects.get(payed=25)
+        payment.payed = 35
+        payment.save()
+        with CaptureQueriesContext(connection) as queries:
+            report = self.revenue()
+        self.assertEqual(len(queries), 1)
+        self.assertIn("2026-02-01", queries[0]["sql"])
+        self.assertEqual(report["buckets"][1]["rows"][0]["revenue"], "40.00")
+
+    def test_applications_and_funnel(self):
+        for email in ["student@example.com", "lead@example.com"]:
+            Application.objects.create(firstname="A", lastname="B", email=email, course=self.course)
+        week = analytics.applications.report()["buckets"][-1]
+        self.assertEqual((week["start"], week["closed"]), ("2026-03-09", False))
+        self.assertEqual(week["rows"], [{"course": self.course.pk, "applications": 2}])
+
+        funnel = analytics.funnel.report()["buckets"][-1]["rows"]
+        self.assertEqual(funnel, [{"applications": 2, "converted": 1, "rate": 0.5}])
+        self.student.status = User.Status.PAUSED
+        self.student.save()
+        self.assertEqual(analytics.funnel.report()["buckets"][-1]["rows"][0]["converted"], 0)
+
+    def test_endpoints_are_admin_only(self):
+        self.assertEqual(self.client.get("/analytics/revenue/").status_code, 403)
+        admin = User.objects.create(
+            firstname="A", lastname="Dmin", email="admin@example.com", login="admin",
+            password="!", role=User.Role.ADMIN,
+        )
+        self.client.force_login(get_user_model().objects.create(username="admin", email=admin.email))
+        response = self.client.get("/analytics/revenue/", {"from": "2026-02-01", "to": "2026-02-28"})
+        self.assertEqual([b["start"] for b in response.json()["buckets"]], ["2026-02-01"])
+        self.assertEqual(len(self.client.get("/analytics/funnel/").json()["buckets"]), 12)
+        self.assertEqual(self.client.get("/analytics/applications/", {"from": "March"}).status_code, 400)
+        # 530 weeks is more than MAX_BUCKETS: refused rather than cut short
+        response = self.client.get("/analytics/applications/", {"from": "2016-01-01", "to": "2026-02-28"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("from", response.json())
+
+    def test_metrics_must_compute_rows(self):
+        class Incomplete(analytics.Metric):
+            name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+@skipUnless(connection.vendor == "sqlite", "reads SQLite query plans")
+class IndexTests(TestCase):
+    def test_list_paths_use_the_indexes(self):
+        generate(scale=0.2, seed=0)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        for name, queryset in query_paths():
+            if name.startswith("success stories"):
+                # boolean index, only chosen on large tables
+                continue
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertRegex(plan, r"USING INDEX api_\w+_idx")
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_bench_indexes_command(self):
+        out = io.StringIO()
+        call_command("bench_indexes", "--scale", "0.05", "--repeat", "1", stdout=out)
+        self.assertIn("speedup", out.getvalue())
+        self.assertIn("journal ?group=", out.getvalue())
+        # the generated rows are rolled back
+        self.assertFalse(Payment.objects.exists())
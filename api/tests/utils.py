@@ -0,0 +1,136 @@
+"""
+Test support: placeholder rows and the constant query count check.
+"""
+import datetime
+import itertools
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, models, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import User
+from ..query_guard import NPlusOneError, query_guard
+
+_sequence = itertools.count(1)
+
+
+def login_admin(client, login="test-admin"):
+    """
+    Log `client` in as a Django user whose email belongs to a new api admin
+    (see api.principals). Returns the api User.
+    """
+    admin = User.objects.create(
+        firstname="A", lastname="Dmin", email=f"{login}@example.com", login=login,
+        password="!", role=User.Role.ADMIN,
+    )
+    client.force_login(get_user_model().objects.create(username=login, email=admin.email))
+    return admin
+
+
+def _value(field, n):
+    if field.choices:
+        return field.choices[0][0]
+    if isinstance(field, models.EmailField):
+        return f"row{n}@example.com"
+    if isinstance(field, (models.CharField, models.TextField)):
+        return f"{field.name} {n}"[: field.max_length or None]
+    if isinstance(field, models.DateTimeField):
+        return timezone.now()
+    if isinstance(field, models.DateField):
+        return datetime.date.today()
+    if isinstance(field, models.DecimalField):
+        return Decimal("1")
+    if isinstance(field, models.FloatField):
+        return 1.0
+    if isinstance(field, models.IntegerField):
+        return n
+    raise TypeError(f"No value for {field.model.__name__}.{field.name}; override make_rows().")
+
+
+def make_rows(model, count):
+    """
+    bulk_create `count` rows of `model` with placeholder values. Every
+    foreign key (nullable ones too) points at its own freshly created row,
+    so unique constraints hold and lazy relation access costs one query per
+    row – exactly what the query-count checks need to see.
+    """
+    related = {}
+    for field in model._meta.concrete_fields:
+        if field.is_relation:
+            related[field.name] = make_rows(field.related_model, count)
+
+    rows = []
+    for i in range(count):
+        n = next(_sequence)
+        values = {name: objects[i] for name, objects in related.items()}
+        for field in model._meta.concrete_fields:
+            if field.is_relation or field.name in values or isinstance(field, models.AutoField):
+                continue
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                continue
+            if field.has_default() or field.null or isinstance(field, models.FileField):
+                continue
+            values[field.name] = _value(field, n)
+        rows.append(model(**values))
+    return model.objects.bulk_create(rows)
+
+
+class ConstantQueryCountMixin:
+    """
+    TestCase mixin: `test_list_query_counts` GETs the list endpoint of every
+    viewset in `router` with `small` and then `large` rows of its model and
+    fails if the larger table costs more queries (an N+1 in the queryset,
+    serializer or a __str__).
+
+    Set `router`, and optionally `list_params` ({prefix: query string}),
+    `skip_prefixes` and `login()` for admin-only endpoints.
+    """
+
+    router = None
+    small = 10
+    large = 1000
+    list_params = {}
+    skip_prefixes = ()
+
+    def login(self):
+        pass
+
+    def count_list_queries(self, url):
+        # the response cache and throttle history live in the default cache
+        cache.clear()
+        with CaptureQueriesContext(connections["default"]) as queries, query_guard() as guard:
+            response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200, f"{url}: {response.content[:200]!r}")
+        return len(queries), guard
+
+    def assertConstantListQueries(self, url, model):
+        # rolled back, so every endpoint starts from empty tables
+        with transaction.atomic():
+            self.login()
+            make_rows(model, self.small)
+            self.count_list_queries(url)  # warm process-local caches
+            small, _ = self.count_list_queries(url)
+
+            make_rows(model, self.large - self.small)
+            large, guard = self.count_list_queries(url)
+            transaction.set_rollback(True)
+
+        if large > small:
+            raise NPlusOneError(
+                f"{url}: {small} queries with {self.small} rows, {large} with {self.large}\n"
+                + guard.report()
+            )
+
+    def test_list_query_counts(self):
+        for prefix, viewset, _ in self.router.registry:
+            queryset = getattr(viewset, "queryset", None)
+            if not hasattr(viewset, "list") or queryset is None or prefix in self.skip_prefixes:
+                continue
+            url = f"/{prefix}/"
+            if prefix in self.list_params:
+                url += "?" + self.list_params[prefix]
+            with self.subTest(prefix=prefix):
+                self.assertConstantListQueries(url, queryset.model)
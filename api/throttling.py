@@ -0,0 +1,297 @@
+"""
+Per-integration rate limiting.
+
+Integration.rate_limit_per_minute / rate_limit_per_day are enforced with a
+sliding-window counter: for each window only the current and previous
+fixed-window counts are kept, and the request rate is estimated as
+
+    previous * (1 - elapsed / window) + current
+
+which is O(1) in both memory and time per check. Counter state lives in a
+pluggable backend (INTEGRATION_RATE_LIMIT_BACKEND):
+  - LocalRateLimitBackend – in-process dict, enough for a single node
+  - CacheRateLimitBackend – a Django cache (INTEGRATION_RATE_LIMIT_CACHE),
+    shared between nodes when it points at redis/memcached
+"""
+import datetime
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+
+from .models import Application, Integration
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+
+
+class LocalRateLimitBackend:
+    """
+    Counters in a process-local dict; expired keys are purged lazily.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._next_purge = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            values = []
+            for key in keys:
+                entry = self._counts.get(key)
+                values.append(entry[0] if entry and entry[1] > now else 0)
+            return values
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_purge:
+                self._purge(now)
+            entry = self._counts.get(key)
+            count = entry[0] + 1 if entry and entry[1] > now else 1
+            self._counts[key] = (count, now + ttl)
+            return count
+
+    def _purge(self, now):
+        self._counts = {key: entry for key, entry in self._counts.items() if entry[1] > now}
+        self._next_purge = now + MINUTE
+
+
+class CacheRateLimitBackend:
+    """
+    Counters in a Django cache; add() + incr() are atomic on redis/memcached.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias or getattr(settings, "INTEGRATION_RATE_LIMIT_CACHE", "default")
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_many(self, keys):
+        found = self.cache.get_many(keys)
+        return [int(found.get(key, 0)) for key in keys]
+
+    def incr(self, key, ttl):
+        cache = self.cache
+        if cache.add(key, 1, ttl):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # expired between add() and incr()
+            cache.set(key, 1, ttl)
+            return 1
+
+
+class RateLimitResult:
+    __slots__ = ("allowed", "limit", "remaining", "reset", "retry_after")
+
+    def __init__(self, allowed, limit, remaining, reset, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+
+class SlidingWindowLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def check(self, key, limit, window, now=None):
+        """
+        Estimate the rate for `key` without recording a hit.
+        """
+        now = time.time() if now is None else now
+        index, elapsed = divmod(now, window)
+        index = int(index)
+        current_key = f"{key}:{window}:{index}"
+        previous, current = self.backend.get_many([f"{key}:{window}:{index - 1}", current_key])
+
+        weight = 1 - elapsed / window
+        estimated = previous * weight + current
+        allowed = estimated + 1 <= limit
+
+        retry_after = 0
+        if not allowed:
+            if current >= limit:
+                # wait for the next window, then for enough of it to pass
+                retry_after = (window - elapsed) + window * max(0, 1 - (limit - 1) / max(current, 1))
+            elif previous:
+                retry_after = max(0, (1 - (limit - 1 - current) / previous) * window - elapsed)
+
+        return current_key, RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, math.floor(limit - estimated - (1 if allowed else 0))),
+            reset=math.ceil(window - elapsed),
+            retry_after=math.ceil(retry_after),
+        )
+
+    def hit(self, checks, now=None):
+        """
+        checks: [(key, limit, window), ...]. The hit is recorded in every
+        window only if all of them allow it. Returns the list of results.
+        """
+        now = time.time() if now is None else now
+        results = [self.check(key, limit, window, now) for key, limit, window in checks]
+        if all(result.allowed for _, result in results):
+            for (_, _, window), (counter_key, _) in zip(checks, results):
+                self.backend.incr(counter_key, 2 * window)
+        return [result for _, result in results]
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                backend_path = getattr(
+                    settings,
+                    "INTEGRATION_RATE_LIMIT_BACKEND",
+                    "api.throttling.LocalRateLimitBackend",
+                )
+                _limiter = SlidingWindowLimiter(import_string(backend_path)())
+    return _limiter
+
+
+def reset_limiter():
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
+
+
+def is_integration_request(request):
+    return isinstance(getattr(request, "auth", None), Integration)
+
+
+class IntegrationRateThrottle(throttling.BaseThrottle):
+    """
+    Enforces the integration's own per-minute and per-day limits and
+    exposes the tightest one as X-RateLimit-* headers
+    (see api.middleware.RateLimitHeadersMiddleware).
+    """
+
+    def allow_request(self, request, view):
+        integration = getattr(request, "auth", None)
+        if not isinstance(integration, Integration):
+            return True
+
+        key = f"ratelimit:integration:{integration.pk}"
+        results = get_limiter().hit([
+            (key, integration.rate_limit_per_minute, MINUTE),
+            (key, integration.rate_limit_per_day, DAY),
+        ])
+
+        denied = [result for result in results if not result.allowed]
+        tightest = max(denied, key=lambda r: r.retry_after) if denied else min(
+            results, key=lambda r: r.remaining
+        )
+        self.result = tightest
+        request._request.rate_limit = tightest
+        return not denied
+
+    def wait(self):
+        return self.result.retry_after
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle):
+    def get_cache_key(self, request, view):
+        if is_integration_request(request):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class UserRateThrottle(throttling.UserRateThrottle):
+    """
+    Integrations are limited by IntegrationRateThrottle instead.
+    """
+
+    def get_cache_key(self, request, view):
+        if is_integration_request(request):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle):
+    """
+    Per-view `throttle_scope` rate (e.g. the autocomplete endpoints, which
+    are hit on every keystroke) instead of the global anon/user rate.
+    """
+
+    def get_cache_key(self, request, view):
+        if is_integration_request(request):
+            return None
+        return super().get_cache_key(request, view)
+
+
+def applications_by_email(email):
+    """
+    Applications of `email`, case-insensitively; served by the
+    LOWER(email) index.
+    """
+    return Application.objects.alias(email_lower=Lower("email")).filter(email_lower=email.strip().lower())
+
+
+class ApplicationRateThrottle(throttling.BaseThrottle):
+    """
+    Limits new Applications per email and per client IP within
+    APPLICATION_THROTTLE_WINDOW seconds, using the same sliding-window
+    limiter (and backend) as the integration throttle – no query per submit.
+
+    Not a view throttle: ApplicationViewSet.create calls it once the
+    submission is valid and not a resubmission, so invalid and deduplicated
+    posts do not use up the budget.
+
+    When a submission is blocked, by its email or by its IP, the stored
+    applications of its email are marked throttled / throttle_until once
+    per block period so admins can see it.
+    """
+
+    def allow_request(self, request, view):
+        window = getattr(settings, "APPLICATION_THROTTLE_WINDOW", 60 * 60)
+        email = str(request.data.get("email") or "").strip().lower()
+        ident = self.get_ident(request)
+
+        checks = [(f"ratelimit:application:ip:{ident}", getattr(settings, "APPLICATION_THROTTLE_PER_IP", 10), window)]
+        if email:
+            checks.append((
+                f"ratelimit:application:email:{email}",
+                getattr(settings, "APPLICATION_THROTTLE_PER_EMAIL", 3),
+                window,
+            ))
+
+        results = get_limiter().hit(checks)
+        denied = [result for result in results if not result.allowed]
+        if not denied:
+            return True
+
+        self.retry_after = max(result.retry_after for result in denied)
+        if email:
+            self.mark_throttled(email, self.retry_after)
+        return False
+
+    def wait(self):
+        return self.retry_after
+
+    def mark_throttled(self, email, seconds):
+        # only the first blocked submit of a period writes to the table
+        if cache.add(f"application:blocked:{email}", True, seconds):
+            applications_by_email(email).update(
+                throttled=True,
+                throttle_until=timezone.now() + datetime.timedelta(seconds=seconds),
+            )
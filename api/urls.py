@@ -22,6 +22,10 @@ from .views import (
     ContactStatsViewSet,
     ContactInfoViewSet,
     SuccessStoryViewSet,
+    BalanceViewSet,
+    AnalyticsViewSet,
+    AutocompleteViewSet,
+    JobViewSet,
 )
 
 router = DefaultRouter()
@@ -36,6 +40,8 @@ router.register(r"journal", JournalViewSet, basename="journal")
 router.register(r"materials", MaterialViewSet, basename="material")
 router.register(r"lessons", LessonViewSet, basename="lesson")
 router.register(r"applications", ApplicationViewSet, basename="application")
+# before "payments", whose detail route would otherwise match "balances"
+router.register(r"payments/balances", BalanceViewSet, basename="balance")
 router.register(r"payments", PaymentViewSet, basename="payment")
 router.register(r"team", TeamViewSet, basename="team")
 router.register(r"partners", PartnerViewSet, basename="partner")
@@ -45,6 +51,9 @@ router.register(r"course-process", CourseProcessViewSet, basename="course-proces
 router.register(r"contact-stats", ContactStatsViewSet, basename="contact-stats")
 router.register(r"contact-info", ContactInfoViewSet, basename="contact-info")
 router.register(r"success-stories", SuccessStoryViewSet, basename="success-story")
+router.register(r"analytics", AnalyticsViewSet, basename="analytics")
+router.register(r"autocomplete", AutocompleteViewSet, basename="autocomplete")
+router.register(r"jobs", JobViewSet, basename="job")
 
 urlpatterns = [
     path("", include(router.urls)),
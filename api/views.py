@@ -1,5 +1,39 @@
-from rest_framework import viewsets, permissions
-from rest_framework.filters import SearchFilter, OrderingFilter
+import datetime
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import analytics, autocomplete
+from .async_views import AsyncReadMixin
+from .attendance import build_attendance_matrix
+from .dashboard import build_dashboard, dashboard_queryset, schedule_refresh
+from .exports import ExportMixin, streaming_export
+from .grading import grade_stored_solve, grade_submission
+from .jobs import enqueue, task_stats
+from .principals import is_admin, is_integration
+from .question_bank import (
+    FIELDS as QUESTION_FIELDS,
+    export_rows,
+    import_questions,
+    iter_csv_rows,
+    iter_ndjson_rows,
+)
+from .renderers import CSVRenderer, NDJSONRenderer
+from .response_cache import CachedResponseMixin
+from .search import FullTextSearchFilter
+from .throttling import ApplicationRateThrottle, IntegrationRateThrottle, ScopedRateThrottle
 
 from .models import (
     Course,
@@ -22,6 +56,8 @@ from .models import (
     ContactStats,
     ContactInfo,
     SuccessStory,
+    Balance,
+    Job,
 )
 
 from .serializers import (
@@ -45,13 +81,18 @@ from .serializers import (
     ContactStatsSerializer,
     ContactInfoSerializer,
     SuccessStorySerializer,
+    TestSubmissionSerializer,
+    CoursePageSerializer,
+    JournalBulkSerializer,
+    BalanceSerializer,
+    JobSerializer,
 )
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
     - SAFE methods (GET, HEAD, OPTIONS) – allowed for everyone (or authenticated only if you want).
-    - write operations – only for ADMIN role.
+    - write operations – only for ADMIN role, never for integrations.
     """
 
     def has_permission(self, request, view):
@@ -63,27 +104,54 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
 
-        # If you later integrate with Django auth User, adapt this check.
-        try:
-            # assuming you map request.user.email to your custom User
-            from .models import User as CustomUser
+        # integrations are read-only whatever their key's permission says
+        if is_integration(request):
+            return False
+
+        # role comes from api.models.User, resolved once per request (cached)
+        return is_admin(request)
+
+
+class IsAdmin(permissions.BasePermission):
+    """
+    Only users whose api.models.User role is ADMIN, for every method.
+    Integration API keys are refused even when an admin owns them.
+    """
+
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated or is_integration(request):
+            return False
+        return is_admin(request)
 
-            custom = CustomUser.objects.filter(email=request.user.email).first()
-            if custom and custom.role == CustomUser.Role.ADMIN:
-                return True
-        except Exception:
-            pass
 
-        return False
+def parse_date_range(request):
+    """
+    The optional ?from= / ?to= dates (YYYY-MM-DD) of a request, None when
+    absent; malformed values are a 400.
+    """
+    bounds = {}
+    for param in ("from", "to"):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                bounds[param] = parse_date(value)
+            except ValueError:
+                bounds[param] = None
+            if bounds[param] is None:
+                raise ValidationError({param: "Expected a date in YYYY-MM-DD format."})
+    return bounds.get("from"), bounds.get("to")
 
 
 class BaseViewSet(viewsets.ModelViewSet):
     """
     Base CRUD viewset. Permission is open for now – you can switch to
     IsAuthenticated / custom permission later.
+
+    List endpoints are keyset-paginated (REST_FRAMEWORK pagination class);
+    set `page_size` / `max_page_size` on a subclass to tune its page caps.
     """
     permission_classes = [permissions.AllowAny]
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [FullTextSearchFilter, OrderingFilter]
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -96,11 +164,16 @@ class UserViewSet(viewsets.ModelViewSet):
       - ?status=active|upcoming|finished|paused
       - ?group=<group_id>
 
-    Search:
+    Search (full-text, every term as a prefix, see api.search):
       - ?search=John
+      - ?search=jo smi
     Ordering:
       - ?ordering=firstname
       - ?ordering=-id
+
+    Pagination (keyset, see api.pagination):
+      - ?page_size=100
+      - ?cursor=<opaque value from "next"/"previous">
     """
 
     queryset = User.objects.all().select_related("group")
@@ -109,10 +182,12 @@ class UserViewSet(viewsets.ModelViewSet):
     # if you want only authenticated users to see something:
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
 
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [FullTextSearchFilter, OrderingFilter]
     search_fields = ["firstname", "lastname", "email", "login"]
     ordering_fields = ["id", "firstname", "lastname", "email"]
     ordering = ["id"]
+    page_size = 50
+    max_page_size = 200
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -128,10 +203,24 @@ class UserViewSet(viewsets.ModelViewSet):
         if group_id:
             qs = qs.filter(group_id=group_id)
 
+        if self.action == "dashboard":
+            qs = dashboard_queryset(qs)
+
         return qs
 
+    @action(detail=True, methods=["get"])
+    def dashboard(self, request, pk=None):
+        """
+        GET /users/{id}/dashboard/
+
+        Group, course, attendance rate, passed/failed tests and payment
+        balance of a student, aggregated by the database in one query
+        (or read from StudentSummary, see api.dashboard).
+        """
+        return Response(build_dashboard(self.get_object()))
 
-class CourseViewSet(BaseViewSet):
+
+class CourseViewSet(CachedResponseMixin, AsyncReadMixin, BaseViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
 
@@ -139,6 +228,42 @@ class CourseViewSet(BaseViewSet):
     ordering_fields = ["id", "title", "price"]
     ordering = ["id"]
 
+    cached_actions = ("list", "retrieve", "page")
+    # list/retrieve only show Course rows
+    action_cache_models = {"page": [CourseIncluded, CourseProcess, Lesson, Material, Group, Test]}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == "page":
+            qs = qs.annotate(test_count=Count("tests")).prefetch_related(
+                Prefetch("included_items", queryset=CourseIncluded.objects.order_by("id")),
+                "process_steps",
+                Prefetch(
+                    "lessons",
+                    queryset=Lesson.objects.select_related("material").order_by("id"),
+                ),
+                Prefetch(
+                    "groups",
+                    queryset=Group.objects.filter(archived=False).order_by("starting_date", "id"),
+                    to_attr="active_groups",
+                ),
+            )
+        return qs
+
+    @action(detail=True, methods=["get"], serializer_class=CoursePageSerializer)
+    def page(self, request, pk=None):
+        """
+        GET /courses/{id}/page/
+
+        The course with its included items, process steps, lessons (with
+        material), active groups and test count – a constant 5 queries.
+        """
+        return self.cached(self.render_page, request, pk=pk)
+
+    def render_page(self, request, pk=None):
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
+
 
 class GroupViewSet(BaseViewSet):
     queryset = Group.objects.all().select_related("course")
@@ -148,6 +273,18 @@ class GroupViewSet(BaseViewSet):
     ordering_fields = ["id", "starting_date", "ending_date"]
     ordering = ["id"]
 
+    @action(detail=True, methods=["get"], url_path="attendance-matrix")
+    def attendance_matrix(self, request, pk=None):
+        """
+        GET /groups/{id}/attendance-matrix/?from=2025-01-01&to=2025-06-30
+
+        Student x date attendance grid in a compact columnar form
+        (see api.attendance).
+        """
+        group = self.get_object()
+        date_from, date_to = parse_date_range(request)
+        return Response(build_attendance_matrix(group.pk, date_from, date_to))
+
 
 class TestViewSet(BaseViewSet):
     queryset = Test.objects.all().select_related("course")
@@ -157,6 +294,100 @@ class TestViewSet(BaseViewSet):
     ordering_fields = ["id", "course"]
     ordering = ["id"]
 
+    @action(detail=True, methods=["post"], serializer_class=TestSubmissionSerializer)
+    def submit(self, request, pk=None):
+        """
+        POST /tests/{id}/submit/
+
+        Grades the whole submission against the cached answer key and stores
+        the result on the user's StudentSolve for this test.
+        """
+        test = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        answers = serializer.validated_data["answers"]
+
+        key, result = grade_submission(test.pk, answers)
+        solve, solve_typed = key.split_answers(answers)
+        StudentSolve.objects.update_or_create(
+            user=user,
+            test=test,
+            defaults={
+                "solve": solve,
+                "solve_typed": solve_typed,
+                "solve_status": result.passed,
+            },
+        )
+
+        return Response(
+            {
+                "test": test.pk,
+                "user": user.pk,
+                "correct": result.correct,
+                "total": result.total,
+                "passed": result.passed,
+                "results": result.results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=["post"], permission_classes=[IsAdmin])
+    def regrade(self, request, pk=None):
+        """
+        POST /tests/{id}/regrade/
+
+        Queues a regrade of every StudentSolve of the test against its
+        current questions (see `manage.py regrade` for bulk runs).
+        """
+        test = self.get_object()
+        job = enqueue("grading.regrade", test_ids=[test.pk])
+        return Response({"job": job.pk}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["post"], url_path="questions/import")
+    def import_questions(self, request, pk=None):
+        """
+        POST /tests/{id}/questions/import/
+
+        Body is NDJSON (one question object per line) or, with
+        Content-Type: text/csv, CSV with a header row. Columns: title, type,
+        correct, incorrect1..3. Nothing is stored if a row is invalid unless
+        ?partial=1 is given.
+        """
+        test = self.get_object()
+        # read the raw body as a stream, never through request.data;
+        # None for an empty body
+        lines = request.stream or ()
+        if request.content_type.startswith("text/csv"):
+            rows = iter_csv_rows(lines)
+        else:
+            rows = iter_ndjson_rows(lines)
+
+        partial = request.query_params.get("partial") in ("1", "true")
+        created, error_count, errors = import_questions(test, rows, partial=partial)
+        return Response(
+            {"created": created, "error_count": error_count, "errors": errors},
+            status=status.HTTP_400_BAD_REQUEST if error_count and not partial else status.HTTP_200_OK,
+        )
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="questions/export",
+        renderer_classes=[NDJSONRenderer, CSVRenderer, JSONRenderer],
+    )
+    def export_questions(self, request, pk=None):
+        """
+        GET /tests/{id}/questions/export/?format=ndjson|csv
+        """
+        test = self.get_object()
+        return streaming_export(
+            request.accepted_renderer,
+            ["id", *QUESTION_FIELDS],
+            export_rows(test),
+            f"test-{test.pk}-questions",
+        )
+
 
 class QuestionViewSet(BaseViewSet):
     queryset = Question.objects.all().select_related("test")
@@ -167,12 +398,23 @@ class QuestionViewSet(BaseViewSet):
     ordering = ["id"]
 
 
-class StudentSolveViewSet(BaseViewSet):
+class StudentSolveViewSet(ExportMixin, AsyncReadMixin, BaseViewSet):
     queryset = StudentSolve.objects.all().select_related("user", "test")
     serializer_class = StudentSolveSerializer
+    export_fields = [
+        ("id", "id"),
+        ("user", "user_id"),
+        ("test", "test_id"),
+        ("solve", "solve"),
+        ("solve_typed", "solve_typed"),
+        ("solve_status", "solve_status"),
+        ("created_at", "created_at"),
+    ]
 
     ordering_fields = ["id", "created_at"]
-    ordering = ["-created_at"]
+    ordering = ["-created_at", "id"]
+    page_size = 100
+    max_page_size = 500
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -186,21 +428,46 @@ class StudentSolveViewSet(BaseViewSet):
 
         return qs
 
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        passed = grade_stored_solve(data["test"].pk, data.get("solve", ""), data.get("solve_typed", ""))
+        serializer.save(solve_status=bool(passed))
+
+    def perform_update(self, serializer):
+        solve = serializer.instance
+        data = serializer.validated_data
+        passed = grade_stored_solve(
+            data.get("test", solve.test).pk,
+            data.get("solve", solve.solve),
+            data.get("solve_typed", solve.solve_typed),
+        )
+        # answers the grader cannot read keep their previous status
+        serializer.save(solve_status=solve.solve_status if passed is None else passed)
+
 
 class IntegrationViewSet(BaseViewSet):
     queryset = Integration.objects.all().select_related("user")
     serializer_class = IntegrationSerializer
 
     ordering_fields = ["id", "date", "rate_limit_per_minute", "rate_limit_per_day"]
-    ordering = ["-date"]
+    ordering = ["-date", "id"]
 
 
-class JournalViewSet(BaseViewSet):
+class JournalViewSet(ExportMixin, BaseViewSet):
     queryset = Journal.objects.all().select_related("group", "user")
     serializer_class = JournalSerializer
+    export_fields = [
+        ("id", "id"),
+        ("group", "group_id"),
+        ("user", "user_id"),
+        ("date", "date"),
+        ("status", "status"),
+    ]
 
     ordering_fields = ["id", "date"]
-    ordering = ["-date"]
+    ordering = ["-date", "id"]
+    page_size = 100
+    max_page_size = 500
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -212,6 +479,39 @@ class JournalViewSet(BaseViewSet):
             qs = qs.filter(user_id=user_id)
         return qs
 
+    @action(detail=False, methods=["post"], serializer_class=JournalBulkSerializer)
+    def bulk(self, request):
+        """
+        POST /journal/bulk/
+
+        Upserts attendance of a whole group for one date: one query for the
+        group, one IN query for all users, one INSERT ... ON CONFLICT.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        group = serializer.validated_data["group"]
+        date = serializer.validated_data["date"]
+        entries = serializer.validated_data["entries"]
+
+        rows = [
+            Journal(group=group, user_id=entry["user"], date=date, status=entry["status"])
+            for entry in entries
+        ]
+        with transaction.atomic():
+            Journal.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["group", "user", "date"],
+                update_fields=["status"],
+            )
+            # bulk_create sends no signals
+            schedule_refresh(entry["user"] for entry in entries)
+
+        return Response(
+            {"group": group.pk, "date": date, "count": len(rows)},
+            status=status.HTTP_200_OK,
+        )
+
 
 class MaterialViewSet(BaseViewSet):
     queryset = Material.objects.all()
@@ -222,7 +522,7 @@ class MaterialViewSet(BaseViewSet):
     ordering = ["id"]
 
 
-class LessonViewSet(BaseViewSet):
+class LessonViewSet(AsyncReadMixin, BaseViewSet):
     queryset = Lesson.objects.all().select_related("material", "course")
     serializer_class = LessonSerializer
 
@@ -239,19 +539,67 @@ class LessonViewSet(BaseViewSet):
 
 
 class ApplicationViewSet(BaseViewSet):
+    """
+    Resubmitting an identical application within the throttle window returns
+    the stored one instead of creating a duplicate; new applications are
+    throttled per email and per client IP (ApplicationRateThrottle).
+    """
+
     queryset = Application.objects.all().select_related("course")
     serializer_class = ApplicationSerializer
 
     ordering_fields = ["id", "date"]
-    ordering = ["-date"]
-
-
-class PaymentViewSet(BaseViewSet):
+    ordering = ["-date", "id"]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        key = self.get_submission_key(serializer.validated_data)
+        existing_id = cache.get(key)
+        if existing_id is not None:
+            existing = Application.objects.filter(pk=existing_id).first()
+            if existing is not None:
+                return Response(self.get_serializer(existing).data, status=status.HTTP_200_OK)
+
+        # only new, valid applications count against the limits
+        throttle = ApplicationRateThrottle()
+        if not throttle.allow_request(request, self):
+            self.throttled(request, throttle.wait())
+
+        self.perform_create(serializer)
+        cache.set(key, serializer.instance.pk, getattr(settings, "APPLICATION_THROTTLE_WINDOW", 60 * 60))
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def get_submission_key(self, data):
+        course = data.get("course")
+        raw = "|".join([
+            data["email"].strip().lower(),
+            data["firstname"].strip().lower(),
+            data["lastname"].strip().lower(),
+            str(course.pk if course else ""),
+        ])
+        return f"application:submission:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+class PaymentViewSet(ExportMixin, BaseViewSet):
     queryset = Payment.objects.all().select_related("user")
     serializer_class = PaymentSerializer
+    export_fields = [
+        ("id", "id"),
+        ("user", "user_id"),
+        ("date", "date"),
+        ("type", "type"),
+        ("payed", "payed"),
+        ("discount", "discount"),
+        ("status", "status"),
+    ]
 
     ordering_fields = ["id", "date", "payed"]
-    ordering = ["-date"]
+    ordering = ["-date", "id"]
+    page_size = 100
+    max_page_size = 500
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -261,7 +609,45 @@ class PaymentViewSet(BaseViewSet):
         return qs
 
 
-class TeamViewSet(BaseViewSet):
+class BalanceViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    /payments/balances/
+
+    Materialized per-user balances (api.ledger), most owed first; admins
+    only. List filters:
+      - ?min_owed=100  (default: only users in arrears, owed > 0)
+      - ?all=1         (include settled users)
+      - ?group=<group_id>
+    """
+
+    queryset = Balance.objects.all()
+    serializer_class = BalanceSerializer
+    permission_classes = [IsAdmin]
+
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["owed", "updated_at", "user"]
+    ordering = ["-owed", "user"]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action != "list":
+            return qs
+        min_owed = self.request.query_params.get("min_owed")
+        group_id = self.request.query_params.get("group")
+
+        if min_owed:
+            try:
+                qs = qs.filter(owed__gte=Decimal(min_owed))
+            except InvalidOperation:
+                raise ValidationError({"min_owed": "Expected a number."})
+        elif self.request.query_params.get("all") not in ("1", "true"):
+            qs = qs.filter(owed__gt=0)
+        if group_id:
+            qs = qs.filter(user__group_id=group_id)
+        return qs
+
+
+class TeamViewSet(CachedResponseMixin, BaseViewSet):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
 
@@ -270,7 +656,7 @@ class TeamViewSet(BaseViewSet):
     ordering = ["id"]
 
 
-class PartnerViewSet(BaseViewSet):
+class PartnerViewSet(CachedResponseMixin, BaseViewSet):
     queryset = Partner.objects.all()
     serializer_class = PartnerSerializer
 
@@ -279,7 +665,7 @@ class PartnerViewSet(BaseViewSet):
     ordering = ["id"]
 
 
-class FAQViewSet(BaseViewSet):
+class FAQViewSet(CachedResponseMixin, AsyncReadMixin, BaseViewSet):
     queryset = FAQ.objects.all()
     serializer_class = FAQSerializer
 
@@ -288,7 +674,7 @@ class FAQViewSet(BaseViewSet):
     ordering = ["id"]
 
 
-class CourseIncludedViewSet(BaseViewSet):
+class CourseIncludedViewSet(CachedResponseMixin, BaseViewSet):
     queryset = CourseIncluded.objects.all().select_related("course")
     serializer_class = CourseIncludedSerializer
 
@@ -303,7 +689,7 @@ class CourseIncludedViewSet(BaseViewSet):
         return qs
 
 
-class CourseProcessViewSet(BaseViewSet):
+class CourseProcessViewSet(CachedResponseMixin, BaseViewSet):
     queryset = CourseProcess.objects.all().select_related("course")
     serializer_class = CourseProcessSerializer
 
@@ -318,7 +704,7 @@ class CourseProcessViewSet(BaseViewSet):
         return qs
 
 
-class ContactStatsViewSet(BaseViewSet):
+class ContactStatsViewSet(CachedResponseMixin, BaseViewSet):
     queryset = ContactStats.objects.all()
     serializer_class = ContactStatsSerializer
 
@@ -326,7 +712,7 @@ class ContactStatsViewSet(BaseViewSet):
     ordering = ["id"]
 
 
-class ContactInfoViewSet(BaseViewSet):
+class ContactInfoViewSet(CachedResponseMixin, BaseViewSet):
     queryset = ContactInfo.objects.all()
     serializer_class = ContactInfoSerializer
 
@@ -334,7 +720,7 @@ class ContactInfoViewSet(BaseViewSet):
     ordering = ["id"]
 
 
-class SuccessStoryViewSet(BaseViewSet):
+class SuccessStoryViewSet(CachedResponseMixin, BaseViewSet):
     queryset = SuccessStory.objects.all().select_related("user")
     serializer_class = SuccessStorySerializer
 
@@ -346,4 +732,118 @@ class SuccessStoryViewSet(BaseViewSet):
         user_id = self.request.query_params.get("user")
         if user_id:
             qs = qs.filter(user_id=user_id)
-        return qs
\ No newline at end of file
+        published = self.request.query_params.get("published")
+        if published:
+            qs = qs.filter(published=published in ("1", "true"))
+        return qs
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """
+    /analytics/revenue/       – revenue per course per month
+    /analytics/applications/  – new applications per week
+    /analytics/funnel/        – application -> active user conversion per week
+
+    Optional ?from=YYYY-MM-DD&to=YYYY-MM-DD, default is the last 12 buckets;
+    ranges of more than analytics.MAX_BUCKETS buckets are a 400.
+    Closed buckets are served from a frozen cache (see api.analytics).
+    """
+
+    permission_classes = [IsAdmin]
+
+    @action(detail=False, methods=["get"])
+    def revenue(self, request):
+        return self.report(request, analytics.revenue)
+
+    @action(detail=False, methods=["get"])
+    def applications(self, request):
+        return self.report(request, analytics.applications)
+
+    @action(detail=False, methods=["get"])
+    def funnel(self, request):
+        return self.report(request, analytics.funnel)
+
+    def report(self, request, metric):
+        date_from, date_to = parse_date_range(request)
+        try:
+            return Response(metric.report(date_from, date_to))
+        except analytics.TooManyBuckets as exc:
+            raise ValidationError({"from": str(exc)})
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    /jobs/?task=images.render_derivatives&status=failed   – background jobs
+    /jobs/stats/?hours=24                                – per-task metrics
+
+    stats: queued / due / running jobs and the lag of the oldest due one,
+    plus done / failed / retried counts and run times of the jobs finished
+    in the last ?hours= (default 24).
+    """
+
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAdmin]
+
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["id", "run_at"]
+    ordering = ["-id"]
+    max_stats_hours = 24 * 366
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        for param in ("task", "status"):
+            value = self.request.query_params.get(param)
+            if value:
+                qs = qs.filter(**{param: value})
+        return qs
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        try:
+            hours = float(request.query_params.get("hours", 24))
+            # also rejects nan and inf, which timedelta cannot take
+            if not 0 < hours <= self.max_stats_hours:
+                raise ValueError
+            since = timezone.now() - datetime.timedelta(hours=hours)
+        except (ValueError, OverflowError):
+            raise ValidationError({"hours": f"Expected a number of hours up to {self.max_stats_hours}."})
+        return Response({"since": since, "tasks": task_stats(since)})
+
+
+class AutocompleteViewSet(viewsets.ViewSet):
+    """
+    /autocomplete/users/?q=jo smi    – admins only
+    /autocomplete/courses/?q=pyth
+
+    Optional ?limit= (default 10, max 50). Answered from an in-memory
+    prefix index with a trigram fuzzy fallback (see api.autocomplete);
+    "fuzzy" is true when some results are approximate matches.
+    """
+
+    throttle_classes = [ScopedRateThrottle, IntegrationRateThrottle]
+    throttle_scope = "autocomplete"
+    default_limit = 10
+    max_limit = 50
+
+    def get_permissions(self):
+        if self.action == "users":
+            return [IsAdmin()]
+        return [permissions.AllowAny()]
+
+    @action(detail=False, methods=["get"])
+    def users(self, request):
+        return self.complete(request, autocomplete.users)
+
+    @action(detail=False, methods=["get"])
+    def courses(self, request):
+        return self.complete(request, autocomplete.courses)
+
+    def complete(self, request, index):
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            raise ValidationError({"limit": "Expected an integer."})
+        limit = max(1, min(limit, self.max_limit))
+        results, fuzzy = index.query(request.query_params.get("q", ""), limit)
+        return Response({"results": results, "fuzzy": fuzzy})
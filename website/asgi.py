@@ -3,14 +3,35 @@ ASGI config for website project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Viewsets with api.async_views.AsyncReadMixin answer GET list/retrieve with
+their async view here; everything else runs as under WSGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
+django.setup(set_prefix=False)
+
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+
+
+class AsyncViewASGIHandler(ASGIHandler):
+    """
+    Dispatches to `view.async_view` where a view provides one, without
+    a sync_to_async thread hop around the whole view.
+    """
+
+    def resolve_request(self, request):
+        resolver_match = super().resolve_request(request)
+        async_view = getattr(resolver_match.func, 'async_view', None)
+        if async_view is not None:
+            resolver_match.func = async_view
+        return resolver_match
+
 
-application = get_asgi_application()
+application = AsyncViewASGIHandler()
@@ -0,0 +1,158 @@
+"""
+In-process request metrics, exported in the Prometheus text format.
+
+website.middleware.RequestMetricsMiddleware observes every request into the
+histograms below, labelled by resolved view name (e.g. "user-list") and
+method. GET /metrics renders them for api admins (session, basic auth or an
+Integration API key, so a scraper can use a read-only key).
+
+Each process keeps its own numbers; scrape every worker (or sum in
+Prometheus) when running more than one.
+"""
+import threading
+from bisect import bisect_left
+
+from django.http import HttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.views import APIView
+
+from api.views import IsAdmin
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram per label set. Counts are stored per bucket and
+    made cumulative only when rendering.
+    """
+
+    def __init__(self, name, help_text, buckets, label_names=("view", "method")):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self.series = {}  # labels -> [bucket counts..., +Inf count], sum, count
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = 'le="' + (bound if bound == "+Inf" else _number(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter(
+            "http_requests_total", "Requests by view, method and status code.",
+            ("view", "method", "status"),
+        )
+        self.duration = Histogram(
+            "http_request_duration_seconds", "Request latency in seconds.", SECONDS_BUCKETS,
+        )
+        self.queries = Histogram(
+            "http_request_db_queries", "Database queries per request.", QUERY_BUCKETS,
+        )
+        self.db_duration = Histogram(
+            "http_request_db_duration_seconds", "Time spent in the database per request.", SECONDS_BUCKETS,
+        )
+        self.response_size = Histogram(
+            "http_response_size_bytes", "Response body size (streaming responses excluded).", BYTES_BUCKETS,
+        )
+        self.metrics = [self.requests, self.duration, self.queries, self.db_duration, self.response_size]
+
+    def observe(self, view, method, status, duration, queries, db_duration, size):
+        labels = (view, method)
+        with self.lock:
+            self.requests.inc((view, method, str(status)))
+            self.duration.observe(labels, duration)
+            self.queries.observe(labels, queries)
+            self.db_duration.observe(labels, db_duration)
+            if size is not None:
+                self.response_size.observe(labels, size)
+
+    def render(self):
+        with self.lock:
+            lines = [line for metric in self.metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics:
+                metric.series.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # only error payloads ({"detail": ...}) reach the renderer
+        return str(data.get("detail", data) if isinstance(data, dict) else data).encode(self.charset)
+
+
+class MetricsView(APIView):
+    """
+    GET /metrics – request metrics of this process in Prometheus text format.
+    """
+
+    permission_classes = [IsAdmin]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return HttpResponse(request_metrics.render(), content_type=CONTENT_TYPE)
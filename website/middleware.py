@@ -0,0 +1,207 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import request_metrics
+
+logger = logging.getLogger("website.metrics")
+
+# statements kept per request for the slow-request log
+MAX_RECORDED_QUERIES = 1000
+
+
+class QueryTracker:
+    """
+    Counts and times every statement of one request (see track_queries).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if len(self.statements) < MAX_RECORDED_QUERIES:
+                self.statements.append((elapsed, sql))
+
+
+# the tracker of the request being handled; a context variable because an
+# async request runs its queries in whichever thread sync_to_async picks
+_current_tracker = ContextVar("query_tracker", default=None)
+
+
+def track_queries(execute, sql, params, many, context):
+    tracker = _current_tracker.get()
+    if tracker is None:
+        return execute(sql, params, many, context)
+    return tracker(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_tracking(sender, connection, **kwargs):
+    # outermost, so connection.execute_wrapper() still pops its own wrapper
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, track_queries)
+
+
+def _view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        # unmatched URLs (404) share one label to keep cardinality bounded
+        return "<unmatched>"
+    return match.view_name or match.route or "<unnamed>"
+
+
+class TrackedStream:
+    """
+    Streaming content that counts the queries of each chunk into `tracker`
+    and calls `done` once, when the body is exhausted or the response closed
+    (also when it was never iterated, e.g. for HEAD).
+    """
+
+    def __init__(self, content, tracker, done):
+        self.content = content
+        self.tracker = tracker
+        self.done = done
+
+    def close(self):
+        done, self.done = self.done, None
+        if done is not None:
+            done()
+
+    def __iter__(self):
+        self.iterator = iter(self.content)
+        return self
+
+    def __next__(self):
+        # set around each chunk only: the caller iterates in its own context
+        token = _current_tracker.set(self.tracker)
+        try:
+            return next(self.iterator)
+        except StopIteration:
+            self.close()
+            raise
+        finally:
+            _current_tracker.reset(token)
+
+
+class AsyncTrackedStream(TrackedStream):
+    __iter__ = None
+
+    def __aiter__(self):
+        self.iterator = aiter(self.content)
+        return self
+
+    async def __anext__(self):
+        token = _current_tracker.set(self.tracker)
+        try:
+            return await anext(self.iterator)
+        except StopAsyncIteration:
+            self.close()
+            raise
+        finally:
+            _current_tracker.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB query count / time and response size of every request
+    into website.metrics.request_metrics, and logs requests slower than
+    METRICS_SLOW_REQUEST_MS or with more than METRICS_SLOW_REQUEST_QUERIES
+    queries together with their slowest statements.
+
+    A streamed response (the CSV/NDJSON exports) runs its queries while the
+    server consumes the body, after the view has returned: its queries are
+    tracked chunk by chunk and the request is recorded once the stream is
+    exhausted or closed, so latency and DB time include the streaming.
+    Its response size is not recorded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.slow_seconds = getattr(settings, "METRICS_SLOW_REQUEST_MS", 1000) / 1000
+        self.slow_queries = getattr(settings, "METRICS_SLOW_REQUEST_QUERIES", 100)
+        self.logged_statements = getattr(settings, "METRICS_SLOW_SQL_LIMIT", 10)
+        # connections opened later are covered by install_query_tracking
+        for alias in connections:
+            install_query_tracking(None, connections[alias])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tracker = QueryTracker()
+        token = _current_tracker.set(tracker)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_tracker.reset(token)
+        if response.streaming:
+            self.track_stream(request, response, started, tracker)
+        else:
+            self.observe(request, response, time.perf_counter() - started, tracker)
+        return response
+
+    async def __acall__(self, request):
+        tracker = QueryTracker()
+        token = _current_tracker.set(tracker)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_tracker.reset(token)
+        if response.streaming:
+            self.track_stream(request, response, started, tracker)
+        else:
+            self.observe(request, response, time.perf_counter() - started, tracker)
+        return response
+
+    def track_stream(self, request, response, started, tracker):
+        def done():
+            self.observe(request, response, time.perf_counter() - started, tracker)
+
+        stream = AsyncTrackedStream if response.is_async else TrackedStream
+        response.streaming_content = stream(response.streaming_content, tracker, done)
+
+    def observe(self, request, response, duration, tracker):
+        view = _view_label(request)
+        size = None if response.streaming else len(response.content)
+        request_metrics.observe(
+            view, request.method, response.status_code,
+            duration, tracker.count, tracker.duration, size,
+        )
+        if duration >= self.slow_seconds or tracker.count > self.slow_queries:
+            self.log_slow_request(request, view, response, duration, tracker)
+
+    def log_slow_request(self, request, view, response, duration, tracker):
+        slowest = sorted(tracker.statements, key=lambda item: item[0], reverse=True)
+        sql = "\n".join(
+            f"  {elapsed * 1000:8.2f}ms  {statement}"
+            for elapsed, statement in slowest[:self.logged_statements]
+        )
+        logger.warning(
+            "Slow request %s %s (%s) -> %s: %.0fms, %d queries, %.0fms in DB\n%s",
+            request.method, request.get_full_path(), view, response.status_code,
+            duration * 1000, tracker.count, tracker.duration * 1000, sql,
+        )
@@ -23,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its latency covers the whole middleware stack
+    'website.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -30,6 +32,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RateLimitHeadersMiddleware',
+    'api.middleware.QueryGuardMiddleware',
 ]
 
 ROOT_URLCONF = 'website.urls'
@@ -51,16 +55,97 @@ TEMPLATES = [
 ]
 
 REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+        'api.authentication.IntegrationAPIKeyAuthentication',
+    ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'api.throttling.AnonRateThrottle',
+        'api.throttling.UserRateThrottle',
+        'api.throttling.IntegrationRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '20/minute',
         'user': '20/minute',
+        # one request per keystroke in the admin pickers
+        'autocomplete': '600/minute',
     }
 }
 
+# Per-integration rate limits (Integration.rate_limit_per_minute/day), also
+# used by the application throttle below.
+# Use 'api.throttling.CacheRateLimitBackend' to share counters between nodes
+# through the INTEGRATION_RATE_LIMIT_CACHE cache alias.
+INTEGRATION_RATE_LIMIT_BACKEND = 'api.throttling.LocalRateLimitBackend'
+INTEGRATION_RATE_LIMIT_CACHE = 'default'
+
+# New applications allowed per email / per client IP within the window (s).
+APPLICATION_THROTTLE_WINDOW = 60 * 60
+APPLICATION_THROTTLE_PER_EMAIL = 3
+APPLICATION_THROTTLE_PER_IP = 10
+
+# Staff addresses notified (from a job) of every new Application; empty to
+# disable. Sent with DEFAULT_FROM_EMAIL through the EMAIL_* settings.
+APPLICATION_NOTIFY_EMAILS = []
+
+# Rendered-response cache for the public marketing endpoints
+# (api.response_cache). Point the alias at a shared cache when running more
+# than one process so save/delete invalidation reaches every node.
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Serve /users/{id}/dashboard/ from the StudentSummary table instead of
+# aggregating on every request (run `manage.py refresh_dashboards` first).
+STUDENT_DASHBOARD_MATERIALIZED = False
+
+# Per-bucket cache of /analytics/*; closed buckets never expire.
+ANALYTICS_CACHE_ALIAS = 'default'
+ANALYTICS_CURRENT_BUCKET_TTL = 60
+
+# Per-view request metrics served at /metrics (website.metrics). Requests
+# slower than METRICS_SLOW_REQUEST_MS or running more than
+# METRICS_SLOW_REQUEST_QUERIES queries are logged to "website.metrics"
+# with their METRICS_SLOW_SQL_LIMIT slowest statements.
+METRICS_ENABLED = True
+METRICS_SLOW_REQUEST_MS = 1000
+METRICS_SLOW_REQUEST_QUERIES = 100
+METRICS_SLOW_SQL_LIMIT = 10
+
+# N+1 detection (api.query_guard) for development: None (off), "warn" to log
+# statements repeated QUERY_GUARD_THRESHOLD+ times in a request, "raise" to
+# fail the request.
+QUERY_GUARD = None
+QUERY_GUARD_THRESHOLD = 5
+
+# ?search= index (api.search): "auto" uses the SQLite FTS5 tables when they
+# exist, "python" forces the in-process index (rebuilt every
+# SEARCH_INDEX_TTL seconds).
+SEARCH_BACKEND = 'auto'
+SEARCH_INDEX_TTL = 300
+
+# In-process /autocomplete/ index (api.autocomplete), rebuilt every
+# AUTOCOMPLETE_INDEX_TTL seconds; trigram similarity needed for a fuzzy match.
+AUTOCOMPLETE_INDEX_TTL = 600
+AUTOCOMPLETE_FUZZY_THRESHOLD = 0.4
+
+# Image derivatives (api.images): widths rendered as WebP and JPEG for every
+# uploaded image, by the job workers.
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+
+# Background jobs (api.jobs, `manage.py runworkers`): idle workers poll every
+# JOB_POLL_INTERVAL seconds; failed jobs are retried after JOB_RETRY_BACKOFF
+# seconds, doubling up to JOB_RETRY_MAX_DELAY; running jobs older than
+# JOB_LOCK_TIMEOUT seconds are considered lost and requeued; finished jobs
+# are kept for JOB_RETENTION_DAYS.
+JOB_POLL_INTERVAL = 1
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_LOCK_TIMEOUT = 10 * 60
+JOB_RETENTION_DAYS = 7
+
 
 WSGI_APPLICATION = 'website.wsgi.application'
 
@@ -101,4 +186,7 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
@@ -1,9 +1,13 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from .metrics import MetricsView
+
 
 # --- Only SUPERADMIN can see docs ---
 class IsSuperUser(permissions.BasePermission):
@@ -43,5 +47,11 @@ urlpatterns = [
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0),
          name='schema-redoc'),
 
+    # Prometheus scrape endpoint (api admins only)
+    path('metrics', MetricsView.as_view(), name='metrics'),
+
     path('', include('api.urls')),
-]
\ No newline at end of file
+]
+
+# uploads and their derivatives; only served by Django itself with DEBUG on
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file